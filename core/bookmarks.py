@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+书签清除 - 不启动Office，流式重写 word/document.xml 删除锁定信息书签
+
+重写时用 expat 边扫描边按块复制原始字节，跳过匹配书签的 w:bookmarkStart 以及 w:id 相同的
+w:bookmarkEnd。文档只解压和解析一遍，很大的文档内存占用也保持恒定；没有匹配的书签时不替换原文件。
+"""
+import zipfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.ooxml_pipeline import PackagePlan, PipelineStage, run_pipeline
+
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+BOOKMARK_START = (W_NS, "bookmarkStart")
+BOOKMARK_END = (W_NS, "bookmarkEnd")
+W_ID = (W_NS, "id")
+W_NAME = (W_NS, "name")
+
+# 默认清除的书签（与 WordVBAHandler._clear_document_properties 一致）
+DEFAULT_BOOKMARK_PREFIXES = ("LockedStudent", "Student_")
+DEFAULT_BOOKMARK_NAMES = ("StudentLoginInfo",)
+
+
+def is_locked_bookmark(name: str, prefixes: Iterable[str] = DEFAULT_BOOKMARK_PREFIXES,
+                       names: Iterable[str] = DEFAULT_BOOKMARK_NAMES) -> bool:
+    """判断书签名称是否匹配要清除的前缀或名称"""
+    return name.startswith(tuple(prefixes)) or name in names
+
+
+class _BookmarkMatcher:
+    """
+    判断书签标记是否需要删除
+
+    w:bookmarkEnd 只有 w:id，按文档顺序它出现在对应的 w:bookmarkStart 之后，
+    因此扫描时记住已匹配的 w:id 即可。
+    """
+
+    def __init__(self, prefixes: Tuple[str, ...], names: Tuple[str, ...]):
+        self.prefixes = prefixes
+        self.names = names
+        self.matched: Dict[str, str] = {}
+
+    def __call__(self, name, attrs) -> bool:
+        bookmark_id = attrs.get(W_ID)
+        if name == BOOKMARK_END:
+            return bookmark_id in self.matched
+        bookmark_name = attrs.get(W_NAME, "")
+        if is_locked_bookmark(bookmark_name, self.prefixes, self.names):
+            self.matched[bookmark_id] = bookmark_name
+            return True
+        return False
+
+
+class BookmarkPurgeStage(PipelineStage):
+    """
+    管道阶段：删除Word主文档中的锁定信息书签，被删除的书签名称保存在 removed 中
+
+    Args:
+        prefixes: 要清除的书签名称前缀
+        names: 要清除的完整书签名称
+    """
+
+    def __init__(self, prefixes: Iterable[str] = DEFAULT_BOOKMARK_PREFIXES,
+                 names: Iterable[str] = DEFAULT_BOOKMARK_NAMES):
+        self.prefixes = tuple(prefixes)
+        self.names = tuple(names)
+        self.removed: List[str] = []
+        self._matcher: Optional[_BookmarkMatcher] = None
+
+    def plan(self, plan: PackagePlan):
+        if not plan.main_part.startswith("word/"):
+            return
+        self._matcher = _BookmarkMatcher(self.prefixes, self.names)
+        plan.locate(plan.main_part, (BOOKMARK_START, BOOKMARK_END), self._matcher)
+
+    def after_write(self, zip_file: zipfile.ZipFile):
+        if self._matcher is not None:
+            self.removed = list(self._matcher.matched.values())
+
+    def summary(self) -> List[str]:
+        if not self.removed:
+            return []
+        return [f"已删除 {len(self.removed)} 个书签: {', '.join(self.removed)}"]
+
+
+def purge_bookmarks(file_path: str, output_path: Optional[str] = None,
+                    prefixes: Iterable[str] = DEFAULT_BOOKMARK_PREFIXES,
+                    names: Iterable[str] = DEFAULT_BOOKMARK_NAMES) -> List[str]:
+    """
+    删除Word文档中的锁定信息书签（一次重写压缩包）
+
+    Args:
+        file_path: .docx/.docm 等文件路径
+        output_path: 输出路径，默认覆盖源文件
+        prefixes: 要清除的书签名称前缀
+        names: 要清除的完整书签名称
+
+    Returns:
+        被删除的书签名称
+    """
+    stage = BookmarkPurgeStage(prefixes, names)
+    run_pipeline(file_path, [stage], output_path)
+    return stage.removed
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+COM执行线程 - 单个长期运行的单线程套间，按提交顺序执行需要Office的任务
+
+界面原来每次操作新建一个线程，各自初始化COM、启动Office、打开文档再全部释放。
+ComExecutor 只有一个工作线程和一个任务队列：
+- 线程内COM只初始化一次，Office实例通过 OfficePool 一直保留在该线程中
+- 任务按提交顺序执行，打开的文档保持打开（open_document），之后针对同一文件的任务
+  （包括用户之后的操作）直接复用；打开其他文件、直接写入文件前（close_document）
+  或空闲超过 DOCUMENT_IDLE_TIMEOUT 时关闭文档，避免长时间占用文件
+- submit() 返回 concurrent.futures.Future，界面也可以在任务中发出信号
+- 空闲时定期检查，退出长时间未使用的Office实例（OfficePool.release_idle），
+  线程结束时退出该线程中的全部实例
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+from core.handler_factory import FileType
+from core.office_pool import get_office_pool
+
+
+logger = logging.getLogger(__name__)
+
+# 队列空闲时检查Office实例空闲时间的间隔（秒）
+IDLE_CHECK_INTERVAL = 30
+
+# 文档在最后一个任务结束后保持打开的时间（秒）
+DOCUMENT_IDLE_TIMEOUT = 60
+
+
+def open_office_file(handler, file_type: FileType, file_path: str) -> bool:
+    """用COM处理器打开对应类型的Office文件"""
+    if file_type == FileType.WORD:
+        return handler.open_document(file_path)
+    if file_type == FileType.EXCEL:
+        return handler.open_workbook(file_path)
+    return handler.open_presentation(file_path)
+
+
+def close_office_file(handler, file_type: FileType):
+    """关闭COM处理器打开的Office文件"""
+    if file_type == FileType.WORD:
+        handler.close_document()
+    elif file_type == FileType.EXCEL:
+        handler.close_workbook()
+    else:
+        handler.close_presentation()
+
+
+class ComExecutor:
+    """单个COM工作线程，任务按提交顺序执行"""
+
+    def __init__(self, name: str = "ComExecutor"):
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._shutdown = False
+        # 当前保持打开的文档：((文件类型, 绝对路径, 修改时间, 大小), 处理器)
+        self._session = None
+        # 最后一个任务结束的时间，文档空闲时间从此刻开始计算
+        self._last_job = time.monotonic()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        提交任务，在COM线程中按顺序执行
+
+        Args:
+            fn: 任务函数，可以调用 open_document() 获取已打开文档的处理器
+
+        Returns:
+            任务的 Future
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("COM执行线程已关闭")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def _run(self):
+        """COM线程主循环"""
+        import pythoncom
+        pythoncom.CoInitialize()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self._idle_wait())
+                except queue.Empty:
+                    self._release_idle()
+                    continue
+                if item is None:
+                    break
+                future, fn, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+                self._last_job = time.monotonic()
+        finally:
+            self.close_document()
+            get_office_pool().release_thread()
+            pythoncom.CoUninitialize()
+
+    def _idle_wait(self) -> float:
+        """队列空闲时等待的时间：有打开的文档时等到它的空闲时间到期"""
+        if self._session is None:
+            return IDLE_CHECK_INTERVAL
+        remaining = self._last_job + DOCUMENT_IDLE_TIMEOUT - time.monotonic()
+        return min(IDLE_CHECK_INTERVAL, max(remaining, 0))
+
+    def _release_idle(self):
+        """关闭空闲的文档；没有打开的文档时退出空闲的Office实例"""
+        if self._session is not None:
+            if time.monotonic() - self._last_job < DOCUMENT_IDLE_TIMEOUT:
+                return
+            self.close_document()
+        get_office_pool().release_idle()
+
+    def open_document(self, file_type: FileType, file_path: str):
+        """
+        获取已打开指定文件的COM处理器（只能在COM线程的任务中调用）
+
+        同一文件（路径、修改时间和大小都相同）已经打开时直接复用（包括之前任务打开的文档），
+        否则关闭之前的文档再打开。
+        处理器由执行线程管理，任务中不要调用 close_* 或 quit()。
+
+        Args:
+            file_type: Office文件类型
+            file_path: 文件路径
+
+        Returns:
+            COM处理器，应用程序启动或文件打开失败时返回None
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            logger.error(f"文件不存在: {file_path} - {e}")
+            return None
+        key = (file_type, os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        if self._session is not None and self._session[0] == key:
+            return self._session[1]
+
+        self.close_document()
+        handler = get_office_pool().acquire(file_type)
+        if handler is None:
+            return None
+        if not open_office_file(handler, file_type, file_path):
+            handler.quit()
+            return None
+        self._session = (key, handler)
+        return handler
+
+    def close_document(self):
+        """关闭保持打开的文档（文件被修改后或需要直接写入文件前调用）"""
+        if self._session is None:
+            return
+        key, handler = self._session
+        self._session = None
+        try:
+            close_office_file(handler, key[0])
+        except Exception as e:
+            logger.warning(f"关闭文档时出错: {e}")
+        handler.quit()
+        get_office_pool().touch(key[0])
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = True):
+        """
+        关闭COM线程，线程中启动的Office实例随之退出
+
+        Args:
+            wait: 是否等待正在执行的任务完成
+            cancel_pending: 是否取消尚未开始的任务
+        """
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            thread = self._thread
+            if cancel_pending:
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item[0].cancel()
+            self._queue.put(None)
+        if wait and thread is not None:
+            thread.join()
+
+
+_shared_executor = ComExecutor()
+
+
+def get_com_executor() -> ComExecutor:
+    """获取界面共享的COM执行线程"""
+    return _shared_executor
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+文档属性清除 - 不启动Office，直接清理 docProps/core.xml、app.xml 和 custom.xml
+
+清除的字段与 COM 处理器的 _clear_document_properties 一致：
+标题、主题、作者、关键词、备注、最后修改者、公司、经理以及全部自定义属性。
+Word、Excel、PowerPoint 的属性部件结构相同，三种文件通用。
+"""
+import zipfile
+import xml.etree.ElementTree as ET
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core.ooxml_package import ROOT_RELS_PART, RELATIONSHIPS_NS
+from core.ooxml_pipeline import PackagePlan, PipelineStage, run_pipeline
+from core.xml_stream import ElementFilter, QName, filter_xml_chunks
+
+
+# 属性部件的关系类型
+CORE_PROPERTIES_REL_TYPE = "http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties"
+APP_PROPERTIES_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/extended-properties"
+CUSTOM_PROPERTIES_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/custom-properties"
+
+# 找不到关系时使用的默认部件名称
+DEFAULT_PROPERTY_PARTS = {
+    CORE_PROPERTIES_REL_TYPE: "docProps/core.xml",
+    APP_PROPERTIES_REL_TYPE: "docProps/app.xml",
+    CUSTOM_PROPERTIES_REL_TYPE: "docProps/custom.xml",
+}
+
+# 命名空间
+DC_NS = "http://purl.org/dc/elements/1.1/"
+CP_NS = "http://schemas.openxmlformats.org/package/2006/metadata/core-properties"
+EP_NS = "http://schemas.openxmlformats.org/officeDocument/2006/extended-properties"
+CUSTOM_NS = "http://schemas.openxmlformats.org/officeDocument/2006/custom-properties"
+
+# 要清除的内置属性：(命名空间, 元素名) -> 报告中的名称
+CORE_PROPERTIES_TO_CLEAR = {
+    (DC_NS, "title"): "Title",
+    (DC_NS, "subject"): "Subject",
+    (DC_NS, "creator"): "Author",
+    (CP_NS, "keywords"): "Keywords",
+    (DC_NS, "description"): "Comments",
+    (CP_NS, "lastModifiedBy"): "Last Author",
+}
+APP_PROPERTIES_TO_CLEAR = {
+    (EP_NS, "Company"): "Company",
+    (EP_NS, "Manager"): "Manager",
+}
+
+
+class PropertyReport:
+    """属性清除报告：清除前要删除的字段及其原值，清除后重新读取到的剩余字段"""
+
+    def __init__(self):
+        self.before: Dict[str, str] = {}
+        self.after: Dict[str, str] = {}
+
+    @property
+    def changed(self) -> bool:
+        """是否有属性被清除"""
+        return bool(self.before)
+
+    def format_lines(self) -> List[str]:
+        """生成用于日志输出的文本行"""
+        lines = ["========== 清除前的文档属性 =========="]
+        lines += [f"  {key}: {value}" for key, value in self.before.items()] or ["  （无）"]
+        lines.append("========== 清除后的文档属性 ==========")
+        lines += [f"  {key}: {value}" for key, value in self.after.items()] or ["  （无）"]
+        return lines
+
+
+class _PropertyFilter(ElementFilter):
+    """跳过根元素下的指定属性元素"""
+
+    def __init__(self, names: Iterable[QName]):
+        super().__init__()
+        self.names = set(names)
+
+    def should_drop(self, name, attrs, depth):
+        return depth == 2 and name in self.names
+
+
+# 各属性部件中要删除的元素及其在报告中的名称
+PART_PROPERTIES = {
+    CORE_PROPERTIES_REL_TYPE: CORE_PROPERTIES_TO_CLEAR,
+    APP_PROPERTIES_REL_TYPE: APP_PROPERTIES_TO_CLEAR,
+    CUSTOM_PROPERTIES_REL_TYPE: {(CUSTOM_NS, "property"): None},
+}
+
+
+def find_property_parts(zip_file: zipfile.ZipFile) -> Dict[str, str]:
+    """
+    根据 _rels/.rels 查找属性部件
+
+    Returns:
+        关系类型到部件名称的映射（只包含包中存在的部件）
+    """
+    names = set(zip_file.namelist())
+    parts = {}
+    if ROOT_RELS_PART in names:
+        root = ET.fromstring(zip_file.read(ROOT_RELS_PART))
+        for rel in root.iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+            if rel.get("Type") in DEFAULT_PROPERTY_PARTS:
+                parts[rel.get("Type")] = rel.get("Target", "").lstrip("/")
+    for rel_type, default in DEFAULT_PROPERTY_PARTS.items():
+        parts.setdefault(rel_type, default)
+    return {rel_type: name for rel_type, name in parts.items() if name in names}
+
+
+def _read_values(data: bytes, names: Dict[QName, Optional[str]]) -> Dict[str, str]:
+    """
+    读取属性部件中要清除的字段
+
+    Returns:
+        报告名称到取值的映射，如 "内置属性 Author" 或 "自定义属性 ICV"
+    """
+    values = {}
+    for element in ET.fromstring(data):
+        key = tuple(element.tag[1:].split("}", 1)) if element.tag.startswith("{") else (None, element.tag)
+        if key not in names:
+            continue
+        text = "".join(element.itertext()).strip()
+        if names[key] is None:
+            values[f"自定义属性 {element.get('name')}"] = text
+        else:
+            values[f"内置属性 {names[key]}"] = text
+    return values
+
+
+class PropertyScrubStage(PipelineStage):
+    """管道阶段：清除 docProps 中的内置属性和全部自定义属性，结果保存在 report 中"""
+
+    def __init__(self):
+        self.report = PropertyReport()
+        self._parts: Dict[str, Dict[QName, Optional[str]]] = {}
+
+    def plan(self, plan: PackagePlan):
+        for rel_type, part_name in find_property_parts(plan.zip_file).items():
+            names = PART_PROPERTIES[rel_type]
+            values = _read_values(plan.zip_file.read(part_name), names)
+            if not values:
+                continue
+            self.report.before.update(values)
+            self._parts[part_name] = names
+            plan.transform(part_name, partial(_filter_properties, names=names))
+
+    def after_write(self, zip_file: zipfile.ZipFile):
+        for part_name, names in self._parts.items():
+            if part_name in zip_file.namelist():
+                self.report.after.update(_read_values(zip_file.read(part_name), names))
+
+    def summary(self) -> List[str]:
+        if not self.report.changed:
+            return ["没有需要清除的文档属性"]
+        return self.report.format_lines()
+
+
+def _filter_properties(chunks: Iterator[bytes], names: Iterable[QName]) -> Iterator[bytes]:
+    """部件转换器：流式删除属性元素"""
+    return filter_xml_chunks(chunks, _PropertyFilter(names))
+
+
+def scrub_properties(file_path: str, output_path: Optional[str] = None) -> PropertyReport:
+    """
+    清除文档属性（一次重写压缩包）
+
+    Args:
+        file_path: OOXML文件路径
+        output_path: 输出路径，默认覆盖源文件
+
+    Returns:
+        清除报告
+    """
+    stage = PropertyScrubStage()
+    run_pipeline(file_path, [stage], output_path)
+    return stage.report
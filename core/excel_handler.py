@@ -7,31 +7,105 @@ import logging
 from typing import List, Optional
 import win32com.client
 import pythoncom
+from core.office_profile import SessionProfile, is_app_running
 from core.vba_component import VBAComponent
 
 
+# xlCalculationManual
+XL_CALCULATION_MANUAL = -4135
+
+
 class ExcelVBAHandler:
     """Excel VBA处理程序类"""
 
-    def __init__(self):
+    # COM 程序标识
+    PROG_ID = "Excel.Application"
+
+    def __init__(self, use_ui_signal=True, isolated=False):
         self.excel_app = None
         self.workbook = None
         self.vba_project = None
         self.logger = logging.getLogger(__name__)
+        self._use_ui_signal = use_ui_signal
+        # 应用程序来自 OfficePool 时 quit() 只断开引用，不退出应用程序
+        self._pooled = False
+        # 独立实例：用 DispatchEx 启动新的进程，不连接已运行的实例
+        self._isolated = isolated
+        # 启动应用程序时修改的设置，退出前恢复
+        self.session_profile = None
+        # 实例是否由本处理器启动；连接到用户已打开的实例时不修改设置，也不退出
+        self.owns_app = False
+        # 打开工作簿后修改的设置，关闭工作簿前恢复
+        self._workbook_profile = SessionProfile()
 
     def initialize(self) -> bool:
         """初始化COM组件"""
         try:
             pythoncom.CoInitialize()
-            self.excel_app = win32com.client.Dispatch("Excel.Application")
+        except Exception as e:
+            self.logger.error(f"Excel应用程序初始化失败: {e}")
+            return False
+        return self.launch()
+
+    def launch(self) -> bool:
+        """启动Excel应用程序（调用线程需已初始化COM）"""
+        try:
+            self.owns_app = self._isolated or not is_app_running(self.PROG_ID)
+            dispatch = win32com.client.DispatchEx if self._isolated else win32com.client.Dispatch
+            self.excel_app = dispatch(self.PROG_ID)
+            if not self.owns_app:
+                self.session_profile = None
+                self.logger.info("已连接到正在运行的Excel，不修改其设置，退出时也不关闭")
+                return True
             self.excel_app.Visible = False
             self.excel_app.DisplayAlerts = False
+            self.session_profile = SessionProfile()
+            self._apply_session_profile()
             self.logger.info("Excel应用程序初始化成功")
             return True
         except Exception as e:
             self.logger.error(f"Excel应用程序初始化失败: {e}")
             return False
 
+    def _apply_session_profile(self):
+        """
+        精简会话设置：关闭屏幕刷新和事件（打开工作簿时不运行 Workbook_Open 等事件代码），断开COM加载项
+
+        Excel 加载项（.xlam）的 Installed 会立即写入用户配置，进程被终止时无法恢复，因此不修改。
+        """
+        profile = self.session_profile
+        profile.set(self.excel_app, "ScreenUpdating", False)
+        profile.set(self.excel_app, "EnableEvents", False)
+        profile.disconnect_com_addins(self.excel_app)
+
+    def _apply_workbook_profile(self):
+        """手动重算、保存前不重算（计算模式只能在有工作簿打开时设置，关闭工作簿前恢复）"""
+        self._workbook_profile.set(self.excel_app, "Calculation", XL_CALCULATION_MANUAL)
+        self._workbook_profile.set(self.excel_app, "CalculateBeforeSave", False)
+
+    @property
+    def application(self):
+        """Excel应用程序的COM对象"""
+        return self.excel_app
+
+    def process_id(self) -> Optional[int]:
+        """Excel进程ID（用于终止卡住的实例）"""
+        try:
+            import win32process
+            return win32process.GetWindowThreadProcessId(self.excel_app.Hwnd)[1]
+        except Exception as e:
+            self.logger.debug(f"获取Excel进程ID失败: {e}")
+            return None
+
+    def attach(self, app):
+        """
+        使用已启动的Excel实例（来自 OfficePool）
+
+        quit() 时只断开引用，不退出Excel，也不释放调用线程的COM
+        """
+        self.excel_app = app
+        self._pooled = True
+
     def open_workbook(self, file_path: str) -> bool:
         """
         打开Excel工作簿
@@ -61,6 +135,7 @@ class ExcelVBAHandler:
                 AddToMru=False,
                 ReadOnly=True
             )
+            self._apply_workbook_profile()
             
             # 等待工作簿完全打开
             import time
@@ -103,6 +178,7 @@ class ExcelVBAHandler:
         """关闭工作簿并释放资源"""
         try:
             if self.workbook:
+                self._workbook_profile.restore()
                 self.workbook.Close(SaveChanges=False)
                 self.workbook = None
             self.vba_project = None
@@ -113,8 +189,16 @@ class ExcelVBAHandler:
     def quit(self):
         """退出Excel应用程序"""
         try:
+            if self._pooled:
+                self.excel_app = None
+                self._pooled = False
+                self.logger.info("Excel应用程序已交还应用程序池")
+                return
             if self.excel_app:
-                self.excel_app.Quit()
+                if self.owns_app:
+                    if self.session_profile:
+                        self.session_profile.restore()
+                    self.excel_app.Quit()
                 self.excel_app = None
             pythoncom.CoUninitialize()
             self.logger.info("Excel应用程序已退出")
@@ -123,7 +207,19 @@ class ExcelVBAHandler:
 
     def get_vba_components(self) -> List[VBAComponent]:
         """
-        获取工作簿中所有VBA组件
+        获取工作簿中所有VBA组件（包含代码）
+
+        Returns:
+            VBA组件列表
+        """
+        return self.list_components(metadata_only=False)
+
+    def list_components(self, metadata_only: bool = True) -> List[VBAComponent]:
+        """
+        列出工作簿中的VBA组件
+
+        Args:
+            metadata_only: 为True时只读取名称和类型，不通过COM传输代码（组件的 code 为None）
 
         Returns:
             VBA组件列表
@@ -140,8 +236,8 @@ class ExcelVBAHandler:
                 try:
                     component_type = self._get_component_type(component)
                     if component_type:
-                        # 获取组件代码
-                        code = self._get_component_code(component)
+                        # 获取组件代码（仅列出元数据时跳过）
+                        code = None if metadata_only else self._get_component_code(component)
                         vba_component = VBAComponent(
                             name=component.Name,
                             component_type=component_type,
@@ -241,8 +337,17 @@ class ExcelVBAHandler:
             for component in components:
                 file_path = os.path.join(folder, component.file_name)
                 try:
+                    code = component.code
+                    if code is None:
+                        # 列表只包含元数据时，导出前再从工作簿读取代码
+                        existing_component = self._find_component(component.name)
+                        if existing_component is None:
+                            self.logger.error(f"组件不存在: {component.name}")
+                            return False
+                        code = self._get_component_code(existing_component)
+
                     with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(component.code)
+                        f.write(code)
                     self.logger.info(f"导出组件: {component.name} -> {file_path}")
                 except Exception as e:
                     self.logger.error(f"导出组件失败: {component.name} - {e}")
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Excel工作表与文档模块的对应关系 - 读取 xl/workbook.xml 和各工作表的 codeName
+
+Excel 的文档模块（工作表/工作簿模块）以对象的 codeName 命名：
+工作簿的 codeName 在 workbook.xml 的 workbookPr 上，工作表的在各工作表部件开头的 sheetPr 上。
+读取工作表部件时只解析到根元素的第一个子元素（sheetPr 总在最前面），
+不会解压整个工作表，数百个工作表也只需要一次打开压缩包。
+"""
+import zipfile
+import xml.etree.ElementTree as ET
+from functools import partial
+from typing import Dict, Optional
+from xml.parsers import expat
+
+from core.ooxml_package import relationship_targets
+
+
+SSML_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# expat 使用空格作为命名空间分隔符时 sheetPr 的名称
+SHEET_PR = f"{SSML_NS} sheetPr"
+
+# 文档模块对应工作簿本身时的标签
+WORKBOOK_LABEL = "工作簿"
+
+# 读取工作表部件开头时每次解压的字节数
+HEAD_CHUNK_SIZE = 4096
+
+
+class _FirstChildFound(Exception):
+    """已经读到根元素的第一个子元素，停止解析"""
+    pass
+
+
+def _read_sheet_code_name(zip_file: zipfile.ZipFile, part_name: str) -> Optional[str]:
+    """读取工作表（或图表工作表等）部件中 sheetPr 的 codeName，只解析到根元素的第一个子元素"""
+    parser = expat.ParserCreate(namespace_separator=" ")
+    started = []
+    code_name = []
+
+    def start(name, attrs):
+        if started:
+            if name == SHEET_PR and "codeName" in attrs:
+                code_name.append(attrs["codeName"])
+            raise _FirstChildFound()
+        started.append(name)
+
+    parser.StartElementHandler = start
+    with zip_file.open(part_name) as src:
+        try:
+            for chunk in iter(partial(src.read, HEAD_CHUNK_SIZE), b""):
+                parser.Parse(chunk, False)
+        except _FirstChildFound:
+            pass
+    return code_name[0] if code_name else None
+
+
+def read_code_names(zip_file: zipfile.ZipFile, workbook_part: str) -> Dict[str, str]:
+    """
+    读取工作簿和各工作表的 codeName
+
+    Args:
+        zip_file: 已打开的OOXML包
+        workbook_part: 工作簿部件名称，如 xl/workbook.xml
+
+    Returns:
+        codeName（小写）到标签的映射：工作簿为 "工作簿"，工作表为工作表名称
+    """
+    root = ET.fromstring(zip_file.read(workbook_part))
+    labels: Dict[str, str] = {}
+
+    workbook_pr = root.find(f"{{{SSML_NS}}}workbookPr")
+    if workbook_pr is not None and workbook_pr.get("codeName"):
+        labels[workbook_pr.get("codeName").lower()] = WORKBOOK_LABEL
+
+    targets = relationship_targets(zip_file, workbook_part)
+    names = set(zip_file.namelist())
+    for sheet in root.iterfind(f"{{{SSML_NS}}}sheets/{{{SSML_NS}}}sheet"):
+        part_name = targets.get(sheet.get(f"{{{R_NS}}}id"))
+        if part_name not in names:
+            continue
+        code_name = _read_sheet_code_name(zip_file, part_name)
+        if code_name:
+            labels[code_name.lower()] = sheet.get("name", "")
+    return labels
@@ -2,8 +2,14 @@
 """
 VBA处理器工厂 - 统一管理Word、Excel、PowerPoint的VBA处理器
 """
+import os
+import zipfile
+import xml.etree.ElementTree as ET
 from enum import Enum
-from typing import Optional
+from typing import Optional, Tuple
+
+from core.ole_file import OLE_SIGNATURE, OleFileError, find_root_stream
+from core.ooxml_package import CONTENT_TYPES_NS, CONTENT_TYPES_PART
 
 
 class FileType(Enum):
@@ -13,6 +19,41 @@ class FileType(Enum):
     POWERPOINT = "ppt"
 
 
+class HandlerBackend(Enum):
+    """VBA处理器后端枚举"""
+    COM = "com"          # 通过COM自动化启动Office
+    NATIVE = "native"    # 直接解析文件中的VBA工程，无需Office
+
+
+class ContainerFormat(Enum):
+    """文件实际的容器格式（按文件头判断，与扩展名无关）"""
+    OLE = "ole"          # 97-2003 二进制复合文档（.doc/.xls/.ppt，也包括加密的OOXML）
+    OOXML = "ooxml"      # Office Open XML 压缩包（.docm/.xlsm/.pptm 等）
+    UNKNOWN = "unknown"  # HTML、RTF、文本或损坏的文件，不可能包含VBA工程
+
+
+# 文件头签名
+ZIP_SIGNATURE = b"PK\x03\x04"
+
+# 主文档内容类型（含 ".main"）的前缀 -> 文件类型
+MAIN_CONTENT_TYPE_PREFIXES = (
+    ("application/vnd.openxmlformats-officedocument.wordprocessingml.", FileType.WORD),
+    ("application/vnd.ms-word.", FileType.WORD),
+    ("application/vnd.openxmlformats-officedocument.spreadsheetml.", FileType.EXCEL),
+    ("application/vnd.ms-excel.", FileType.EXCEL),
+    ("application/vnd.openxmlformats-officedocument.presentationml.", FileType.POWERPOINT),
+    ("application/vnd.ms-powerpoint.", FileType.POWERPOINT),
+)
+
+# 97-2003 格式中各应用程序的主流
+OLE_MAIN_STREAMS = (
+    ("WordDocument", FileType.WORD),
+    ("Workbook", FileType.EXCEL),
+    ("Book", FileType.EXCEL),
+    ("PowerPoint Document", FileType.POWERPOINT),
+)
+
+
 class VBAHandlerFactory:
     """VBA处理器工厂类"""
     
@@ -29,35 +70,48 @@ class VBAHandlerFactory:
         FileType.EXCEL: "Excel文件 (*.xlsm *.xls *.xltm *.xlt);;所有文件 (*.*)",
         FileType.POWERPOINT: "PowerPoint文件 (*.pptm *.ppt *.potm *.pot);;所有文件 (*.*)"
     }
+
+    # 原生后端支持的扩展名（OOXML宏文件）
+    NATIVE_EXTENSIONS = ['.docm', '.dotm', '.xlsm', '.xltm', '.pptm', '.potm']
     
     @staticmethod
-    def get_handler(file_type: FileType, use_ui_signal: bool = True):
+    def get_handler(file_type: FileType, use_ui_signal: bool = True,
+                    backend: HandlerBackend = HandlerBackend.COM, isolated: bool = False):
         """
         根据文件类型获取对应的VBA处理器
 
         Args:
             file_type: Office文件类型
             use_ui_signal: 是否使用UI信号（后台线程应设为False）
+            backend: 处理器后端，NATIVE 不启动Office直接解析文件
+            isolated: COM后端是否用 DispatchEx 启动独立的Office进程（批量并行处理时使用）
 
         Returns:
             对应的VBA处理器实例
         """
+        if backend == HandlerBackend.NATIVE:
+            from core.native_handler import NativeVBAHandler
+            return NativeVBAHandler(use_ui_signal=use_ui_signal)
+
         if file_type == FileType.WORD:
             from core.word_handler import WordVBAHandler
-            return WordVBAHandler(use_ui_signal=use_ui_signal)
+            return WordVBAHandler(use_ui_signal=use_ui_signal, isolated=isolated)
         elif file_type == FileType.EXCEL:
             from core.excel_handler import ExcelVBAHandler
-            return ExcelVBAHandler(use_ui_signal=use_ui_signal)
+            return ExcelVBAHandler(use_ui_signal=use_ui_signal, isolated=isolated)
         elif file_type == FileType.POWERPOINT:
             from core.ppt_handler import PowerPointVBAHandler
-            return PowerPointVBAHandler(use_ui_signal=use_ui_signal)
+            return PowerPointVBAHandler(use_ui_signal=use_ui_signal, isolated=isolated)
         else:
             raise ValueError(f"不支持的文件类型: {file_type}")
     
     @staticmethod
     def detect_file_type(file_path: str) -> Optional[FileType]:
         """
-        根据文件路径自动检测文件类型
+        自动检测文件类型
+
+        文件存在时按内容判断（见 sniff_file），扩展名与内容不符时以内容为准；
+        不是Office文档的文件返回None。文件不存在或内容无法区分应用程序时按扩展名判断。
         
         Args:
             file_path: 文件路径
@@ -65,7 +119,13 @@ class VBAHandlerFactory:
         Returns:
             文件类型，如果无法识别则返回None
         """
-        import os
+        if os.path.isfile(file_path):
+            file_type, container = VBAHandlerFactory.sniff_file(file_path)
+            if container == ContainerFormat.UNKNOWN:
+                return None
+            if file_type is not None:
+                return file_type
+
         ext = os.path.splitext(file_path)[1].lower()
         
         if ext in ['.docm', '.doc', '.dotm', '.dot']:
@@ -77,6 +137,80 @@ class VBAHandlerFactory:
         else:
             return None
     
+    @staticmethod
+    def detect_container(file_path: str) -> ContainerFormat:
+        """
+        根据文件头的签名判断容器格式（只读取前8个字节）
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            容器格式
+        """
+        with open(file_path, "rb") as f:
+            header = f.read(len(OLE_SIGNATURE))
+        if header == OLE_SIGNATURE:
+            return ContainerFormat.OLE
+        if header.startswith(ZIP_SIGNATURE):
+            return ContainerFormat.OOXML
+        return ContainerFormat.UNKNOWN
+
+    @staticmethod
+    def sniff_file(file_path: str) -> Tuple[Optional[FileType], ContainerFormat]:
+        """
+        按文件内容判断应用程序和容器格式
+
+        只读取文件头、压缩包中央目录和 [Content_Types].xml，或OLE根存储所在的目录扇区
+        （见 find_root_stream，不加载FAT），不依赖扩展名，也不启动Office。
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            (文件类型, 容器格式)；无法确定应用程序时文件类型为None，
+            文件无法读取时容器格式为 UNKNOWN
+        """
+        try:
+            container = VBAHandlerFactory.detect_container(file_path)
+        except OSError:
+            return None, ContainerFormat.UNKNOWN
+
+        try:
+            if container == ContainerFormat.OOXML:
+                with zipfile.ZipFile(file_path, "r") as zip_file:
+                    return _package_file_type(zip_file), container
+            if container == ContainerFormat.OLE:
+                stream = find_root_stream(file_path, [stream for stream, _ in OLE_MAIN_STREAMS])
+                return dict(OLE_MAIN_STREAMS).get(stream), container
+        except zipfile.BadZipFile:
+            return None, ContainerFormat.UNKNOWN
+        except (OSError, KeyError, ET.ParseError, OleFileError):
+            pass
+        return None, container
+
+    @staticmethod
+    def supports_native(file_path: str) -> bool:
+        """
+        判断文件是否可以使用原生后端处理
+
+        文件存在时按内容判断：OOXML压缩包，以及 Word/Excel/PowerPoint 97-2003 二进制文件（只能读取和导出）；
+        否则按扩展名判断。
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            是否支持原生后端
+        """
+        if os.path.isfile(file_path):
+            file_type, container = VBAHandlerFactory.sniff_file(file_path)
+            if container == ContainerFormat.OLE:
+                return file_type is not None
+            return container == ContainerFormat.OOXML
+        ext = os.path.splitext(file_path)[1].lower()
+        return ext in VBAHandlerFactory.NATIVE_EXTENSIONS
+    
     @staticmethod
     def get_file_filter(file_type: FileType) -> str:
         """
@@ -111,3 +245,16 @@ class VBAHandlerFactory:
             FileType.POWERPOINT: "PowerPoint"
         }
         return names.get(file_type, "未知")
+
+
+def _package_file_type(zip_file: zipfile.ZipFile) -> Optional[FileType]:
+    """根据 [Content_Types].xml 中主文档部件的内容类型判断文件类型"""
+    root = ET.fromstring(zip_file.read(CONTENT_TYPES_PART))
+    for override in root.iter(f"{{{CONTENT_TYPES_NS}}}Override"):
+        content_type = override.get("ContentType", "")
+        if ".main" not in content_type:
+            continue
+        for prefix, file_type in MAIN_CONTENT_TYPE_PREFIXES:
+            if content_type.startswith(prefix):
+                return file_type
+    return None
@@ -0,0 +1,545 @@
+# -*- coding: utf-8 -*-
+"""
+原生VBA处理程序 - 不启动Office，直接解析 .docm/.xlsm/.pptm 中的 vbaProject.bin
+
+也可以读取 97-2003 二进制文件中的VBA工程：.doc/.xls 在 Macros、_VBA_PROJECT_CUR 存储中，
+.ppt 在 PowerPoint Document 流中压缩保存（见 ppt_document），结构都与 vbaProject.bin 相同；
+这类文件只支持列出和导出组件，写入仍需通过COM后端。
+"""
+import os
+import mmap
+import shutil
+import logging
+import tempfile
+import zipfile
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from core.ole_file import OleFile
+from core.vba_component import VBAComponent, read_source_file
+from core.vba_project import VBAProject, VBAModuleInfo, VBAProjectError
+from core.vba_writer import VBAProjectWriter, HOST_WORD, HOST_EXCEL, HOST_POWERPOINT
+from core.vba_builder import MAIN_PART_FOLDER_HOSTS
+from core.handler_factory import ContainerFormat, VBAHandlerFactory
+from core.triage import find_legacy_vba_storage
+from core.ppt_document import PPT_DOCUMENT_STREAM, PPTDocument
+from core.excel_sheets import read_code_names
+from core.ooxml_package import find_vba_part, find_main_part, set_vba_project
+from core.ooxml_pipeline import PipelineStage, run_pipeline
+from core.vba_sanitizer import VBARemovalStage, macro_free_path
+from core.doc_properties import PropertyScrubStage
+from core.bookmarks import BookmarkPurgeStage
+from core.watermarks import WatermarkRemovalStage
+from core.protection import ProtectionRemovalStage
+
+
+# 超过该大小的 vbaProject.bin 解压到临时文件并通过 mmap 访问
+MMAP_THRESHOLD = 1 << 20
+
+# 97-2003 格式中VBA工程存储（小写）-> 宿主应用程序
+LEGACY_STORAGE_HOSTS = {
+    "macros": HOST_WORD,
+    "_vba_project_cur": HOST_EXCEL,
+}
+
+# PROJECT 流中的模块声明与组件类型的对应关系
+PROJECT_KIND_TYPE_MAP = {
+    "module": VBAComponent.TYPE_MODULE,
+    "class": VBAComponent.TYPE_CLASS,
+    "baseclass": VBAComponent.TYPE_USERFORM,
+    "document": VBAComponent.TYPE_DOCUMENT,
+}
+
+
+class NativeVBAHandler:
+    """原生VBA处理程序类，接口与 WordVBAHandler 等COM处理器保持一致"""
+
+    def __init__(self, use_ui_signal=True):
+        self.file_path = None
+        self.host = None
+        self.vba_part_name = None
+        self.ole = None
+        self.vba_project = None
+        self.container = None
+        self.logger = logging.getLogger(__name__)
+        self._temp_file = None
+        self._file_stamp = None
+        self._code_names = None
+
+    def initialize(self) -> bool:
+        """原生处理器无需启动Office"""
+        return True
+
+    def open_file(self, file_path: str) -> bool:
+        """
+        打开Office文件并解析VBA工程
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            是否成功打开（文件不包含VBA工程时也返回True，此时 vba_project 为None）
+        """
+        try:
+            if not os.path.exists(file_path):
+                self.logger.error(f"文件不存在: {file_path}")
+                return False
+
+            self.close_file()
+            self.file_path = os.path.abspath(file_path)
+            stat = os.stat(self.file_path)
+            self._file_stamp = (stat.st_mtime_ns, stat.st_size)
+
+            self.container = VBAHandlerFactory.detect_container(self.file_path)
+            if self.container == ContainerFormat.OLE:
+                return self._open_legacy_file()
+            if self.container != ContainerFormat.OOXML:
+                self.logger.error(f"不是Office文档: {file_path}")
+                return False
+
+            with zipfile.ZipFile(self.file_path, "r") as zip_file:
+                main_part = find_main_part(zip_file)
+                self.host = MAIN_PART_FOLDER_HOSTS.get(main_part.split("/", 1)[0].lower())
+                info = find_vba_part(zip_file)
+                if info is None:
+                    self.logger.info("文档不包含VBA工程")
+                    return True
+                self.vba_part_name = info.filename
+                self.ole = self._open_vba_part(zip_file, info)
+
+            self.vba_project = VBAProject(self.ole)
+            self.logger.info(f"成功解析VBA工程: {file_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"打开失败: {e}")
+            self.close_file()
+            return False
+
+    def _open_legacy_file(self) -> bool:
+        """打开97-2003二进制文件，解析 Macros（Word）或 _VBA_PROJECT_CUR（Excel）存储中的VBA工程"""
+        self.ole = OleFile.open(self.file_path)
+        storage = find_legacy_vba_storage(self.ole)
+        if storage is None:
+            if self.ole.exists(PPT_DOCUMENT_STREAM):
+                return self._open_legacy_presentation()
+            self.logger.info("文档不包含VBA工程")
+            return True
+
+        self.host = LEGACY_STORAGE_HOSTS.get(storage.name.lower())
+        self.vba_project = VBAProject(self.ole, storage.name)
+        self.logger.info(f"成功解析VBA工程: {self.file_path}")
+        return True
+
+    def _open_legacy_presentation(self) -> bool:
+        """PowerPoint 97-2003：解压 PowerPoint Document 流中保存VBA工程的复合文件"""
+        self.host = HOST_POWERPOINT
+        document = PPTDocument(self.ole)
+        offset = document.find_vba_storage()
+        if offset is None:
+            self.logger.info("文档不包含VBA工程")
+            return True
+
+        vba_data = document.read_vba_storage(offset)
+        # 释放对 mmap 的引用后再关闭演示文稿本身
+        del document
+        self.ole.close()
+        self.ole = OleFile(vba_data)
+        self.vba_project = VBAProject(self.ole)
+        self.logger.info(f"成功解析VBA工程: {self.file_path}")
+        return True
+
+    def _open_vba_part(self, zip_file: zipfile.ZipFile, info: zipfile.ZipInfo) -> OleFile:
+        """
+        读取 vbaProject.bin
+
+        较小的部件直接读入内存，较大的部件解压到临时文件后通过 mmap 按扇区访问。
+        """
+        if info.file_size <= MMAP_THRESHOLD:
+            return OleFile(zip_file.read(info))
+
+        self._temp_file = tempfile.TemporaryFile()
+        with zip_file.open(info) as src:
+            shutil.copyfileobj(src, self._temp_file, 1 << 16)
+        self._temp_file.flush()
+        mm = mmap.mmap(self._temp_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return OleFile(mm)
+
+    # 与COM处理器保持一致的打开/关闭接口
+    open_document = open_file
+    open_workbook = open_file
+    open_presentation = open_file
+
+    def close_file(self):
+        """关闭文件并释放资源"""
+        self.vba_project = None
+        self.host = None
+        self.vba_part_name = None
+        self.container = None
+        if self.ole is not None:
+            self.ole.close()
+            self.ole = None
+        if self._temp_file is not None:
+            self._temp_file.close()
+            self._temp_file = None
+        self._file_stamp = None
+        self._code_names = None
+
+    close_document = close_file
+    close_workbook = close_file
+    close_presentation = close_file
+
+    def quit(self):
+        """释放资源（没有需要退出的应用程序）"""
+        self.close_file()
+
+    @property
+    def writable(self) -> bool:
+        """是否支持原生写入（只支持OOXML包，97-2003 二进制文件只读）"""
+        return self.container == ContainerFormat.OOXML
+
+    def _check_writable(self) -> bool:
+        """写入前检查，不能写入时记录错误"""
+        if not self.file_path:
+            self.logger.error("没有打开的文件")
+            return False
+        if not self.writable:
+            self.logger.error("97-2003 格式的文件不支持原生写入，请使用Office处理")
+            return False
+        return True
+
+    def get_vba_components(self) -> List[VBAComponent]:
+        """
+        获取文件中所有VBA组件（代码在首次访问时解压）
+
+        Returns:
+            VBA组件列表
+        """
+        return self.list_components(metadata_only=False)
+
+    def list_components(self, metadata_only: bool = True) -> List[VBAComponent]:
+        """
+        列出文件中的VBA组件
+
+        Args:
+            metadata_only: 为True时只使用打开时解析的 dir/PROJECT 流，不读取模块源码（code 为None）；
+                为False时组件的代码延迟加载，访问时才解压并放入共享源码缓存。
+                两种方式都会标出文档模块对应的Excel工作表并检查是否为空（最多解压一个块）
+
+        Returns:
+            VBA组件列表
+        """
+        components = []
+
+        try:
+            if not self.vba_project:
+                self.logger.warning("没有打开的VBA工程")
+                return components
+
+            host_objects = self._host_objects()
+            for module in self.vba_project.modules:
+                try:
+                    component_type = self._get_component_type(module)
+                    if metadata_only:
+                        vba_component = VBAComponent(
+                            name=module.name,
+                            component_type=component_type,
+                            code=None
+                        )
+                    else:
+                        vba_component = VBAComponent(
+                            name=module.name,
+                            component_type=component_type,
+                            loader=partial(self._load_source, self.file_path, self._file_stamp, module.name),
+                            cache_key=("native", self.file_path) + self._file_stamp + (module.name.lower(),)
+                        )
+                    if component_type == VBAComponent.TYPE_DOCUMENT:
+                        vba_component.host_object = host_objects.get(module.name.lower())
+                        vba_component.is_empty = self.vba_project.is_module_empty(module)
+                    components.append(vba_component)
+                    self.logger.debug(f"发现VBA组件: {vba_component}")
+                except Exception as e:
+                    self.logger.warning(f"读取组件时出错: {module.name} - {e}")
+
+        except Exception as e:
+            self.logger.error(f"获取VBA组件失败: {e}")
+
+        return components
+
+    def _host_objects(self) -> Dict[str, str]:
+        """Excel文档模块的 codeName（小写）到工作表名称的映射，首次使用时读取一次压缩包"""
+        if self._code_names is None:
+            self._code_names = {}
+            if self.host == HOST_EXCEL and self.container == ContainerFormat.OOXML:
+                try:
+                    with zipfile.ZipFile(self.file_path, "r") as zip_file:
+                        self._code_names = read_code_names(zip_file, find_main_part(zip_file))
+                except Exception as e:
+                    self.logger.warning(f"读取工作表codeName失败: {e}")
+        return self._code_names
+
+    def _load_source(self, file_path: str, file_stamp: Optional[Tuple[int, int]], name: str) -> str:
+        """
+        读取模块源码，供延迟加载的组件使用
+
+        文件仍以同一版本（修改时间、大小）打开时直接解压；处理器已关闭、打开了其他文件
+        或文件已被重写时临时打开原文件读取，版本与 file_stamp 不一致时抛出异常，
+        避免把其他版本的源码放进以 file_stamp 为键的缓存。
+        """
+        if self.vba_project and self.file_path == file_path and self._file_stamp == file_stamp:
+            module = self.vba_project.get_module(name)
+            if module is None:
+                raise VBAProjectError(f"模块不存在: {name}")
+            return self.vba_project.read_module_source(module)
+        return read_component_source(file_path, name, file_stamp)
+
+    def _get_component_type(self, module: VBAModuleInfo) -> str:
+        """根据 dir 流的模块类型和 PROJECT 流的声明确定组件类型"""
+        if module.procedural:
+            return VBAComponent.TYPE_MODULE
+        return PROJECT_KIND_TYPE_MAP.get(module.project_kind, VBAComponent.TYPE_CLASS)
+
+    def export_vba(self, folder: str, components: List[VBAComponent]) -> bool:
+        """
+        导出VBA组件到文件夹
+
+        Args:
+            folder: 目标文件夹路径
+            components: 要导出的组件列表
+
+        Returns:
+            是否导出成功
+        """
+        try:
+            # 确保目标文件夹存在
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+                self.logger.info(f"创建目标文件夹: {folder}")
+
+            # 遍历组件并导出
+            for component in components:
+                file_path = os.path.join(folder, component.file_name)
+                try:
+                    code = component.code
+                    if code is None:
+                        # 列表只包含元数据时，导出前再解压模块源码
+                        module = self.vba_project.get_module(component.name) if self.vba_project else None
+                        if module is None:
+                            self.logger.error(f"组件不存在: {component.name}")
+                            return False
+                        code = self.vba_project.read_module_source(module)
+
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        f.write(code)
+                    self.logger.info(f"导出组件: {component.name} -> {file_path}")
+                except Exception as e:
+                    self.logger.error(f"导出组件失败: {component.name} - {e}")
+                    return False
+
+            self.logger.info(f"成功导出 {len(components)} 个组件")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"导出VBA失败: {e}")
+            return False
+
+    def can_import(self, components: List[VBAComponent]) -> bool:
+        """
+        判断组件能否通过原生方式导入（不支持新建窗体，97-2003 格式的文件只读）
+
+        Args:
+            components: 要导入的组件列表
+
+        Returns:
+            所有组件都能原生写入时返回True
+        """
+        if not self.writable or not self.host:
+            return False
+        for component in components:
+            exists = self.vba_project and self.vba_project.get_module(component.name)
+            if not exists and component.component_type == VBAComponent.TYPE_USERFORM:
+                return False
+        return True
+
+    def _create_writer(self) -> VBAProjectWriter:
+        """基于当前VBA工程创建写入器，文档没有VBA工程时新建一个"""
+        if self.vba_project:
+            return VBAProjectWriter(self.vba_project, host=self.host)
+        return VBAProjectWriter(host=self.host)
+
+    def _save_vba_project(self, writer: VBAProjectWriter):
+        """生成新的 vbaProject.bin 写回文档，并重新打开以刷新工程信息"""
+        vba_data = writer.to_bytes()
+        file_path = self.file_path
+        self.close_file()
+        set_vba_project(file_path, vba_data)
+        self.logger.info("文档已保存")
+        self.open_file(file_path)
+
+    def import_vba(self, folder: str, components: List[VBAComponent]) -> bool:
+        """
+        从文件夹导入VBA组件到文档（原生重写VBA工程，无需Office）
+
+        Args:
+            folder: 源文件夹路径
+            components: 要导入的组件列表
+
+        Returns:
+            是否导入成功
+        """
+        try:
+            if not self._check_writable():
+                return False
+
+            writer = self._create_writer()
+            imported = 0
+            for component in components:
+                file_path = os.path.join(folder, component.file_name)
+                if not os.path.exists(file_path):
+                    self.logger.warning(f"文件不存在: {file_path}")
+                    continue
+
+                code = read_source_file(file_path)
+                try:
+                    if writer.has_module(component.name):
+                        writer.replace_module_source(component.name, code)
+                        self.logger.info(f"更新组件: {component.name}")
+                    else:
+                        writer.add_module(component.name, component.component_type, code)
+                        self.logger.info(f"添加组件: {component.name}")
+                    imported += 1
+                except VBAProjectError as e:
+                    self.logger.error(f"导入组件失败: {component.name} - {e}")
+                    return False
+
+            if imported == 0:
+                self.logger.warning("没有需要导入的组件")
+                return True
+
+            self._save_vba_project(writer)
+            self.logger.info(f"成功导入 {imported} 个组件")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"导入VBA失败: {e}")
+            return False
+
+    def remove_components(self, names: List[str]) -> bool:
+        """
+        删除指定的VBA组件（文档模块不能删除，只清空代码）
+
+        Args:
+            names: 组件名称列表
+
+        Returns:
+            是否删除成功
+        """
+        try:
+            if not self._check_writable():
+                return False
+            if not self.vba_project:
+                self.logger.error("没有打开的VBA工程")
+                return False
+
+            writer = VBAProjectWriter(self.vba_project, host=self.host)
+            for name in names:
+                module = self.vba_project.get_module(name)
+                if module is None:
+                    self.logger.warning(f"组件不存在: {name}")
+                elif self._get_component_type(module) == VBAComponent.TYPE_DOCUMENT:
+                    writer.replace_module_source(name, "")
+                    self.logger.info(f"清空文档模块: {name}")
+                else:
+                    writer.remove_module(name)
+                    self.logger.info(f"删除组件: {name}")
+
+            self._save_vba_project(writer)
+            return True
+
+        except Exception as e:
+            self.logger.error(f"删除VBA组件失败: {e}")
+            return False
+
+    @staticmethod
+    def _cleanup_stages() -> List[PipelineStage]:
+        """清除锁定信息的管道阶段（与 COM 后端的 _clear_document_properties 对应）"""
+        return [PropertyScrubStage(), BookmarkPurgeStage(), WatermarkRemovalStage(), ProtectionRemovalStage()]
+
+    def _run_stages(self, stages: List[PipelineStage], output_path: str):
+        """关闭文件，用一次压缩包重写执行全部阶段并记录结果，然后打开输出文件"""
+        file_path = self.file_path
+        self.close_file()
+        run_pipeline(file_path, stages, output_path)
+        for stage in stages:
+            for line in stage.summary():
+                self.logger.info(line)
+        self.open_file(output_path)
+
+    def remove_all_vba(self, convert: bool = False) -> bool:
+        """
+        删除整个VBA工程（vbaProject.bin、vbaData.xml 及其关系）并清除文档属性等锁定信息
+
+        VBA工程、属性、书签、水印和保护在同一次压缩包重写中处理，文档模块不会残留。
+
+        Args:
+            convert: 是否同时转换为不含宏的格式，转换后 file_path 指向新文件
+
+        Returns:
+            是否清除成功
+        """
+        try:
+            if not self._check_writable():
+                return False
+
+            count = len(self.vba_project.modules) if self.vba_project else 0
+            output_path = macro_free_path(self.file_path) if convert else self.file_path
+            self._run_stages([VBARemovalStage(convert)] + self._cleanup_stages(), output_path)
+            self.logger.info(f"已删除VBA工程（{count} 个组件）: {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"清除VBA失败: {e}")
+            return False
+
+    def clear_document_properties_only(self) -> bool:
+        """
+        清除文档属性（docProps 下的内置属性和全部自定义属性）、锁定信息书签、页眉水印和文档保护
+
+        所有改动在同一次压缩包重写中完成；保护元素直接删除，不需要尝试密码。
+
+        Returns:
+            是否清除成功
+        """
+        try:
+            if not self._check_writable():
+                return False
+
+            self._run_stages(self._cleanup_stages(), self.file_path)
+            return True
+
+        except Exception as e:
+            self.logger.error(f"清除属性失败: {e}")
+            return False
+
+
+def read_component_source(file_path: str, name: str, file_stamp: Optional[Tuple[int, int]] = None) -> str:
+    """
+    打开文件读取单个模块的源码后立即关闭
+
+    Args:
+        file_path: Office文件路径
+        name: 模块名称
+        file_stamp: 期望的文件版本 (修改时间, 大小)，文件已被修改时抛出 VBAProjectError；None 表示不检查
+
+    Returns:
+        模块源码
+    """
+    handler = NativeVBAHandler(use_ui_signal=False)
+    try:
+        if not handler.open_file(file_path) or not handler.vba_project:
+            raise VBAProjectError(f"无法读取VBA工程: {file_path}")
+        if file_stamp is not None and handler._file_stamp != file_stamp:
+            raise VBAProjectError(f"文件在列出组件后已被修改，请重新读取: {file_path}")
+        return handler._load_source(handler.file_path, handler._file_stamp, name)
+    finally:
+        handler.quit()
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+Office批量处理 - 多个独立Office进程并行导入/清除VBA
+
+win32com.client.Dispatch 会连接到已运行的同一个Office实例，多个线程同时使用也只能逐个文档处理。
+IsolatedOfficePool 启动固定数量的工作线程，每个线程是一个单线程套间，
+用 DispatchEx（handler 的 isolated 模式）启动自己的Office进程，文档之间互不阻塞：
+
+- 记录每个工作线程的Office进程ID（process_ids）：启动实例时比较前后的进程，
+  启动过程互斥，新增的进程就是本次启动的实例；无法确定时再使用 handler.process_id()
+- 设置 task_timeout 时由监视线程检查，任务超时就终止该进程；
+  卡住的COM调用随之返回错误，工作线程在下一个任务前重新启动实例
+- 任务开始前检查实例是否仍可用，已退出或被关闭的实例同样重新启动
+"""
+import os
+import queue
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from core.handler_factory import FileType, VBAHandlerFactory
+from core.com_executor import open_office_file, close_office_file
+from core.office_pool import is_app_alive, quit_app
+from core.vba_component import scan_vba_folder
+
+
+logger = logging.getLogger(__name__)
+
+# 监视线程检查任务超时的间隔（秒）
+WATCHDOG_INTERVAL = 1.0
+
+# 各类型Office的进程映像名称（小写）
+OFFICE_PROCESS_NAMES = {
+    FileType.WORD: "winword.exe",
+    FileType.EXCEL: "excel.exe",
+    FileType.POWERPOINT: "powerpnt.exe",
+}
+
+# 启动独立实例时互斥，保证启动前后新增的进程只属于本次启动
+_launch_lock = threading.Lock()
+
+
+class _Worker:
+    """一个工作线程的状态"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pid: Optional[int] = None
+        self.task_started: Optional[float] = None
+        self.killed = False
+
+
+def office_process_ids(file_type: FileType) -> Set[int]:
+    """
+    当前运行的该类型Office进程ID
+
+    无权访问的进程（其他用户的进程）跳过，进程无法枚举时返回空集合。
+    """
+    import win32api
+    import win32con
+    import win32process
+    name = OFFICE_PROCESS_NAMES[file_type]
+    pids = set()
+    try:
+        all_pids = win32process.EnumProcesses()
+    except Exception as e:
+        logger.debug(f"枚举进程失败: {e}")
+        return pids
+    for pid in all_pids:
+        try:
+            handle = win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ,
+                                          False, pid)
+        except Exception:
+            continue
+        try:
+            if os.path.basename(win32process.GetModuleFileNameEx(handle, 0)).lower() == name:
+                pids.add(pid)
+        except Exception:
+            pass
+        finally:
+            win32api.CloseHandle(handle)
+    return pids
+
+
+def kill_process(pid: int) -> bool:
+    """用 TerminateProcess 终止进程，返回是否成功"""
+    import win32api
+    import win32con
+    try:
+        handle = win32api.OpenProcess(win32con.PROCESS_TERMINATE, False, pid)
+    except Exception as e:
+        logger.warning(f"终止进程失败: {pid} - {e}")
+        return False
+    try:
+        win32api.TerminateProcess(handle, 1)
+        return True
+    except Exception as e:
+        logger.warning(f"终止进程失败: {pid} - {e}")
+        return False
+    finally:
+        win32api.CloseHandle(handle)
+
+
+class IsolatedOfficePool:
+    """
+    独立Office进程的工作线程池
+
+    Args:
+        file_type: Office文件类型
+        max_workers: 同时运行的Office进程数，默认为CPU核心数
+        task_timeout: 单个任务的超时时间（秒），超时后终止并替换该Office进程；None 表示不限制
+    """
+
+    def __init__(self, file_type: FileType, max_workers: Optional[int] = None,
+                 task_timeout: Optional[float] = None):
+        self.file_type = file_type
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.task_timeout = task_timeout
+        self._queue = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watchdog = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    @property
+    def process_ids(self) -> Dict[str, Optional[int]]:
+        """各工作线程当前Office进程的ID"""
+        with self._lock:
+            return {worker.name: worker.pid for worker in self._workers}
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        提交任务
+
+        Args:
+            fn: 任务函数，第一个参数为绑定到该线程Office实例的处理器（未打开文档），
+                任务负责打开和关闭自己的文档
+
+        Returns:
+            任务的 Future
+        """
+        future = Future()
+        with self._lock:
+            if self._stopped.is_set():
+                raise RuntimeError("Office进程池已关闭")
+            if len(self._threads) < self.max_workers:
+                self._start_worker()
+            self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def _start_worker(self):
+        """启动一个工作线程（调用方持有锁）"""
+        worker = _Worker(f"Office-{len(self._workers) + 1}")
+        thread = threading.Thread(target=self._run, args=(worker,), name=worker.name, daemon=True)
+        self._workers.append(worker)
+        self._threads.append(thread)
+        thread.start()
+        if self.task_timeout and self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name="Office-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def _launch(self, worker: _Worker):
+        """为工作线程启动独立的Office进程，返回处理器，失败时返回None"""
+        handler = VBAHandlerFactory.get_handler(self.file_type, use_ui_signal=False, isolated=True)
+        with _launch_lock:
+            before = office_process_ids(self.file_type)
+            if not handler.launch():
+                return None
+            started = office_process_ids(self.file_type) - before
+        if not handler.owns_app:
+            # 连接到了用户已打开的PowerPoint（单实例），不能终止
+            pid = None
+        else:
+            # 其他程序同时启动了同类进程时无法区分，改为从实例获取
+            pid = started.pop() if len(started) == 1 else handler.process_id()
+        if pid is None and self.task_timeout:
+            logger.warning(f"{worker.name} 无法获取Office进程ID，任务超时时无法终止该进程")
+        with self._lock:
+            worker.pid = pid
+            worker.killed = False
+        logger.info(f"{worker.name} 已启动Office进程: {pid}")
+        return handler
+
+    def _run(self, worker: _Worker):
+        """工作线程主循环：每个线程是独立的单线程套间"""
+        import pythoncom
+        pythoncom.CoInitialize()
+        handler = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                future, fn, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                if handler is not None and (worker.killed or not is_app_alive(handler.application)):
+                    logger.warning(f"{worker.name} 的Office进程已失效，重新启动")
+                    handler = None
+                if handler is None:
+                    handler = self._launch(worker)
+                    if handler is None:
+                        future.set_exception(RuntimeError("Office应用程序启动失败"))
+                        continue
+
+                with self._lock:
+                    worker.task_started = time.monotonic()
+                try:
+                    future.set_result(fn(handler, *args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+                finally:
+                    with self._lock:
+                        worker.task_started = None
+        finally:
+            if handler is not None and not worker.killed and handler.owns_app:
+                quit_app(handler.application, self.file_type, handler.session_profile)
+            handler = None
+            with self._lock:
+                worker.pid = None
+            pythoncom.CoUninitialize()
+
+    def _watch(self):
+        """监视线程：终止任务超时的Office进程"""
+        while not self._stopped.wait(WATCHDOG_INTERVAL):
+            now = time.monotonic()
+            with self._lock:
+                stuck = [worker for worker in self._workers
+                         if worker.task_started is not None and not worker.killed and worker.pid
+                         and now - worker.task_started > self.task_timeout]
+                for worker in stuck:
+                    worker.killed = True
+            for worker in stuck:
+                logger.warning(f"{worker.name} 任务超过 {self.task_timeout} 秒，终止Office进程: {worker.pid}")
+                kill_process(worker.pid)
+
+    def shutdown(self, wait: bool = True):
+        """
+        关闭进程池：已提交的任务执行完后退出各工作线程的Office进程
+
+        Args:
+            wait: 是否等待工作线程结束
+        """
+        with self._lock:
+            if self._stopped.is_set():
+                return
+            self._stopped.set()
+            threads = list(self._threads)
+            for _ in threads:
+                self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+def _import_task(handler, file_type: FileType, office_file: str, vba_folder: str) -> bool:
+    """进程池任务：把文件夹中的全部组件导入文档"""
+    if not open_office_file(handler, file_type, office_file):
+        return False
+    try:
+        return handler.import_vba(vba_folder, scan_vba_folder(vba_folder))
+    finally:
+        close_office_file(handler, file_type)
+
+
+def _remove_task(handler, file_type: FileType, office_file: str) -> bool:
+    """进程池任务：清除VBA和文档属性（没有VBA代码时只清除属性）"""
+    if not open_office_file(handler, file_type, office_file):
+        return False
+    try:
+        if handler.list_components(metadata_only=True):
+            return handler.remove_all_vba()
+        return handler.clear_document_properties_only()
+    finally:
+        close_office_file(handler, file_type)
+
+
+def _collect(futures: List[Future], paths: List[str], action: str) -> List[bool]:
+    """按提交顺序收集结果，任务异常时记录日志并视为失败"""
+    results = []
+    for future, path in zip(futures, paths):
+        try:
+            results.append(bool(future.result()))
+        except Exception as e:
+            logger.error(f"{action}失败: {path} - {e}")
+            results.append(False)
+    return results
+
+
+def import_vba_files(file_type: FileType, jobs: List[Tuple[str, str]], max_workers: Optional[int] = None,
+                     task_timeout: Optional[float] = None) -> List[bool]:
+    """
+    使用多个独立Office进程批量导入VBA
+
+    Args:
+        file_type: Office文件类型
+        jobs: (Office文件路径, VBA源码文件夹) 列表
+        max_workers: 同时运行的Office进程数，默认为CPU核心数
+        task_timeout: 单个文档的超时时间（秒），超时的Office进程会被终止并替换
+
+    Returns:
+        与 jobs 顺序一致的导入结果
+    """
+    with IsolatedOfficePool(file_type, max_workers, task_timeout) as pool:
+        futures = [pool.submit(_import_task, file_type, office_file, vba_folder)
+                   for office_file, vba_folder in jobs]
+        return _collect(futures, [office_file for office_file, _ in jobs], "导入VBA")
+
+
+def remove_vba_files(file_type: FileType, file_paths: List[str], max_workers: Optional[int] = None,
+                     task_timeout: Optional[float] = None) -> List[bool]:
+    """
+    使用多个独立Office进程批量清除VBA和文档属性
+
+    Args:
+        file_type: Office文件类型
+        file_paths: Office文件路径列表
+        max_workers: 同时运行的Office进程数，默认为CPU核心数
+        task_timeout: 单个文档的超时时间（秒），超时的Office进程会被终止并替换
+
+    Returns:
+        与 file_paths 顺序一致的清除结果
+    """
+    with IsolatedOfficePool(file_type, max_workers, task_timeout) as pool:
+        futures = [pool.submit(_remove_task, file_type, file_path) for file_path in file_paths]
+        return _collect(futures, file_paths, "清除VBA")
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Office应用程序池 - 为每个工作线程保留已启动的 Word/Excel/PowerPoint 实例
+
+刷新、导出、导入、清除原来各自启动并退出一次Office，连续操作时每次都要等待应用程序启动。
+应用程序池让处理器绑定到已启动的实例（handler.attach），处理器 quit() 时只断开引用，
+应用程序保持运行，之后的操作只需要打开文档的时间。
+
+池中的实例用 DispatchEx 启动（isolated），不会连接用户已打开的 Word/Excel；
+PowerPoint 只有一个实例，用户已打开时仍会连接，这种实例池只借用，不修改设置，也不退出。
+
+COM对象不能跨线程（单线程套间）使用，因此实例按线程保存：
+- acquire() 在调用线程中初始化COM，取出或启动实例，实例失效（进程已退出或被关闭）时重新启动
+- prelaunch() 预先启动实例（界面切换文件类型时），第一次操作时无需等待启动
+- release_idle() 退出空闲超过 IDLE_TIMEOUT 的实例，预启动后一直没有使用的实例不会常驻
+- release_thread() 在线程结束前退出该线程启动的全部实例（先恢复启动时修改的设置）并反初始化COM
+- shutdown() 在程序退出时调用，退出调用线程中的实例；实例只能由启动它的线程退出，
+  不会从其他线程重新连接（重新连接可能启动新实例，也拿不到原来的设置）
+"""
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from core.handler_factory import FileType, VBAHandlerFactory
+from core.office_profile import SessionProfile
+
+
+logger = logging.getLogger(__name__)
+
+# 实例空闲多久后退出（秒）
+IDLE_TIMEOUT = 300
+
+
+def is_app_alive(app) -> bool:
+    """应用程序实例是否仍可用（进程退出后访问任何属性都会抛出COM错误）"""
+    try:
+        app.Name
+        return True
+    except Exception:
+        return False
+
+
+def quit_app(app, file_type: FileType, profile: Optional[SessionProfile] = None):
+    """退出应用程序实例（先恢复启动时修改的设置），实例已失效时忽略错误"""
+    name = VBAHandlerFactory.get_file_type_name(file_type)
+    try:
+        if profile is not None:
+            profile.restore()
+        app.Quit()
+        logger.info(f"{name}应用程序已退出")
+    except Exception as e:
+        logger.debug(f"退出{name}应用程序时出错: {e}")
+
+
+class _PoolEntry:
+    """池中的一个实例、启动时修改的设置、是否由池启动及其最后使用时间"""
+
+    def __init__(self, app, profile: Optional[SessionProfile] = None, owned: bool = True):
+        self.app = app
+        self.profile = profile
+        self.owned = owned
+        self.last_used = time.monotonic()
+
+    def release(self, file_type: FileType):
+        """退出池启动的实例；连接到的用户实例只断开引用"""
+        if self.owned:
+            quit_app(self.app, file_type, self.profile)
+        self.app = None
+
+
+class OfficePool:
+    """按线程保存已启动Office应用程序的池"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # 线程ID -> 该线程的实例表，线程调用 release_thread 后移除
+        self._threads: Dict[int, Dict[FileType, _PoolEntry]] = {}
+
+    def _thread_apps(self) -> Dict[FileType, _PoolEntry]:
+        """调用线程的实例表，首次使用时初始化该线程的COM"""
+        apps = getattr(self._local, "apps", None)
+        if apps is None:
+            import pythoncom
+            pythoncom.CoInitialize()
+            apps = self._local.apps = {}
+            with self._lock:
+                self._threads[threading.get_ident()] = apps
+        return apps
+
+    def acquire(self, file_type: FileType):
+        """
+        获取绑定到已启动应用程序的处理器
+
+        用完后照常调用 close_* 和 quit()，quit() 只断开引用，应用程序留在池中。
+
+        Args:
+            file_type: Office文件类型
+
+        Returns:
+            COM处理器，应用程序启动失败时返回None
+        """
+        handler = VBAHandlerFactory.get_handler(file_type, use_ui_signal=False, isolated=True)
+        apps = self._thread_apps()
+        entry = apps.get(file_type)
+        if entry is not None and not is_app_alive(entry.app):
+            name = VBAHandlerFactory.get_file_type_name(file_type)
+            logger.warning(f"{name}应用程序实例已失效，重新启动")
+            del apps[file_type]
+            entry = None
+
+        if entry is None:
+            if not handler.launch():
+                return None
+            entry = apps[file_type] = _PoolEntry(handler.application, handler.session_profile, handler.owns_app)
+
+        entry.last_used = time.monotonic()
+        handler.attach(entry.app)
+        return handler
+
+    def prelaunch(self, file_type: FileType) -> bool:
+        """
+        在调用线程中预先启动应用程序（已启动时只刷新使用时间）
+
+        Args:
+            file_type: Office文件类型
+
+        Returns:
+            应用程序是否已就绪
+        """
+        handler = self.acquire(file_type)
+        if handler is None:
+            return False
+        handler.quit()
+        return True
+
+    def touch(self, file_type: FileType):
+        """记录调用线程的实例刚被使用过（关闭文档时调用），空闲时间从此刻开始计算"""
+        entry = getattr(self._local, "apps", {}).get(file_type)
+        if entry is not None:
+            entry.last_used = time.monotonic()
+
+    def release_idle(self, timeout: float = IDLE_TIMEOUT):
+        """
+        退出调用线程中空闲超过 timeout 秒的实例（调用时实例不能有打开的文档）
+
+        Args:
+            timeout: 空闲时间（秒）
+        """
+        apps = getattr(self._local, "apps", None)
+        if not apps:
+            return
+        now = time.monotonic()
+        for file_type, entry in list(apps.items()):
+            if now - entry.last_used < timeout:
+                continue
+            del apps[file_type]
+            name = VBAHandlerFactory.get_file_type_name(file_type)
+            logger.info(f"{name}应用程序空闲超过 {int(timeout)} 秒，退出")
+            entry.release(file_type)
+
+    def release_thread(self):
+        """
+        退出调用线程中的全部实例并反初始化COM（线程结束前调用）
+
+        COM对象只能在创建它的线程中使用，因此每个使用过池的线程都要在结束前自己调用。
+        """
+        apps = getattr(self._local, "apps", None)
+        if apps is None:
+            return
+        for file_type, entry in apps.items():
+            entry.release(file_type)
+        apps.clear()
+        del self._local.apps
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+        import pythoncom
+        pythoncom.CoUninitialize()
+
+    def shutdown(self):
+        """
+        程序退出时调用：退出调用线程中的实例
+
+        其他线程的实例由各线程在 release_thread 中退出（如 ComExecutor 结束时），
+        应先等待这些线程结束；仍未释放的实例只记录警告。
+        """
+        self.release_thread()
+        with self._lock:
+            remaining = {ident: len(apps) for ident, apps in self._threads.items() if apps}
+        for ident, count in remaining.items():
+            logger.warning(f"线程 {ident} 仍持有 {count} 个Office实例，将在该线程结束时退出")
+
+
+_shared_pool = OfficePool()
+
+
+def get_office_pool() -> OfficePool:
+    """获取界面各工作线程共享的Office应用程序池"""
+    return _shared_pool
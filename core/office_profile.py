@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Office会话设置 - 处理期间临时关闭影响打开/保存速度的功能，结束时恢复原值
+
+各处理器启动应用程序后关闭屏幕刷新、输入时检查、后台重新分页、事件和自动重算等，
+并断开COM加载项（加载项会响应每次打开和保存）。其中一些是持久保存的用户选项，
+因此每项修改都记录原值，退出应用程序或关闭文档前按相反顺序恢复。
+
+Dispatch 会连接用户已打开的实例（PowerPoint 只有一个实例，DispatchEx 也会连接），
+处理器启动前用 is_app_running 判断，连接到用户的实例时不修改设置，也不退出该实例。
+"""
+import logging
+from typing import List, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_app_running(prog_id: str) -> bool:
+    """是否已有该Office应用程序的实例在运行（已注册到运行对象表，调用线程需已初始化COM）"""
+    try:
+        import win32com.client
+        win32com.client.GetActiveObject(prog_id)
+        return True
+    except Exception:
+        return False
+
+
+class SessionProfile:
+    """记录会话期间修改过的Office设置"""
+
+    def __init__(self):
+        self._changes: List[Tuple[object, str, object]] = []
+
+    def set(self, obj, attr: str, value) -> bool:
+        """
+        修改一项设置并记录原值（值相同时不记录）
+
+        Returns:
+            是否修改成功，应用程序不支持该设置时返回False
+        """
+        try:
+            original = getattr(obj, attr)
+            if original != value:
+                setattr(obj, attr, value)
+                self._changes.append((obj, attr, original))
+            return True
+        except Exception as e:
+            logger.debug(f"修改设置失败: {attr} - {e}")
+            return False
+
+    def set_items(self, collection, attr: str, value):
+        """修改集合（如 AddIns、COMAddIns）中每一项的设置"""
+        try:
+            count = collection.Count
+        except Exception as e:
+            logger.debug(f"读取集合失败: {e}")
+            return
+        for index in range(1, count + 1):
+            try:
+                item = collection.Item(index)
+            except Exception as e:
+                logger.debug(f"读取集合项失败: {index} - {e}")
+                continue
+            self.set(item, attr, value)
+
+    def disconnect_com_addins(self, app):
+        """断开全部已连接的COM加载项"""
+        try:
+            addins = app.COMAddIns
+        except Exception as e:
+            logger.debug(f"读取COM加载项失败: {e}")
+            return
+        self.set_items(addins, "Connect", False)
+
+    def restore(self):
+        """按相反顺序恢复全部设置（应用程序已退出时忽略错误）"""
+        while self._changes:
+            obj, attr, original = self._changes.pop()
+            try:
+                setattr(obj, attr, original)
+            except Exception as e:
+                logger.debug(f"恢复设置失败: {attr} - {e}")
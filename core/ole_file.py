@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+"""
+OLE复合文档读取器 - 纯Python解析 vbaProject.bin / .doc / .xls 等复合文件
+
+扇区访问基于 mmap/memoryview，读取流时不会复制整个文件；
+扇区连续的流直接返回 memoryview 切片。
+"""
+import os
+import mmap
+import struct
+from typing import BinaryIO, Dict, List, Optional, Sequence, Union
+
+
+# 复合文件签名
+OLE_SIGNATURE = b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1"
+
+# 特殊扇区编号
+MAXREGSECT = 0xFFFFFFFA
+DIFSECT = 0xFFFFFFFC
+FATSECT = 0xFFFFFFFD
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+NOSTREAM = 0xFFFFFFFF
+
+# 目录项类型
+STGTY_EMPTY = 0
+STGTY_STORAGE = 1
+STGTY_STREAM = 2
+STGTY_ROOT = 5
+
+
+class OleFileError(Exception):
+    """复合文件格式错误"""
+    pass
+
+
+class OleDirEntry:
+    """复合文件目录项（存储或流）"""
+
+    def __init__(self, sid: int, name: str, entry_type: int, left: int, right: int,
+                 child: int, clsid: bytes, start: int, size: int):
+        self.sid = sid
+        self.name = name
+        self.entry_type = entry_type
+        self.left = left
+        self.right = right
+        self.child = child
+        self.clsid = clsid
+        self.start = start
+        self.size = size
+        self.children: Dict[str, "OleDirEntry"] = {}
+
+    @property
+    def is_storage(self) -> bool:
+        return self.entry_type in (STGTY_STORAGE, STGTY_ROOT)
+
+    @property
+    def is_stream(self) -> bool:
+        return self.entry_type == STGTY_STREAM
+
+    def __repr__(self):
+        return f"OleDirEntry(name='{self.name}', type={self.entry_type}, size={self.size})"
+
+
+class OleFile:
+    """
+    复合文件（Compound File Binary）只读访问
+
+    数据源可以是 bytes、memoryview 或 mmap；通过 open() 打开磁盘文件时使用 mmap。
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        self._mmap = data if isinstance(data, mmap.mmap) else None
+        self._file = None
+        self._buf = memoryview(data)
+        if len(self._buf) < 512 or self._buf[:8] != OLE_SIGNATURE:
+            raise OleFileError("不是有效的OLE复合文件")
+
+        self._parse_header()
+        self._load_fat()
+        self._load_directory()
+        self._minifat: Optional[List[int]] = None
+        self._ministream: Optional[Union[bytes, memoryview]] = None
+
+    @classmethod
+    def open(cls, file_path: str) -> "OleFile":
+        """以 mmap 方式打开磁盘上的复合文件"""
+        f = open(file_path, "rb")
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+        try:
+            ole = cls(mm)
+        except Exception:
+            mm.close()
+            f.close()
+            raise
+        ole._file = f
+        return ole
+
+    @classmethod
+    def from_fileobj(cls, fileobj) -> "OleFile":
+        """
+        从文件对象打开复合文件
+
+        真实文件（有 fileno）使用 mmap，其余情况读入内存。
+        """
+        try:
+            fileno = fileobj.fileno()
+        except (AttributeError, OSError, ValueError):
+            fileno = None
+
+        if fileno is not None:
+            fileobj.flush()
+            if os.fstat(fileno).st_size > 0:
+                mm = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+                try:
+                    ole = cls(mm)
+                except Exception:
+                    mm.close()
+                    raise
+                ole._file = fileobj
+                return ole
+
+        fileobj.seek(0)
+        return cls(fileobj.read())
+
+    def close(self):
+        """释放 mmap 和文件句柄"""
+        ministream = self._ministream
+        self._ministream = None
+        if isinstance(ministream, memoryview):
+            ministream.release()
+        try:
+            self._buf.release()
+        except (BufferError, ValueError):
+            pass
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # 仍有外部 memoryview 引用，留给垃圾回收
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 头部与分配表
+    # ------------------------------------------------------------------
+
+    def _parse_header(self):
+        """解析512字节文件头"""
+        header = self._buf[:512]
+        (self.minor_version, self.major_version, byte_order,
+         self.sector_shift, self.mini_sector_shift) = struct.unpack_from("<HHHHH", header, 0x18)
+        if byte_order != 0xFFFE:
+            raise OleFileError("不支持的字节序")
+        if self.sector_shift not in (9, 12):
+            raise OleFileError(f"不支持的扇区大小: 2^{self.sector_shift}")
+
+        (self.num_dir_sectors, self.num_fat_sectors, self.first_dir_sector,
+         _transaction, self.mini_stream_cutoff, self.first_minifat_sector,
+         self.num_minifat_sectors, self.first_difat_sector,
+         self.num_difat_sectors) = struct.unpack_from("<IIIIIIIII", header, 0x28)
+
+        self.sector_size = 1 << self.sector_shift
+        self.mini_sector_size = 1 << self.mini_sector_shift
+        self._difat_head = list(struct.unpack_from("<109I", header, 0x4C))
+
+    def _sector(self, sector_id: int) -> memoryview:
+        """获取扇区数据（零拷贝）"""
+        start = (sector_id + 1) << self.sector_shift
+        end = start + self.sector_size
+        if end > len(self._buf):
+            # 文件末尾的扇区可能被截断
+            if start >= len(self._buf):
+                raise OleFileError(f"扇区越界: {sector_id}")
+            end = len(self._buf)
+        return self._buf[start:end]
+
+    def _unpack_sector_ids(self, sector: memoryview) -> List[int]:
+        count = len(sector) // 4
+        return list(struct.unpack_from(f"<{count}I", sector, 0))
+
+    def _load_fat(self):
+        """读取 DIFAT 并加载 FAT"""
+        fat_sectors = [s for s in self._difat_head if s <= MAXREGSECT]
+
+        sector_id = self.first_difat_sector
+        per_sector = self.sector_size // 4 - 1
+        visited = set()
+        while sector_id <= MAXREGSECT and len(visited) < self.num_difat_sectors:
+            if sector_id in visited:
+                raise OleFileError("DIFAT 链存在循环")
+            visited.add(sector_id)
+            ids = self._unpack_sector_ids(self._sector(sector_id))
+            fat_sectors.extend(s for s in ids[:per_sector] if s <= MAXREGSECT)
+            sector_id = ids[per_sector]
+
+        fat_sectors = fat_sectors[:self.num_fat_sectors]
+        self._fat: List[int] = []
+        for sector_id in fat_sectors:
+            self._fat.extend(self._unpack_sector_ids(self._sector(sector_id)))
+
+    def _chain(self, start: int, fat: List[int]) -> List[int]:
+        """沿分配表获取扇区链"""
+        chain = []
+        sector_id = start
+        limit = len(fat)
+        while sector_id <= MAXREGSECT:
+            if sector_id >= limit or len(chain) > limit:
+                raise OleFileError("扇区链损坏")
+            chain.append(sector_id)
+            sector_id = fat[sector_id]
+        return chain
+
+    def _read_chain(self, start: int, size: Optional[int] = None) -> Union[bytes, memoryview]:
+        """
+        读取普通扇区链
+
+        连续扇区合并为一个区段；只有一个区段时返回 memoryview 切片，不复制数据。
+        """
+        chain = self._chain(start, self._fat)
+        if size is None:
+            size = len(chain) << self.sector_shift
+        if size == 0 or not chain:
+            return b""
+
+        runs = []
+        run_start = chain[0]
+        run_len = 1
+        for sector_id in chain[1:]:
+            if sector_id == run_start + run_len:
+                run_len += 1
+            else:
+                runs.append((run_start, run_len))
+                run_start, run_len = sector_id, 1
+        runs.append((run_start, run_len))
+
+        pieces = []
+        remaining = size
+        for run_start, run_len in runs:
+            begin = (run_start + 1) << self.sector_shift
+            length = min(run_len << self.sector_shift, remaining, len(self._buf) - begin)
+            pieces.append(self._buf[begin:begin + length])
+            remaining -= length
+            if remaining <= 0:
+                break
+
+        if len(pieces) == 1:
+            return pieces[0]
+        return b"".join(pieces)
+
+    # ------------------------------------------------------------------
+    # 目录
+    # ------------------------------------------------------------------
+
+    def _load_directory(self):
+        """加载目录项并建立存储树"""
+        dir_data = self._read_chain(self.first_dir_sector)
+        self.entries: List[Optional[OleDirEntry]] = []
+        for sid in range(len(dir_data) // 128):
+            raw = dir_data[sid * 128:(sid + 1) * 128]
+            name_len = struct.unpack_from("<H", raw, 64)[0]
+            entry_type = raw[66]
+            if entry_type == STGTY_EMPTY or name_len < 2:
+                self.entries.append(None)
+                continue
+            name = bytes(raw[:min(name_len, 64) - 2]).decode("utf-16-le", errors="replace")
+            left, right, child = struct.unpack_from("<III", raw, 68)
+            clsid = bytes(raw[80:96])
+            start = struct.unpack_from("<I", raw, 116)[0]
+            size = struct.unpack_from("<Q", raw, 120)[0]
+            if self.major_version == 3:
+                size &= 0xFFFFFFFF
+            self.entries.append(OleDirEntry(sid, name, entry_type, left, right, child,
+                                            clsid, start, size))
+
+        if not self.entries or self.entries[0] is None:
+            raise OleFileError("缺少根目录项")
+        self.root = self.entries[0]
+        self._build_tree(self.root, set())
+
+    def _build_tree(self, storage: OleDirEntry, visited: set):
+        """遍历红黑树，收集每个存储的子项"""
+        stack = [storage.child]
+        while stack:
+            sid = stack.pop()
+            if sid == NOSTREAM or sid >= len(self.entries):
+                continue
+            if sid in visited:
+                raise OleFileError("目录树存在循环")
+            visited.add(sid)
+            entry = self.entries[sid]
+            if entry is None:
+                continue
+            storage.children[entry.name.lower()] = entry
+            stack.append(entry.left)
+            stack.append(entry.right)
+            if entry.is_storage:
+                self._build_tree(entry, visited)
+
+    def get_entry(self, path: str) -> Optional[OleDirEntry]:
+        """
+        按路径查找目录项（名称不区分大小写）
+
+        Args:
+            path: 以 '/' 分隔的路径，例如 'VBA/dir'
+
+        Returns:
+            目录项，不存在时返回None
+        """
+        entry = self.root
+        for part in [p for p in path.split("/") if p]:
+            if not entry.is_storage:
+                return None
+            entry = entry.children.get(part.lower())
+            if entry is None:
+                return None
+        return entry
+
+    def exists(self, path: str) -> bool:
+        """判断路径是否存在"""
+        return self.get_entry(path) is not None
+
+    def listdir(self, path: str = "") -> List[str]:
+        """列出存储下的子项名称"""
+        entry = self.get_entry(path)
+        if entry is None or not entry.is_storage:
+            return []
+        return [child.name for child in entry.children.values()]
+
+    # ------------------------------------------------------------------
+    # 流读取
+    # ------------------------------------------------------------------
+
+    def _load_minifat(self):
+        if self._minifat is not None:
+            return
+        self._minifat = []
+        if self.first_minifat_sector <= MAXREGSECT:
+            data = self._read_chain(self.first_minifat_sector)
+            self._minifat = list(struct.unpack_from(f"<{len(data) // 4}I", data, 0))
+        self._ministream = self._read_chain(self.root.start, self.root.size) \
+            if self.root.start <= MAXREGSECT else b""
+
+    def _read_mini_chain(self, start: int, size: int) -> Union[bytes, memoryview]:
+        self._load_minifat()
+        chain = self._chain(start, self._minifat)
+        shift = self.mini_sector_shift
+        ministream = memoryview(self._ministream)
+        if not chain:
+            return b""
+
+        # 连续的小扇区直接切片
+        if chain[-1] - chain[0] == len(chain) - 1:
+            begin = chain[0] << shift
+            return ministream[begin:begin + size]
+
+        pieces = []
+        remaining = size
+        for sector_id in chain:
+            begin = sector_id << shift
+            length = min(self.mini_sector_size, remaining)
+            pieces.append(ministream[begin:begin + length])
+            remaining -= length
+            if remaining <= 0:
+                break
+        return b"".join(pieces)
+
+    def open_stream(self, path: str) -> Union[bytes, memoryview]:
+        """
+        读取流数据
+
+        Args:
+            path: 流路径，例如 'VBA/dir'
+
+        Returns:
+            流内容；扇区连续时为 memoryview（零拷贝），否则为 bytes
+        """
+        entry = self.get_entry(path)
+        if entry is None or not entry.is_stream:
+            raise OleFileError(f"流不存在: {path}")
+        return self.read_entry(entry)
+
+    def read_entry(self, entry: OleDirEntry) -> Union[bytes, memoryview]:
+        """读取目录项对应的流数据"""
+        if entry.size == 0:
+            return b""
+        if entry.size < self.mini_stream_cutoff:
+            return self._read_mini_chain(entry.start, entry.size)
+        return self._read_chain(entry.start, entry.size)
+
+    def read_stream(self, path: str) -> bytes:
+        """读取流数据并复制为 bytes"""
+        return bytes(self.open_stream(path))
+
+
+class _DirectoryReader:
+    """
+    按需读取磁盘上复合文件的目录，不加载整个FAT
+
+    只读取文件头、目录链经过的扇区，以及定位下一个目录扇区所需的单个FAT项
+    （FAT超过109个扇区时再读取对应的DIFAT扇区）。
+    """
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        header = f.read(512)
+        if len(header) < 512 or header[:8] != OLE_SIGNATURE:
+            raise OleFileError("不是有效的OLE复合文件")
+        self.major_version, _byte_order, self.sector_shift = struct.unpack_from("<HHH", header, 0x1A)
+        if self.sector_shift not in (9, 12):
+            raise OleFileError(f"不支持的扇区大小: 2^{self.sector_shift}")
+        (self.num_fat_sectors, self.first_dir_sector, _transaction, _cutoff, _minifat,
+         _num_minifat, self.first_difat_sector) = struct.unpack_from("<IIIIIII", header, 0x2C)
+        self.sector_size = 1 << self.sector_shift
+        self._difat = list(struct.unpack_from("<109I", header, 0x4C))
+        self._next_difat = self.first_difat_sector
+        self.max_sectors = os.fstat(f.fileno()).st_size >> self.sector_shift
+
+    def read_sector(self, sector_id: int, offset: int = 0, size: Optional[int] = None) -> bytes:
+        size = self.sector_size - offset if size is None else size
+        if sector_id > MAXREGSECT or sector_id >= self.max_sectors:
+            raise OleFileError(f"扇区越界: {sector_id}")
+        self._f.seek(((sector_id + 1) << self.sector_shift) + offset)
+        data = self._f.read(size)
+        if len(data) < size:
+            raise OleFileError(f"扇区越界: {sector_id}")
+        return data
+
+    def _fat_sector(self, index: int) -> int:
+        """第 index 个FAT扇区的编号，超出文件头的109项时沿DIFAT链读取"""
+        per_sector = self.sector_size // 4 - 1
+        while index >= len(self._difat):
+            if self._next_difat > MAXREGSECT or len(self._difat) >= self.num_fat_sectors:
+                raise OleFileError("DIFAT 链损坏")
+            ids = struct.unpack(f"<{per_sector + 1}I", self.read_sector(self._next_difat))
+            self._difat.extend(ids[:per_sector])
+            self._next_difat = ids[per_sector]
+        return self._difat[index]
+
+    def next_sector(self, sector_id: int) -> int:
+        """FAT中该扇区的下一个扇区"""
+        index, position = divmod(sector_id, self.sector_size // 4)
+        if index >= self.num_fat_sectors:
+            raise OleFileError("扇区链损坏")
+        data = self.read_sector(self._fat_sector(index), position * 4, 4)
+        return struct.unpack("<I", data)[0]
+
+
+class OleDirectory:
+    """
+    按需读取的复合文件目录，不映射整个文件也不加载FAT
+
+    目录项在第一次访问时才沿目录链读取所在的扇区（见 _DirectoryReader），存储的子项在第一次访问时
+    遍历红黑树得到。提供与 OleFile 相同的 root、get_entry 和 exists，但不能读取流数据；
+    只需要判断存储或流是否存在（以及目录中记录的大小）时使用，一般只需读取几KB。
+
+    Args:
+        f: 以二进制方式打开的磁盘文件，使用期间保持打开
+    """
+
+    def __init__(self, f: BinaryIO):
+        self._reader = _DirectoryReader(f)
+        self._per_sector = self._reader.sector_size // 128
+        self._dir_sectors: List[int] = []
+        self._chain_end = False
+        self._entries: Dict[int, Optional[OleDirEntry]] = {}
+        self._expanded = set()
+        root = self.entry(0)
+        if root is None or root.entry_type != STGTY_ROOT:
+            raise OleFileError("缺少根目录项")
+        self.root = root
+
+    def _load_dir_sector(self) -> bool:
+        """读取目录链上的下一个扇区，链已结束时返回False"""
+        if self._chain_end:
+            return False
+        reader = self._reader
+        sector_id = reader.next_sector(self._dir_sectors[-1]) if self._dir_sectors else reader.first_dir_sector
+        if sector_id > MAXREGSECT:
+            self._chain_end = True
+            return False
+        if sector_id in self._dir_sectors or len(self._dir_sectors) > reader.max_sectors:
+            raise OleFileError("目录链存在循环")
+        data = reader.read_sector(sector_id)
+        base = len(self._dir_sectors) * self._per_sector
+        self._dir_sectors.append(sector_id)
+        for index in range(self._per_sector):
+            raw = data[index * 128:(index + 1) * 128]
+            name_len = struct.unpack_from("<H", raw, 64)[0]
+            entry_type = raw[66]
+            if entry_type == STGTY_EMPTY or name_len < 2:
+                self._entries[base + index] = None
+                continue
+            name = raw[:min(name_len, 64) - 2].decode("utf-16-le", errors="replace")
+            left, right, child = struct.unpack_from("<III", raw, 68)
+            start = struct.unpack_from("<I", raw, 116)[0]
+            size = struct.unpack_from("<Q", raw, 120)[0]
+            if reader.major_version == 3:
+                size &= 0xFFFFFFFF
+            self._entries[base + index] = OleDirEntry(base + index, name, entry_type, left, right, child,
+                                                      bytes(raw[80:96]), start, size)
+        return True
+
+    def entry(self, sid: int) -> Optional[OleDirEntry]:
+        """按编号获取目录项，不存在或为空项时返回None"""
+        if sid > MAXREGSECT:
+            return None
+        while sid not in self._entries:
+            if not self._load_dir_sector():
+                return None
+        return self._entries[sid]
+
+    def children(self, storage: OleDirEntry) -> Dict[str, OleDirEntry]:
+        """存储的子项（名称小写 -> 目录项），第一次访问时读取"""
+        if storage.sid in self._expanded:
+            return storage.children
+        stack = [storage.child]
+        visited = set()
+        while stack:
+            sid = stack.pop()
+            if sid > MAXREGSECT:
+                continue
+            if sid in visited:
+                raise OleFileError("目录树存在循环")
+            visited.add(sid)
+            entry = self.entry(sid)
+            if entry is None:
+                continue
+            storage.children[entry.name.lower()] = entry
+            stack.append(entry.left)
+            stack.append(entry.right)
+        self._expanded.add(storage.sid)
+        return storage.children
+
+    def get_entry(self, path: str) -> Optional[OleDirEntry]:
+        """按路径查找目录项（名称不区分大小写），不存在时返回None"""
+        entry = self.root
+        for part in [p for p in path.split("/") if p]:
+            if not entry.is_storage:
+                return None
+            entry = self.children(entry).get(part.lower())
+            if entry is None:
+                return None
+        return entry
+
+    def exists(self, path: str) -> bool:
+        """判断路径是否存在"""
+        return self.get_entry(path) is not None
+
+
+def find_root_stream(file_path: str, names: Sequence[str]) -> Optional[str]:
+    """
+    查找根存储下存在的流（用于按内容判断 .doc/.xls/.ppt 的应用程序）
+
+    通过 OleDirectory 只读取根存储子项所在的目录扇区，根存储的子项通常位于第一个目录扇区中。
+
+    Args:
+        file_path: 文件路径
+        names: 候选流名称（不区分大小写），同时存在多个时按顺序优先
+
+    Returns:
+        根存储下第一个存在的候选流名称（names 中的写法），都不存在时返回None
+    """
+    with open(file_path, "rb") as f:
+        directory = OleDirectory(f)
+        children = directory.children(directory.root)
+    for name in names:
+        entry = children.get(name.lower())
+        if entry is not None and entry.is_stream:
+            return name
+    return None
+
+
+def is_ole_file(data: bytes) -> bool:
+    """根据文件头判断是否为OLE复合文件"""
+    return data[:8] == OLE_SIGNATURE
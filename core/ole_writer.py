@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+OLE复合文档写入器 - 根据存储/流树生成复合文件（版本3，512字节扇区）
+"""
+import struct
+from typing import Dict, List, Optional, Union
+
+from core.ole_file import (
+    OLE_SIGNATURE, DIFSECT, FATSECT, ENDOFCHAIN, FREESECT, NOSTREAM,
+    STGTY_STORAGE, STGTY_STREAM, STGTY_ROOT, OleFile, OleDirEntry
+)
+
+
+SECTOR_SIZE = 512
+MINI_SECTOR_SIZE = 64
+MINI_STREAM_CUTOFF = 4096
+HEADER_DIFAT_COUNT = 109
+IDS_PER_SECTOR = SECTOR_SIZE // 4
+
+StreamData = Union[bytes, bytearray, memoryview]
+
+
+class OleStorage:
+    """复合文件中的存储节点，子项为 OleStorage 或流数据"""
+
+    def __init__(self, name: str = "Root Entry", clsid: bytes = b"\x00" * 16):
+        self.name = name
+        self.clsid = clsid
+        self.children: Dict[str, Union["OleStorage", StreamData]] = {}
+
+    def _split(self, path: str):
+        parts = [p for p in path.split("/") if p]
+        if not parts:
+            raise ValueError("路径不能为空")
+        return parts[:-1], parts[-1]
+
+    def _find_key(self, name: str) -> Optional[str]:
+        for key in self.children:
+            if key.lower() == name.lower():
+                return key
+        return None
+
+    def storage(self, path: str, create: bool = False) -> Optional["OleStorage"]:
+        """按路径获取子存储，create=True 时自动创建"""
+        node = self
+        for part in [p for p in path.split("/") if p]:
+            key = node._find_key(part)
+            if key is None:
+                if not create:
+                    return None
+                child = OleStorage(part)
+                node.children[part] = child
+                node = child
+                continue
+            child = node.children[key]
+            if not isinstance(child, OleStorage):
+                return None
+            node = child
+        return node
+
+    def get_stream(self, path: str) -> Optional[StreamData]:
+        """按路径读取流数据"""
+        parents, name = self._split(path)
+        node = self.storage("/".join(parents))
+        if node is None:
+            return None
+        key = node._find_key(name)
+        if key is None or isinstance(node.children[key], OleStorage):
+            return None
+        return node.children[key]
+
+    def set_stream(self, path: str, data: StreamData):
+        """写入流数据（同名项保持原有名称大小写）"""
+        parents, name = self._split(path)
+        node = self.storage("/".join(parents), create=True)
+        key = node._find_key(name) or name
+        node.children[key] = data
+
+    def remove(self, path: str) -> bool:
+        """删除流或存储"""
+        parents, name = self._split(path)
+        node = self.storage("/".join(parents))
+        if node is None:
+            return False
+        key = node._find_key(name)
+        if key is None:
+            return False
+        del node.children[key]
+        return True
+
+    @classmethod
+    def from_ole(cls, ole: OleFile, path: str = "") -> "OleStorage":
+        """
+        从已打开的复合文件构建存储树
+
+        流数据保持为 OleFile 返回的 memoryview/bytes，写出前不会额外复制。
+        """
+        entry = ole.get_entry(path)
+        if entry is None or not entry.is_storage:
+            raise ValueError(f"存储不存在: {path}")
+        return cls._from_entry(ole, entry)
+
+    @classmethod
+    def _from_entry(cls, ole: OleFile, entry: OleDirEntry) -> "OleStorage":
+        node = cls(entry.name, entry.clsid)
+        for child in entry.children.values():
+            if child.is_storage:
+                node.children[child.name] = cls._from_entry(ole, child)
+            elif child.is_stream:
+                node.children[child.name] = ole.read_entry(child)
+        return node
+
+
+def _sort_key(name: str):
+    """复合文件目录的排序规则：先比较长度，再比较大写形式"""
+    return len(name), name.upper()
+
+
+class _Entry:
+    def __init__(self, name: str, entry_type: int, clsid: bytes = b"\x00" * 16,
+                 data: StreamData = b""):
+        self.name = name
+        self.entry_type = entry_type
+        self.clsid = clsid
+        self.data = data
+        self.left = NOSTREAM
+        self.right = NOSTREAM
+        self.child = NOSTREAM
+        self.start = ENDOFCHAIN
+        self.size = 0
+
+
+def _sectors_for(size: int, sector_size: int) -> int:
+    return (size + sector_size - 1) // sector_size
+
+
+class OleWriter:
+    """将 OleStorage 树序列化为复合文件"""
+
+    def __init__(self, root: OleStorage):
+        self.root = root
+        self.entries: List[_Entry] = []
+
+    def _collect(self, storage: OleStorage, entry_type: int) -> int:
+        """递归生成目录项并构建平衡二叉树，返回该存储对应的SID"""
+        sid = len(self.entries)
+        entry = _Entry(storage.name, entry_type, storage.clsid)
+        self.entries.append(entry)
+
+        child_sids = []
+        for name in sorted(storage.children, key=_sort_key):
+            if len(name) > 31:
+                raise ValueError(f"名称过长: {name}")
+            value = storage.children[name]
+            if isinstance(value, OleStorage):
+                child_sids.append(self._collect(value, STGTY_STORAGE))
+            else:
+                child_sids.append(len(self.entries))
+                self.entries.append(_Entry(name, STGTY_STREAM, data=value))
+        entry.child = self._link(child_sids)
+        return sid
+
+    def _link(self, sids: List[int]) -> int:
+        """用有序的兄弟节点构建平衡二叉树，返回树根SID"""
+        if not sids:
+            return NOSTREAM
+        middle = len(sids) // 2
+        node = self.entries[sids[middle]]
+        node.left = self._link(sids[:middle])
+        node.right = self._link(sids[middle + 1:])
+        return sids[middle]
+
+    def to_bytes(self) -> bytes:
+        """生成复合文件数据"""
+        self.entries = []
+        self._collect(self.root, STGTY_ROOT)
+
+        # 小于 4096 字节的流放入迷你流
+        mini_parts = []
+        minifat: List[int] = []
+        for entry in self.entries[1:]:
+            if entry.entry_type != STGTY_STREAM:
+                continue
+            size = len(entry.data)
+            entry.size = size
+            if size == 0 or size >= MINI_STREAM_CUTOFF:
+                continue
+            count = _sectors_for(size, MINI_SECTOR_SIZE)
+            entry.start = len(minifat)
+            minifat.extend(range(entry.start + 1, entry.start + count))
+            minifat.append(ENDOFCHAIN)
+            mini_parts.append(bytes(entry.data))
+            mini_parts.append(b"\x00" * (count * MINI_SECTOR_SIZE - size))
+        ministream = b"".join(mini_parts)
+
+        # 按顺序排布普通扇区：大流、迷你流、迷你FAT、目录
+        fat: List[int] = []
+        body: List[StreamData] = []
+
+        def allocate(data: StreamData) -> int:
+            count = _sectors_for(len(data), SECTOR_SIZE)
+            if count == 0:
+                return ENDOFCHAIN
+            start = len(fat)
+            fat.extend(range(start + 1, start + count))
+            fat.append(ENDOFCHAIN)
+            body.append(data)
+            padding = count * SECTOR_SIZE - len(data)
+            if padding:
+                body.append(b"\x00" * padding)
+            return start
+
+        for entry in self.entries[1:]:
+            if entry.entry_type == STGTY_STREAM and entry.size >= MINI_STREAM_CUTOFF:
+                entry.start = allocate(entry.data)
+
+        root = self.entries[0]
+        root.size = len(ministream)
+        root.start = allocate(ministream)
+
+        minifat_bytes = b""
+        if minifat:
+            minifat += [FREESECT] * (-len(minifat) % IDS_PER_SECTOR)
+            minifat_bytes = struct.pack(f"<{len(minifat)}I", *minifat)
+        first_minifat = allocate(minifat_bytes)
+        num_minifat = _sectors_for(len(minifat_bytes), SECTOR_SIZE)
+
+        dir_bytes = self._directory_bytes()
+        first_dir = allocate(dir_bytes)
+
+        # 计算FAT和DIFAT扇区数（二者自身也占用FAT项）
+        data_sectors = len(fat)
+        num_fat = 1
+        while True:
+            num_difat = max(0, _sectors_for(num_fat - HEADER_DIFAT_COUNT, IDS_PER_SECTOR - 1))
+            needed = _sectors_for(data_sectors + num_fat + num_difat, IDS_PER_SECTOR)
+            if needed <= num_fat:
+                break
+            num_fat = needed
+
+        fat_sectors = list(range(data_sectors, data_sectors + num_fat))
+        difat_sectors = list(range(data_sectors + num_fat, data_sectors + num_fat + num_difat))
+        fat.extend([FATSECT] * num_fat)
+        fat.extend([DIFSECT] * num_difat)
+        fat += [FREESECT] * (num_fat * IDS_PER_SECTOR - len(fat))
+
+        header = self._header(first_dir, num_fat, first_minifat, num_minifat,
+                              fat_sectors, difat_sectors)
+
+        parts = [header]
+        parts.extend(body)
+        parts.append(struct.pack(f"<{len(fat)}I", *fat))
+        parts.append(self._difat_bytes(fat_sectors, difat_sectors))
+        return b"".join(parts)
+
+    def _directory_bytes(self) -> bytes:
+        parts = []
+        for entry in self.entries:
+            name = entry.name.encode("utf-16-le")
+            raw = bytearray(128)
+            raw[0:len(name)] = name
+            struct.pack_into("<HBB", raw, 64, len(name) + 2, entry.entry_type, 1)
+            struct.pack_into("<III", raw, 68, entry.left, entry.right, entry.child)
+            raw[80:96] = entry.clsid
+            start = entry.start if entry.entry_type != STGTY_STORAGE else 0
+            size = entry.size if entry.entry_type != STGTY_STORAGE else 0
+            struct.pack_into("<IQ", raw, 116, start, size)
+            parts.append(bytes(raw))
+
+        # 目录扇区用空目录项补齐
+        empty = bytearray(128)
+        struct.pack_into("<III", empty, 68, NOSTREAM, NOSTREAM, NOSTREAM)
+        per_sector = SECTOR_SIZE // 128
+        parts.extend([bytes(empty)] * (-len(self.entries) % per_sector))
+        return b"".join(parts)
+
+    def _header(self, first_dir: int, num_fat: int, first_minifat: int, num_minifat: int,
+                fat_sectors: List[int], difat_sectors: List[int]) -> bytes:
+        header = bytearray(SECTOR_SIZE)
+        header[0:8] = OLE_SIGNATURE
+        struct.pack_into("<HHHHH", header, 0x18, 0x003E, 0x0003, 0xFFFE, 9, 6)
+        struct.pack_into("<IIIIIIIII", header, 0x28,
+                         0, num_fat, first_dir, 0, MINI_STREAM_CUTOFF,
+                         first_minifat, num_minifat,
+                         difat_sectors[0] if difat_sectors else ENDOFCHAIN,
+                         len(difat_sectors))
+        head = fat_sectors[:HEADER_DIFAT_COUNT]
+        head += [FREESECT] * (HEADER_DIFAT_COUNT - len(head))
+        struct.pack_into(f"<{HEADER_DIFAT_COUNT}I", header, 0x4C, *head)
+        return bytes(header)
+
+    def _difat_bytes(self, fat_sectors: List[int], difat_sectors: List[int]) -> bytes:
+        remaining = fat_sectors[HEADER_DIFAT_COUNT:]
+        parts = []
+        per_sector = IDS_PER_SECTOR - 1
+        for index, _ in enumerate(difat_sectors):
+            ids = remaining[index * per_sector:(index + 1) * per_sector]
+            ids += [FREESECT] * (per_sector - len(ids))
+            next_sector = difat_sectors[index + 1] if index + 1 < len(difat_sectors) else ENDOFCHAIN
+            parts.append(struct.pack(f"<{IDS_PER_SECTOR}I", *(ids + [next_sector])))
+        return b"".join(parts)
+
+
+def write_ole(root: OleStorage) -> bytes:
+    """将存储树序列化为复合文件数据"""
+    return OleWriter(root).to_bytes()
@@ -0,0 +1,541 @@
+# -*- coding: utf-8 -*-
+"""
+OOXML包操作 - 替换 .docm/.xlsm/.pptm 压缩包中的部件，写入VBA工程
+"""
+import os
+import re
+import posixpath
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+# 包中的固定部件
+CONTENT_TYPES_PART = "[Content_Types].xml"
+ROOT_RELS_PART = "_rels/.rels"
+
+# OOXML 命名空间
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+RELATIONSHIPS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# 关系类型
+OFFICE_DOCUMENT_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+VBA_PROJECT_REL_TYPE = "http://schemas.microsoft.com/office/2006/relationships/vbaProject"
+
+# VBA工程部件的文件名和内容类型
+VBA_PART_NAME = "vbaProject.bin"
+VBA_PROJECT_CONTENT_TYPE = "application/vnd.ms-office.vbaProject"
+
+# 主文档部件的内容类型：普通格式 -> 启用宏的格式
+MACRO_ENABLED_CONTENT_TYPES = {
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml":
+        "application/vnd.ms-word.document.macroEnabled.main+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml":
+        "application/vnd.ms-word.template.macroEnabledTemplate.main+xml",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml":
+        "application/vnd.ms-excel.sheet.macroEnabled.main+xml",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml":
+        "application/vnd.ms-excel.template.macroEnabled.main+xml",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml":
+        "application/vnd.ms-powerpoint.presentation.macroEnabled.main+xml",
+    "application/vnd.openxmlformats-officedocument.presentationml.template.main+xml":
+        "application/vnd.ms-powerpoint.template.macroEnabled.main+xml",
+}
+
+# 新建部件XML的声明（与Office生成的一致）
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+
+# 本地文件头：签名和固定长度部分（文件名和扩展字段长度在最后两个字段）
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+LOCAL_HEADER_STRUCT = struct.Struct("<4s5H3L2H")
+
+# 中央目录项和目录结束记录
+CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+CENTRAL_HEADER_STRUCT = struct.Struct("<4s6H3L5H2L")
+END_RECORD_SIGNATURE = b"PK\x05\x06"
+END_RECORD_STRUCT = struct.Struct("<4s4H2LH")
+
+# 不使用ZIP64时的大小、偏移和成员数上限
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP32_MAX_ENTRIES = 0xFFFF
+
+# 通用标志位 3：CRC和大小写在数据之后的数据描述符中
+_FLAG_DATA_DESCRIPTOR = 0x08
+# 通用标志位 11：文件名为 UTF-8 编码
+_FLAG_UTF8 = 0x800
+
+# 压缩后的部件小于该大小时保存在内存中，否则暂存到临时文件
+SPOOL_MAX_SIZE = 8 << 20
+
+# 流式生成部件内容的函数：(源部件文件对象, 输出部件文件对象) -> 返回False表示内容没有变化
+PartTransform = Callable[[BinaryIO, BinaryIO], Optional[bool]]
+PartContent = Union[bytes, PartTransform]
+
+
+def _copy_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    """复制成员的元数据（名称、时间、压缩方式、属性）"""
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.compress_type = info.compress_type
+    new_info.external_attr = info.external_attr
+    new_info.create_system = info.create_system
+    new_info.comment = info.comment
+    return new_info
+
+
+def _new_info(name: str) -> zipfile.ZipInfo:
+    """新增部件的成员信息（与 ZipFile.writestr 的默认值一致）"""
+    new_info = zipfile.ZipInfo(name, time.localtime()[:6])
+    new_info.compress_type = zipfile.ZIP_DEFLATED
+    new_info.external_attr = 0o600 << 16
+    return new_info
+
+
+class _DeflateWriter:
+    """
+    边写边压缩的输出部件文件对象，压缩数据写入临时文件，同时计算CRC和大小
+
+    zlib 压缩时释放GIL，多个部件可以在线程池中同时压缩。
+    """
+
+    def __init__(self, info: zipfile.ZipInfo, spool: BinaryIO):
+        self.info = info
+        self.spool = spool
+        self.crc = 0
+        self.size = 0
+        self.compressor = None
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+
+    def write(self, data: bytes) -> int:
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.spool.write(self.compressor.compress(data) if self.compressor else data)
+        return len(data)
+
+    def close(self):
+        if self.compressor:
+            self.spool.write(self.compressor.flush())
+        self.info.CRC = self.crc
+        self.info.file_size = self.size
+        self.info.compress_size = self.spool.tell()
+        self.spool.seek(0)
+
+
+def _compress_part(file_path: str, info: Optional[zipfile.ZipInfo], new_info: zipfile.ZipInfo,
+                   content: PartContent) -> Tuple[zipfile.ZipInfo, Optional[BinaryIO]]:
+    """
+    生成并压缩一个部件（在线程池中执行）
+
+    Args:
+        file_path: 源包路径，PartTransform 从中读取原部件
+        info: 源包中的成员信息，新增的部件为None
+        new_info: 输出成员信息，压缩后填入CRC和大小
+        content: 新内容（bytes 或 PartTransform）
+
+    Returns:
+        (输出成员信息, 已定位到开头的压缩数据临时文件)；PartTransform 返回False（内容没有变化）时
+        临时文件为None，改为复制原部件的压缩数据
+    """
+    if new_info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        new_info.compress_type = zipfile.ZIP_DEFLATED
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        dst = _DeflateWriter(new_info, spool)
+        if callable(content):
+            # 每个线程单独打开源包，互不争用同一个文件位置
+            with zipfile.ZipFile(file_path, "r") as zin, zin.open(info) as src:
+                if content(src, dst) is False:
+                    spool.close()
+                    return new_info, None
+        else:
+            dst.write(content)
+        dst.close()
+    except Exception:
+        spool.close()
+        raise
+    return new_info, spool
+
+
+class PackageWriter:
+    """
+    只追加成员的压缩包写入器
+
+    copy_raw 按字节复制源包中成员的压缩数据，CRC和大小沿用原值，不解压也不重新压缩；
+    包中的图片、嵌入对象等大部件不需要改动时，这比解压后再压缩快一个数量级。
+    write_compressed 写入已在其他线程中压缩好的部件。
+    本地文件头、中央目录和目录结束记录都由本类按ZIP格式自行写出，不依赖 ZipFile 的内部属性；
+    Office文档不会超过4GB，因此不支持ZIP64，超出限制时抛出 zipfile.LargeZipFile。
+
+    Args:
+        fp: 以二进制写方式打开的输出文件，写完后调用 close() 写出中央目录
+    """
+
+    def __init__(self, fp: BinaryIO):
+        self.fp = fp
+        self._entries: List[Tuple[zipfile.ZipInfo, bytes, int]] = []
+
+    def copy_raw(self, src: BinaryIO, info: zipfile.ZipInfo):
+        """
+        复制源包中一个成员的本地文件头之后的压缩数据
+
+        Args:
+            src: 以二进制方式打开的源包文件
+            info: 源包中的成员信息（来自 ZipFile.infolist）
+        """
+        src.seek(info.header_offset)
+        header = src.read(LOCAL_HEADER_STRUCT.size)
+        fields = LOCAL_HEADER_STRUCT.unpack(header) if len(header) == LOCAL_HEADER_STRUCT.size else None
+        if fields is None or fields[0] != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"成员的本地文件头损坏: {info.filename}")
+        src.seek(fields[-2] + fields[-1], os.SEEK_CUR)
+
+        new_info = _copy_info(info)
+        # 新的本地文件头直接写入CRC和大小，不再需要数据描述符
+        new_info.flag_bits = info.flag_bits & ~_FLAG_DATA_DESCRIPTOR
+        new_info.CRC = info.CRC
+        new_info.compress_size = info.compress_size
+        new_info.file_size = info.file_size
+        self.write_compressed(new_info, src)
+
+    def write_compressed(self, info: zipfile.ZipInfo, src: BinaryIO):
+        """
+        写入一个成员：本地文件头加上从 src 读取的 info.compress_size 字节压缩数据
+
+        Args:
+            info: 已填好CRC、压缩前后大小和压缩方式的成员信息
+            src: 位于压缩数据开头的文件对象
+        """
+        offset = self.fp.tell()
+        if (max(info.compress_size, info.file_size, offset) > ZIP32_LIMIT
+                or len(self._entries) >= ZIP32_MAX_ENTRIES):
+            raise zipfile.LargeZipFile(f"压缩包超出ZIP格式的4GB或成员数限制: {info.filename}")
+        try:
+            name = info.filename.encode("ascii")
+            flags = info.flag_bits & ~_FLAG_UTF8
+        except UnicodeEncodeError:
+            name = info.filename.encode("utf-8")
+            flags = info.flag_bits | _FLAG_UTF8
+        info.flag_bits = flags
+        info.header_offset = offset
+        self.fp.write(LOCAL_HEADER_STRUCT.pack(
+            LOCAL_HEADER_SIGNATURE, _extract_version(info), flags, info.compress_type,
+            *_dos_time(info), info.CRC, info.compress_size, info.file_size, len(name), 0))
+        self.fp.write(name)
+        remaining = info.compress_size
+        while remaining > 0:
+            chunk = src.read(min(remaining, 1 << 16))
+            if not chunk:
+                raise zipfile.BadZipFile(f"成员数据不完整: {info.filename}")
+            self.fp.write(chunk)
+            remaining -= len(chunk)
+        self._entries.append((info, name, offset))
+
+    def close(self):
+        """写出中央目录和目录结束记录"""
+        start = self.fp.tell()
+        for info, name, offset in self._entries:
+            comment = info.comment or b""
+            self.fp.write(CENTRAL_HEADER_STRUCT.pack(
+                CENTRAL_HEADER_SIGNATURE, (info.create_system << 8) | _extract_version(info),
+                _extract_version(info), info.flag_bits, info.compress_type, *_dos_time(info),
+                info.CRC, info.compress_size, info.file_size, len(name), 0, len(comment),
+                0, 0, info.external_attr & 0xFFFFFFFF, offset))
+            self.fp.write(name)
+            self.fp.write(comment)
+        end = self.fp.tell()
+        if end > ZIP32_LIMIT:
+            raise zipfile.LargeZipFile("压缩包超出ZIP格式的4GB限制")
+        count = len(self._entries)
+        self.fp.write(END_RECORD_STRUCT.pack(END_RECORD_SIGNATURE, 0, 0, count, count, end - start, start, 0))
+
+
+def _extract_version(info: zipfile.ZipInfo) -> int:
+    """解压所需的ZIP版本：deflate 为 2.0，存储为 1.0"""
+    return 20 if info.compress_type == zipfile.ZIP_DEFLATED else 10
+
+
+def _dos_time(info: zipfile.ZipInfo) -> Tuple[int, int]:
+    """成员时间的 (DOS时间, DOS日期)"""
+    year, month, day, hour, minute, second = info.date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((max(year, 1980) - 1980) << 9) | (month << 5) | day
+
+
+def replace_parts(file_path: str, parts: Dict[str, PartContent], output_path: Optional[str] = None,
+                  removed: Iterable[str] = (), max_workers: Optional[int] = None) -> bool:
+    """
+    替换（或新增、删除）包中的部件并重写压缩包
+
+    未修改的部件原样复制压缩数据（见 PackageWriter.copy_raw），只有改动的部件重新压缩。
+    部件内容也可以是 PartTransform，以 (源部件, 输出部件) 两个文件对象调用，
+    边读边写生成新内容，适合很大的XML部件；新增的部件只能是 bytes。
+    PartTransform 返回False表示内容没有变化，该部件按原压缩数据复制；
+    覆盖源文件且没有任何部件变化或删除时不替换源文件。
+    改动的部件在线程池中同时生成和压缩（结果暂存在临时文件中），再按原包中的顺序写入，
+    新增的部件排在最后，因此输出与串行处理完全相同。
+    先写入同目录下的临时文件，完成后复制源文件的权限再替换目标文件；失败时不会破坏原文件，
+    临时文件在任何情况下都会删除。
+
+    Args:
+        file_path: 源文件路径
+        parts: 部件名称到新内容（bytes 或 PartTransform）的映射
+        output_path: 输出路径，默认覆盖源文件
+        removed: 要删除的部件名称
+        max_workers: 压缩改动部件的最大线程数，默认为CPU核心数
+
+    Returns:
+        是否写出了输出文件
+    """
+    output_path = output_path or file_path
+    removed = set(removed)
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        os.close(fd)
+        with zipfile.ZipFile(file_path, "r") as zin, open(file_path, "rb") as raw_src, \
+                open(temp_path, "wb") as out:
+            zout = PackageWriter(out)
+            members = [info for info in zin.infolist() if info.filename not in removed]
+            changed = len(members) < len(zin.infolist())
+            names = {info.filename for info in members}
+            jobs = [(info, _copy_info(info), parts[info.filename])
+                    for info in members if info.filename in parts]
+            jobs += [(None, _new_info(name), data) for name, data in parts.items() if name not in names]
+
+            workers = max(1, min(len(jobs), max_workers or os.cpu_count() or 1))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {new_info.filename: pool.submit(_compress_part, file_path, info, new_info, content)
+                           for info, new_info, content in jobs}
+                try:
+                    for info in members:
+                        if info.filename in futures:
+                            changed |= _write_future(zout, futures.pop(info.filename), raw_src, info)
+                        else:
+                            zout.copy_raw(raw_src, info)
+                    for future in list(futures.values()):
+                        changed |= _write_future(zout, future, raw_src, None)
+                    zout.close()
+                finally:
+                    # 出错时取消尚未开始的部件，并关闭已压缩部件的临时文件
+                    for future in futures.values():
+                        if not future.cancel() and future.exception() is None and future.result()[1]:
+                            future.result()[1].close()
+        if not changed and output_path == file_path:
+            return False
+        # mkstemp 创建的文件权限为 0600，改为与源文件一致
+        shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, output_path)
+        return True
+    finally:
+        # 没有替换目标文件（无改动或任何步骤失败）时删除临时文件
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _write_future(zout: PackageWriter, future: Future, raw_src: BinaryIO,
+                  info: Optional[zipfile.ZipInfo]) -> bool:
+    """等待部件压缩完成并写入，内容没有变化时复制原部件，返回部件是否变化"""
+    new_info, spool = future.result()
+    if spool is None:
+        zout.copy_raw(raw_src, info)
+        return False
+    with spool:
+        zout.write_compressed(new_info, spool)
+    return True
+
+
+def find_vba_part(zip_file: zipfile.ZipFile) -> Optional[zipfile.ZipInfo]:
+    """在OOXML包中查找 word|xl|ppt/vbaProject.bin"""
+    for info in zip_file.infolist():
+        parts = info.filename.split("/")
+        if len(parts) == 2 and parts[1].lower() == VBA_PART_NAME.lower():
+            return info
+    return None
+
+
+def find_main_part(zip_file: zipfile.ZipFile) -> str:
+    """
+    根据 _rels/.rels 中的 officeDocument 关系查找主文档部件
+
+    Returns:
+        主文档部件名称，如 word/document.xml
+    """
+    root = ET.fromstring(zip_file.read(ROOT_RELS_PART))
+    for rel in root.iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+        if rel.get("Type") == OFFICE_DOCUMENT_REL_TYPE:
+            return rel.get("Target").lstrip("/")
+    raise ValueError("OOXML包中没有主文档部件")
+
+
+def rels_part_name(part_name: str) -> str:
+    """部件对应的关系部件名称，如 word/document.xml -> word/_rels/document.xml.rels"""
+    folder, name = posixpath.split(part_name)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+def resolve_target(source_part: str, target: str) -> str:
+    """
+    将关系的 Target 解析为部件名称
+
+    Args:
+        source_part: 关系所属的部件名称，包级关系为 ''
+        target: 关系目标（相对于源部件所在目录，或以 / 开头的绝对路径）
+
+    Returns:
+        部件名称，如 word/vbaData.xml
+    """
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def source_part_of_rels(rels_part: str) -> str:
+    """关系部件对应的源部件名称，如 word/_rels/document.xml.rels -> word/document.xml"""
+    folder, name = posixpath.split(rels_part)
+    return posixpath.join(posixpath.dirname(folder), name[:-len(".rels")])
+
+
+def find_related_parts(zip_file: zipfile.ZipFile, source_part: str, rel_types: Iterable[str]) -> List[str]:
+    """
+    查找源部件通过指定类型的关系引用的部件
+
+    Args:
+        zip_file: 已打开的OOXML包
+        source_part: 源部件名称，如 word/document.xml
+        rel_types: 关系类型
+
+    Returns:
+        包中存在的目标部件名称（按关系顺序，去重）
+    """
+    rels_part = rels_part_name(source_part)
+    names = set(zip_file.namelist())
+    if rels_part not in names:
+        return []
+
+    rel_types = set(rel_types)
+    parts = []
+    for rel in ET.fromstring(zip_file.read(rels_part)).iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+        if rel.get("Type") in rel_types and rel.get("TargetMode") != "External":
+            part_name = resolve_target(source_part, rel.get("Target", ""))
+            if part_name in names and part_name not in parts:
+                parts.append(part_name)
+    return parts
+
+
+def relationship_targets(zip_file: zipfile.ZipFile, source_part: str) -> Dict[str, str]:
+    """
+    读取源部件的全部内部关系
+
+    Args:
+        zip_file: 已打开的OOXML包
+        source_part: 源部件名称，如 xl/workbook.xml
+
+    Returns:
+        关系 Id 到目标部件名称的映射（不含外部链接）
+    """
+    rels_part = rels_part_name(source_part)
+    if rels_part not in set(zip_file.namelist()):
+        return {}
+    targets = {}
+    for rel in ET.fromstring(zip_file.read(rels_part)).iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+        if rel.get("TargetMode") != "External":
+            targets[rel.get("Id")] = resolve_target(source_part, rel.get("Target", ""))
+    return targets
+
+
+def remove_elements(xml_data: bytes, tag: str, attribute: str, values: Iterable[str]) -> bytes:
+    """删除指定属性取值的空元素（如 <Override PartName="..."/>），其余内容保持原样"""
+    for value in values:
+        pattern = (rb"<" + tag.encode() + rb"\b[^>]*\b" + attribute.encode() + rb'="' +
+                   re.escape(value.encode("utf-8")) + rb'"[^>]*/>')
+        xml_data = re.sub(pattern, b"", xml_data)
+    return xml_data
+
+
+def _insert_before_close(xml_data: bytes, close_tag: bytes, element: str) -> bytes:
+    """在根元素的结束标签前插入一个子元素，其余内容保持原样"""
+    pos = xml_data.rfind(close_tag)
+    if pos < 0:
+        raise ValueError(f"XML缺少结束标签: {close_tag.decode()}")
+    return xml_data[:pos] + element.encode("utf-8") + xml_data[pos:]
+
+
+def _add_vba_relationship(rels_data: Optional[bytes]) -> bytes:
+    """在主文档的关系部件中添加 vbaProject 关系"""
+    if not rels_data:
+        rels_data = XML_DECLARATION + f'<Relationships xmlns="{RELATIONSHIPS_NS}"></Relationships>'.encode()
+
+    ids = set()
+    for rel in ET.fromstring(rels_data).iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+        if rel.get("Type") == VBA_PROJECT_REL_TYPE:
+            return rels_data
+        ids.add(rel.get("Id"))
+
+    index = len(ids) + 1
+    while f"rId{index}" in ids:
+        index += 1
+    element = f'<Relationship Id="rId{index}" Type="{VBA_PROJECT_REL_TYPE}" Target="{VBA_PART_NAME}"/>'
+    return _insert_before_close(rels_data, b"</Relationships>", element)
+
+
+def _enable_macro_content_types(types_data: bytes, main_part: str, vba_part: str) -> bytes:
+    """登记 vbaProject.bin 的内容类型，并将主文档改为启用宏的内容类型"""
+    vba_registered = False
+    for element in ET.fromstring(types_data):
+        part_name = element.get("PartName", "").lstrip("/")
+        if part_name == main_part:
+            content_type = element.get("ContentType")
+            if content_type in MACRO_ENABLED_CONTENT_TYPES:
+                types_data = types_data.replace(
+                    f'ContentType="{content_type}"'.encode(),
+                    f'ContentType="{MACRO_ENABLED_CONTENT_TYPES[content_type]}"'.encode())
+        elif part_name == vba_part or (element.get("Extension", "").lower() == "bin" and
+                                       element.get("ContentType") == VBA_PROJECT_CONTENT_TYPE):
+            vba_registered = True
+
+    if not vba_registered:
+        # Excel 的 .bin 默认类型可能是打印机设置，因此使用 Override 单独登记
+        element = f'<Override PartName="/{vba_part}" ContentType="{VBA_PROJECT_CONTENT_TYPE}"/>'
+        types_data = _insert_before_close(types_data, b"</Types>", element)
+    return types_data
+
+
+def set_vba_project(file_path: str, vba_data: bytes, output_path: Optional[str] = None) -> str:
+    """
+    将 vbaProject.bin 写入OOXML包
+
+    包中已有VBA工程时直接替换；否则新增部件、关系和内容类型，
+    并把主文档的内容类型改为启用宏的格式（输出文件应使用 .docm/.xlsm/.pptm 等扩展名）。
+
+    Args:
+        file_path: 源文件路径
+        vba_data: vbaProject.bin 内容
+        output_path: 输出路径，默认覆盖源文件
+
+    Returns:
+        VBA工程部件名称
+    """
+    with zipfile.ZipFile(file_path, "r") as zip_file:
+        info = find_vba_part(zip_file)
+        main_part = find_main_part(zip_file)
+        if info is not None:
+            vba_part = info.filename
+            parts = {vba_part: vba_data}
+        else:
+            vba_part = posixpath.join(posixpath.dirname(main_part), VBA_PART_NAME)
+            rels_part = rels_part_name(main_part)
+            names = set(zip_file.namelist())
+            rels_data = zip_file.read(rels_part) if rels_part in names else None
+            parts = {
+                CONTENT_TYPES_PART: _enable_macro_content_types(
+                    zip_file.read(CONTENT_TYPES_PART), main_part, vba_part),
+                rels_part: _add_vba_relationship(rels_data),
+                vba_part: vba_data,
+            }
+
+    replace_parts(file_path, parts, output_path)
+    return vba_part
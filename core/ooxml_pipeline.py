@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+OOXML重写管道 - 多个清理阶段共用一次读取和一次写入
+
+每个阶段（PipelineStage）先只读地分析原始包（只读取关系等小部件），把改动登记到 PackagePlan：
+删除部件、按条件删除的元素（locate）或按数据块工作的部件转换器（生成器）。
+所有阶段登记完成后只重写一次压缩包：未改动的部件复制压缩数据，有改动的部件依次经过
+元素删除和转换器链。要删除的元素在重写的同一遍中定位（cut_located_elements），
+document.xml 等大部件只解压和解析一次；没有删除任何元素的部件仍按原压缩数据复制。
+"""
+import zipfile
+from functools import partial
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from core.ooxml_package import PartTransform, find_main_part, replace_parts
+from core.xml_stream import CHUNK_SIZE, ElementLocator, QName, cut_located_elements
+
+
+# 部件转换器：接收数据块迭代器，产出新的数据块
+PartTransformer = Callable[[Iterator[bytes]], Iterator[bytes]]
+
+
+def rewrite_whole(func: Callable[[bytes], bytes]) -> PartTransformer:
+    """
+    把整体处理部件内容的函数包装为部件转换器
+
+    只适用于 [Content_Types].xml、.rels 等小部件。
+    """
+
+    def transformer(chunks: Iterator[bytes]) -> Iterator[bytes]:
+        yield func(b"".join(chunks))
+
+    return transformer
+
+
+class PackagePlan:
+    """
+    一次重写中对包内各部件的改动
+
+    Args:
+        zip_file: 已打开的原始包，供各阶段分析
+    """
+
+    def __init__(self, zip_file: zipfile.ZipFile):
+        self.zip_file = zip_file
+        self.names: Set[str] = set(zip_file.namelist())
+        self.removed: Set[str] = set()
+        self._main_part: Optional[str] = None
+        self._locators: Dict[str, List[ElementLocator]] = {}
+        self._transformers: Dict[str, List[PartTransformer]] = {}
+
+    @property
+    def main_part(self) -> str:
+        """主文档部件名称，如 word/document.xml"""
+        if self._main_part is None:
+            self._main_part = find_main_part(self.zip_file)
+        return self._main_part
+
+    @property
+    def remaining(self) -> Set[str]:
+        """重写后仍保留的部件"""
+        return self.names - self.removed
+
+    @property
+    def changed(self) -> bool:
+        """是否可能有改动（登记了按条件删除的元素时，要到重写时才知道是否真的删除）"""
+        return bool(self.removed or self._locators or self._transformers)
+
+    def remove(self, part_name: str):
+        """删除部件"""
+        self.removed.add(part_name)
+
+    def locate(self, part_name: str, names: Iterable[QName],
+               match: Callable[[QName, Dict[QName, str]], bool], containers: Iterable[QName] = ()):
+        """
+        删除部件中 match 返回True 的元素（参数含义见 ElementLocator）
+
+        元素在重写时边定位边删除，先于转换器执行，多个阶段对同一部件登记的删除会合并。
+        match 在压缩线程中调用，阶段应在 after_write 中读取它记录的结果。
+        """
+        self._locators.setdefault(part_name, []).append(ElementLocator(names, match, containers))
+
+    def transform(self, part_name: str, transformer: PartTransformer):
+        """登记部件转换器，同一部件的多个转换器按登记顺序串联"""
+        self._transformers.setdefault(part_name, []).append(transformer)
+
+    def _part_transform(self, part_name: str) -> PartTransform:
+        locators = self._locators.get(part_name, [])
+        transformers = self._transformers.get(part_name, [])
+
+        def transform(src: BinaryIO, dst: BinaryIO) -> bool:
+            chunks = iter(partial(src.read, CHUNK_SIZE), b"")
+            if locators:
+                chunks = cut_located_elements(chunks, locators)
+            for transformer in transformers:
+                chunks = transformer(chunks)
+            for chunk in chunks:
+                dst.write(chunk)
+            # 只有按条件删除且没有删除任何元素时，部件内容不变
+            return bool(transformers) or any(locator.spans for locator in locators)
+
+        return transform
+
+    def build_parts(self) -> Dict[str, PartTransform]:
+        """生成 replace_parts 使用的部件内容"""
+        parts = {}
+        for part_name in set(self._locators) | set(self._transformers):
+            if part_name in self.remaining:
+                parts[part_name] = self._part_transform(part_name)
+        return parts
+
+
+class PipelineStage:
+    """
+    管道阶段基类
+
+    子类在 plan 中分析原始包并登记改动，结果（删除了什么）保存在自身属性中；
+    通过 locate 登记的删除要到重写后才有结果，在 after_write 中收集。
+    """
+
+    def plan(self, plan: PackagePlan):
+        """分析原始包，登记改动（不应解压扫描大部件，元素删除用 plan.locate 在重写时完成）"""
+        raise NotImplementedError
+
+    def after_write(self, zip_file: zipfile.ZipFile):
+        """重写完成后调用（没有改动时传入原始包），可用于读取清除后的状态"""
+        pass
+
+    def summary(self) -> List[str]:
+        """本阶段结果的日志文本行，没有改动时返回空列表"""
+        return []
+
+
+def run_pipeline(file_path: str, stages: Sequence[PipelineStage],
+                 output_path: Optional[str] = None) -> bool:
+    """
+    依次让各阶段登记改动，然后一次性重写压缩包（只读写一遍）
+
+    Args:
+        file_path: 源文件路径
+        stages: 管道阶段
+        output_path: 输出路径，默认覆盖源文件
+
+    Returns:
+        是否写出了新文件（实际没有任何改动且输出路径与源文件相同时不替换源文件）
+    """
+    output_path = output_path or file_path
+    with zipfile.ZipFile(file_path, "r") as zip_file:
+        plan = PackagePlan(zip_file)
+        for stage in stages:
+            stage.plan(plan)
+
+    written = plan.changed or output_path != file_path
+    if written:
+        written = replace_parts(file_path, plan.build_parts(), output_path, removed=plan.removed)
+
+    with zipfile.ZipFile(output_path, "r") as zip_file:
+        for stage in stages:
+            stage.after_write(zip_file)
+    return written
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+MS-OVBA 压缩算法 - VBA工程中 dir 流和模块源码使用的 CompressedContainer 压缩与解压
+
+输入可以是 memoryview（例如模块流的切片），解压过程中不会复制输入数据。
+每个 CompressedChunk 相互独立，大模块可以按块在线程池/进程池中并行解压；
+重新压缩时只需压缩内容发生变化的块，未变化的块原样复用。
+"""
+import struct
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple, Union
+
+
+# 压缩容器签名字节
+CONTAINER_SIGNATURE = 0x01
+
+# 每个块解压后最多 4096 字节
+CHUNK_SIZE = 4096
+
+# 块数少于该值时并行解压没有收益，直接串行处理
+PARALLEL_MIN_CHUNKS = 8
+
+# 压缩时每个位置最多比较的候选匹配数
+MAX_MATCH_CANDIDATES = 64
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class OVBACompressionError(Exception):
+    """压缩数据格式错误"""
+    pass
+
+
+def _copy_token_split(position: int):
+    """
+    根据当前块内解压位置计算 CopyToken 的位数划分
+
+    Returns:
+        (长度掩码, 偏移掩码, 偏移位移)
+    """
+    bit_count = max((position - 1).bit_length(), 4)
+    length_mask = 0xFFFF >> bit_count
+    offset_mask = ~length_mask & 0xFFFF
+    return length_mask, offset_mask, 16 - bit_count
+
+
+def _decompress_chunk_data(data: BytesLike, pos: int, end: int, out: bytearray):
+    """
+    解压单个 CompressedChunk 的数据部分（TokenSequence 序列）
+
+    Args:
+        data: 压缩数据
+        pos: 块数据起始位置（块头之后）
+        end: 块数据结束位置
+        out: 输出缓冲区，解压结果追加到末尾
+    """
+    chunk_start = len(out)
+    while pos < end:
+        flags = data[pos]
+        pos += 1
+
+        # 8 个 LiteralToken 的快速路径
+        if flags == 0 and pos + 8 <= end:
+            out += data[pos:pos + 8]
+            pos += 8
+            continue
+
+        for bit in range(8):
+            if pos >= end:
+                break
+            if not (flags >> bit) & 1:
+                # LiteralToken
+                out.append(data[pos])
+                pos += 1
+                continue
+
+            # CopyToken
+            if pos + 2 > end:
+                raise OVBACompressionError("CopyToken 被截断")
+            token = data[pos] | (data[pos + 1] << 8)
+            pos += 2
+            length_mask, offset_mask, shift = _copy_token_split(len(out) - chunk_start)
+            length = (token & length_mask) + 3
+            offset = ((token & offset_mask) >> shift) + 1
+            src = len(out) - offset
+            if src < chunk_start:
+                raise OVBACompressionError("CopyToken 偏移越界")
+            if offset >= length:
+                out += out[src:src + length]
+            else:
+                # 源与目标重叠：按偏移长度重复复制
+                while length > 0:
+                    step = min(offset, length)
+                    out += out[src:src + step]
+                    src += step
+                    length -= step
+
+
+def iter_chunks(data: BytesLike) -> Iterator[Tuple[int, int, bool]]:
+    """
+    遍历压缩容器中的块（只读取块头，不解压）
+
+    Args:
+        data: 压缩容器数据（以签名字节 0x01 开头）
+
+    Yields:
+        (块起始位置, 块结束位置, 是否压缩)，位置包含2字节块头
+    """
+    if len(data) == 0:
+        return
+    if data[0] != CONTAINER_SIGNATURE:
+        raise OVBACompressionError(f"无效的压缩容器签名: 0x{data[0]:02X}")
+
+    pos = 1
+    total = len(data)
+    while pos + 2 <= total:
+        header = data[pos] | (data[pos + 1] << 8)
+        if (header >> 12) & 0x07 != 0x03:
+            raise OVBACompressionError(f"无效的块签名: 位置 {pos}")
+        is_compressed = bool(header & 0x8000)
+        if is_compressed:
+            end = pos + (header & 0x0FFF) + 3
+        else:
+            end = pos + 2 + CHUNK_SIZE
+        end = min(end, total)
+        yield pos, end, is_compressed
+        pos = end
+
+
+def decompress_chunk(chunk: BytesLike) -> bytes:
+    """
+    解压单个 CompressedChunk
+
+    Args:
+        chunk: 包含2字节块头的块数据
+
+    Returns:
+        解压后的数据（最多 4096 字节）
+    """
+    if len(chunk) < 2:
+        return b""
+    header = chunk[0] | (chunk[1] << 8)
+    if not header & 0x8000:
+        return bytes(chunk[2:2 + CHUNK_SIZE])
+    out = bytearray()
+    _decompress_chunk_data(chunk, 2, len(chunk), out)
+    return bytes(out)
+
+
+def decompress(data: BytesLike) -> bytes:
+    """
+    解压 CompressedContainer
+
+    Args:
+        data: 压缩容器数据（以签名字节 0x01 开头），可以是 memoryview 切片
+
+    Returns:
+        解压后的数据
+    """
+    out = bytearray()
+    for start, end, is_compressed in iter_chunks(data):
+        if is_compressed:
+            _decompress_chunk_data(data, start + 2, end, out)
+        else:
+            out += data[start + 2:end]
+    return bytes(out)
+
+
+def decompress_parallel(data: BytesLike, max_workers: Optional[int] = None,
+                        use_processes: bool = False,
+                        executor: Optional[Executor] = None) -> bytes:
+    """
+    按块并行解压 CompressedContainer
+
+    线程模式直接传递 memoryview 切片；进程模式需要把每个块复制为 bytes 传给子进程。
+    块数较少时退化为串行解压。
+
+    Args:
+        data: 压缩容器数据
+        max_workers: 最大工作线程/进程数
+        use_processes: 是否使用进程池（纯Python解压受GIL限制，大模块建议使用进程池）
+        executor: 外部提供的执行器，批量处理时可复用同一个池
+
+    Returns:
+        解压后的数据
+    """
+    view = memoryview(data)
+    chunks = list(iter_chunks(view))
+    if len(chunks) < PARALLEL_MIN_CHUNKS:
+        return decompress(view)
+
+    if use_processes:
+        pieces: List[BytesLike] = [bytes(view[start:end]) for start, end, _ in chunks]
+    else:
+        pieces = [view[start:end] for start, end, _ in chunks]
+
+    if executor is not None:
+        return b"".join(executor.map(decompress_chunk, pieces))
+
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_class(max_workers=max_workers) as pool:
+        return b"".join(pool.map(decompress_chunk, pieces))
+
+
+def _find_match(data: BytesLike, pos: int, chunk_start: int, end: int,
+                candidates: List[int]):
+    """
+    在当前块已处理的数据中查找最长匹配
+
+    Args:
+        data: 待压缩数据
+        pos: 当前位置
+        chunk_start: 当前块起始位置
+        end: 当前块结束位置
+        candidates: 与当前位置前3字节相同的历史位置（按时间顺序）
+
+    Returns:
+        (偏移, 长度)，没有可用匹配时长度为0
+    """
+    length_mask, _, _ = _copy_token_split(pos - chunk_start)
+    max_length = min(length_mask + 3, end - pos)
+    best_length = 0
+    best_offset = 0
+    checked = 0
+    for candidate in reversed(candidates):
+        if checked >= MAX_MATCH_CANDIDATES:
+            break
+        checked += 1
+        # 快速排除无法超过当前最佳长度的候选
+        if best_length and data[candidate + best_length] != data[pos + best_length]:
+            continue
+        length = 3
+        while length < max_length and data[candidate + length] == data[pos + length]:
+            length += 1
+        if length > best_length:
+            best_length = length
+            best_offset = pos - candidate
+            if length == max_length:
+                break
+    return best_offset, best_length
+
+
+def compress_chunk(data: BytesLike) -> bytes:
+    """
+    压缩单个块（最多 4096 字节的原始数据）
+
+    Args:
+        data: 原始数据
+
+    Returns:
+        包含2字节块头的 CompressedChunk；压缩后超过 4096 字节时输出未压缩块
+    """
+    end = len(data)
+    if end > CHUNK_SIZE:
+        raise OVBACompressionError("单个块的数据不能超过 4096 字节")
+
+    out = bytearray()
+    table = {}
+    pos = 0
+    while pos < end:
+        flag_index = len(out)
+        out.append(0)
+        flags = 0
+        for bit in range(8):
+            if pos >= end:
+                break
+            offset = length = 0
+            if pos + 3 <= end:
+                key = bytes(data[pos:pos + 3])
+                candidates = table.get(key)
+                if candidates:
+                    offset, length = _find_match(data, pos, 0, end, candidates)
+            if length >= 3:
+                _, offset_mask, shift = _copy_token_split(pos)
+                token = (((offset - 1) << shift) & offset_mask) | (length - 3)
+                out += struct.pack("<H", token)
+                flags |= 1 << bit
+                step = length
+            else:
+                out.append(data[pos])
+                step = 1
+            # 记录新处理位置的3字节前缀
+            for p in range(pos, min(pos + step, end - 2)):
+                table.setdefault(bytes(data[p:p + 3]), []).append(p)
+            pos += step
+        out[flag_index] = flags
+
+    if len(out) > CHUNK_SIZE:
+        # 压缩无收益，输出 4096 字节的未压缩块（不足部分补0）
+        raw = bytes(data) + b"\x00" * (CHUNK_SIZE - end)
+        return struct.pack("<H", 0x3000 | 0x0FFF) + raw
+    header = 0x8000 | 0x3000 | ((len(out) + 2 - 3) & 0x0FFF)
+    return struct.pack("<H", header) + bytes(out)
+
+
+def compress(data: BytesLike) -> bytes:
+    """
+    压缩数据为 CompressedContainer
+
+    Args:
+        data: 原始数据
+
+    Returns:
+        以签名字节 0x01 开头的压缩容器
+    """
+    view = memoryview(data)
+    parts = [bytes([CONTAINER_SIGNATURE])]
+    for start in range(0, len(view), CHUNK_SIZE):
+        parts.append(compress_chunk(view[start:start + CHUNK_SIZE]))
+    return b"".join(parts)
+
+
+def recompress(old_container: BytesLike, new_data: BytesLike,
+               old_data: Optional[BytesLike] = None, stats: Optional[dict] = None) -> bytes:
+    """
+    增量重新压缩：只压缩内容发生变化的块，未变化的块原样复用
+
+    块以解压后的 4096 字节为单位对齐，第 i 个块的原始内容不变时直接复制旧的压缩字节。
+
+    Args:
+        old_container: 旧的压缩容器
+        new_data: 新的原始数据
+        old_data: 旧的原始数据（已知时传入可省去解压旧块）
+        stats: 可选字典，返回 {'reused': 复用块数, 'compressed': 重新压缩块数}
+
+    Returns:
+        新的压缩容器，可由 decompress() 还原为 new_data
+    """
+    old_view = memoryview(old_container)
+    new_view = memoryview(new_data)
+    old_chunks = list(iter_chunks(old_view)) if len(old_view) else []
+
+    parts = [bytes([CONTAINER_SIGNATURE])]
+    reused = compressed = 0
+    for index, start in enumerate(range(0, len(new_view), CHUNK_SIZE)):
+        new_chunk = new_view[start:start + CHUNK_SIZE]
+        if index < len(old_chunks):
+            chunk_start, chunk_end, is_compressed = old_chunks[index]
+            old_chunk = old_view[chunk_start:chunk_end]
+            if old_data is not None:
+                same = old_data[start:start + CHUNK_SIZE] == new_chunk
+            else:
+                same = decompress_chunk(old_chunk) == new_chunk
+            # 末尾补0的未压缩块只有在长度恰好为 4096 时才能复用
+            if same and (is_compressed or len(new_chunk) == CHUNK_SIZE):
+                parts.append(bytes(old_chunk))
+                reused += 1
+                continue
+        parts.append(compress_chunk(new_chunk))
+        compressed += 1
+
+    if stats is not None:
+        stats["reused"] = reused
+        stats["compressed"] = compressed
+    return b"".join(parts)
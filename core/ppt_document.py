@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+PowerPoint 97-2003 文档解析 - 从 PowerPoint Document 流中找出并解压VBA工程
+
+.ppt/.pot 的VBA工程不是单独的存储，而是作为压缩的OLE复合文件保存在 PowerPoint Document 流的
+ExOleObjStg 记录中（MS-PPT），查找路径：
+
+    Current User 流 -> 最新的 UserEditAtom -> PersistDirectoryAtom（持久对象编号 -> 流内偏移）
+    DocumentContainer -> DocInfoListContainer -> VBAInfoContainer -> VBAInfoAtom.persistIdRef
+    -> ExOleObjStg（zlib 压缩，解压后与 vbaProject.bin 结构相同，VBA工程位于根存储）
+
+只按偏移读取需要的记录，不遍历整个流。
+"""
+import struct
+import zlib
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from core.ole_file import OleFile
+
+
+CURRENT_USER_STREAM = "Current User"
+PPT_DOCUMENT_STREAM = "PowerPoint Document"
+
+# 记录类型
+RT_DOCUMENT = 0x03E8
+RT_VBA_INFO = 0x03FF
+RT_VBA_INFO_ATOM = 0x0400
+RT_DOC_INFO_LIST = 0x07D0
+RT_USER_EDIT_ATOM = 0x0FF5
+RT_CURRENT_USER_ATOM = 0x0FF6
+RT_EXTERNAL_OLE_OBJECT_STG = 0x1011
+RT_PERSIST_DIRECTORY_ATOM = 0x1772
+
+# CurrentUserAtom.headerToken：文档已加密
+HEADER_TOKEN_ENCRYPTED = 0xF3D1C4DF
+
+# ExOleObjStg 的 recInstance：数据经过 zlib 压缩
+EX_OLE_OBJ_STG_COMPRESSED = 0x001
+
+# 记录头：recVer(4位) + recInstance(12位)、recType、recLen
+RECORD_HEADER = struct.Struct("<HHI")
+
+# PersistDirectoryEntry：persistId(20位) + cPersist(12位)
+PERSIST_ID_MASK = 0xFFFFF
+
+BytesLike = Union[bytes, memoryview]
+
+
+class PPTDocumentError(Exception):
+    """PowerPoint文档格式错误"""
+    pass
+
+
+def _read_header(data: BytesLike, offset: int, rec_type: Optional[int] = None) -> Tuple[int, int, int]:
+    """
+    读取记录头
+
+    Returns:
+        (recInstance, recType, recLen)
+    """
+    if offset < 0 or offset + RECORD_HEADER.size > len(data):
+        raise PPTDocumentError(f"记录偏移超出范围: {offset}")
+    ver_instance, found_type, length = RECORD_HEADER.unpack_from(data, offset)
+    if rec_type is not None and found_type != rec_type:
+        raise PPTDocumentError(f"记录类型不匹配: 0x{found_type:04X}（应为 0x{rec_type:04X}）")
+    return ver_instance >> 4, found_type, length
+
+
+def _children(data: BytesLike, offset: int) -> Iterator[Tuple[int, int]]:
+    """遍历容器记录的子记录，产出 (记录类型, 记录偏移)"""
+    _, _, length = _read_header(data, offset)
+    pos = offset + RECORD_HEADER.size
+    end = min(pos + length, len(data))
+    while pos + RECORD_HEADER.size <= end:
+        _, rec_type, rec_len = _read_header(data, pos)
+        yield rec_type, pos
+        pos += RECORD_HEADER.size + rec_len
+
+
+def _find_child(data: BytesLike, offset: int, rec_type: int) -> Optional[int]:
+    """查找容器中第一个指定类型的子记录，返回记录偏移"""
+    for found_type, pos in _children(data, offset):
+        if found_type == rec_type:
+            return pos
+    return None
+
+
+class PPTDocument:
+    """
+    PowerPoint 97-2003 文档流的只读解析
+
+    Args:
+        ole: 已打开的 .ppt/.pot 复合文件
+    """
+
+    def __init__(self, ole: OleFile):
+        self.data = ole.open_stream(PPT_DOCUMENT_STREAM)
+        offset_to_current_edit = self._read_current_user(ole.open_stream(CURRENT_USER_STREAM))
+        self.persist_offsets: Dict[int, int] = {}
+        self.document_offset = self._load_persist_directory(offset_to_current_edit)
+
+    @staticmethod
+    def _read_current_user(data: BytesLike) -> int:
+        """解析 CurrentUserAtom，返回最新 UserEditAtom 的偏移"""
+        _read_header(data, 0, RT_CURRENT_USER_ATOM)
+        if len(data) < RECORD_HEADER.size + 12:
+            raise PPTDocumentError("Current User 流不完整")
+        _size, header_token, offset_to_current_edit = struct.unpack_from("<III", data, RECORD_HEADER.size)
+        if header_token == HEADER_TOKEN_ENCRYPTED:
+            raise PPTDocumentError("演示文稿已加密")
+        return offset_to_current_edit
+
+    def _load_persist_directory(self, offset: int) -> int:
+        """
+        沿 UserEditAtom 链从新到旧合并持久对象目录（较新的编辑优先）
+
+        Returns:
+            DocumentContainer 的偏移
+        """
+        document_persist_id = None
+        visited = set()
+        while offset and offset not in visited:
+            visited.add(offset)
+            _read_header(self.data, offset, RT_USER_EDIT_ATOM)
+            (offset_last_edit, offset_persist_directory,
+             doc_persist_id_ref) = struct.unpack_from("<III", self.data, offset + RECORD_HEADER.size + 8)
+            if document_persist_id is None:
+                document_persist_id = doc_persist_id_ref
+            self._read_persist_directory(offset_persist_directory)
+            offset = offset_last_edit
+
+        if document_persist_id not in self.persist_offsets:
+            raise PPTDocumentError("找不到 DocumentContainer")
+        return self.persist_offsets[document_persist_id]
+
+    def _read_persist_directory(self, offset: int):
+        """读取一个 PersistDirectoryAtom，已有的（较新的）编号不覆盖"""
+        _, _, length = _read_header(self.data, offset, RT_PERSIST_DIRECTORY_ATOM)
+        pos = offset + RECORD_HEADER.size
+        end = min(pos + length, len(self.data))
+        while pos + 4 <= end:
+            entry = struct.unpack_from("<I", self.data, pos)[0]
+            persist_id = entry & PERSIST_ID_MASK
+            count = entry >> 20
+            pos += 4
+            for index in range(count):
+                if pos + 4 > end:
+                    break
+                self.persist_offsets.setdefault(persist_id + index, struct.unpack_from("<I", self.data, pos)[0])
+                pos += 4
+
+    def find_vba_storage(self) -> Optional[int]:
+        """
+        查找保存VBA工程的 ExOleObjStg 记录
+
+        Returns:
+            记录在 PowerPoint Document 流中的偏移，演示文稿不含VBA工程时返回None
+        """
+        _read_header(self.data, self.document_offset, RT_DOCUMENT)
+        doc_info_list = _find_child(self.data, self.document_offset, RT_DOC_INFO_LIST)
+        if doc_info_list is None:
+            return None
+        vba_info = _find_child(self.data, doc_info_list, RT_VBA_INFO)
+        if vba_info is None:
+            return None
+        vba_info_atom = _find_child(self.data, vba_info, RT_VBA_INFO_ATOM)
+        if vba_info_atom is None:
+            return None
+
+        persist_id_ref, has_macros = struct.unpack_from("<II", self.data, vba_info_atom + RECORD_HEADER.size)
+        if not has_macros:
+            return None
+        offset = self.persist_offsets.get(persist_id_ref)
+        if offset is None:
+            raise PPTDocumentError(f"VBA工程的持久对象不存在: {persist_id_ref}")
+        _read_header(self.data, offset, RT_EXTERNAL_OLE_OBJECT_STG)
+        return offset
+
+    def vba_storage_size(self, offset: int) -> int:
+        """ExOleObjStg 记录中复合文件解压后的大小"""
+        instance, _, length = _read_header(self.data, offset, RT_EXTERNAL_OLE_OBJECT_STG)
+        if instance == EX_OLE_OBJ_STG_COMPRESSED:
+            return struct.unpack_from("<I", self.data, offset + RECORD_HEADER.size)[0]
+        return length
+
+    def read_vba_storage(self, offset: int) -> bytes:
+        """
+        读取并解压 ExOleObjStg 记录中的复合文件
+
+        Returns:
+            VBA工程复合文件（与 vbaProject.bin 结构相同）
+        """
+        instance, _, length = _read_header(self.data, offset, RT_EXTERNAL_OLE_OBJECT_STG)
+        start = offset + RECORD_HEADER.size
+        payload = self.data[start:start + length]
+        if instance != EX_OLE_OBJ_STG_COMPRESSED:
+            return bytes(payload)
+
+        size = struct.unpack_from("<I", payload, 0)[0]
+        try:
+            data = zlib.decompress(payload[4:])
+        except zlib.error as e:
+            raise PPTDocumentError(f"VBA工程解压失败: {e}")
+        if len(data) != size:
+            raise PPTDocumentError(f"VBA工程大小不一致: {len(data)}（应为 {size}）")
+        return data
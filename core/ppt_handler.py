@@ -7,31 +7,88 @@ import logging
 from typing import List, Optional
 import win32com.client
 import pythoncom
+from core.office_profile import SessionProfile, is_app_running
 from core.vba_component import VBAComponent
 
 
 class PowerPointVBAHandler:
     """PowerPoint VBA处理程序类"""
 
-    def __init__(self):
+    # COM 程序标识
+    PROG_ID = "PowerPoint.Application"
+
+    def __init__(self, use_ui_signal=True, isolated=False):
         self.ppt_app = None
         self.presentation = None
         self.vba_project = None
         self.logger = logging.getLogger(__name__)
+        self._use_ui_signal = use_ui_signal
+        # 应用程序来自 OfficePool 时 quit() 只断开引用，不退出应用程序
+        self._pooled = False
+        # 独立实例：用 DispatchEx 启动新的进程，不连接已运行的实例
+        self._isolated = isolated
+        # 启动应用程序时修改的设置，退出前恢复
+        self.session_profile = None
+        # 实例是否由本处理器启动；连接到用户已打开的实例时不修改设置，也不退出
+        self.owns_app = False
 
     def initialize(self) -> bool:
         """初始化COM组件"""
         try:
             pythoncom.CoInitialize()
-            self.ppt_app = win32com.client.Dispatch("PowerPoint.Application")
+        except Exception as e:
+            self.logger.error(f"PowerPoint应用程序初始化失败: {e}")
+            return False
+        return self.launch()
+
+    def launch(self) -> bool:
+        """启动PowerPoint应用程序（调用线程需已初始化COM）"""
+        try:
+            # PowerPoint 只有一个实例，DispatchEx 也会连接到用户已打开的实例
+            self.owns_app = not is_app_running(self.PROG_ID)
+            dispatch = win32com.client.DispatchEx if self._isolated else win32com.client.Dispatch
+            self.ppt_app = dispatch(self.PROG_ID)
+            if not self.owns_app:
+                self.session_profile = None
+                self.logger.info("已连接到正在运行的PowerPoint，不修改其设置，退出时也不关闭")
+                return True
             self.ppt_app.Visible = 1  # ppWindowMinimized = 2, ppWindowNormal = 1
             self.ppt_app.DisplayAlerts = 0  # ppAlertsNone = 0
+            self.session_profile = SessionProfile()
+            self._apply_session_profile()
             self.logger.info("PowerPoint应用程序初始化成功")
             return True
         except Exception as e:
             self.logger.error(f"PowerPoint应用程序初始化失败: {e}")
             return False
 
+    def _apply_session_profile(self):
+        """精简会话设置：断开COM加载项（PowerPoint 没有屏幕刷新、重算等应用程序级开关）"""
+        self.session_profile.disconnect_com_addins(self.ppt_app)
+
+    @property
+    def application(self):
+        """PowerPoint应用程序的COM对象"""
+        return self.ppt_app
+
+    def process_id(self) -> Optional[int]:
+        """PowerPoint进程ID（用于终止卡住的实例）"""
+        try:
+            import win32process
+            return win32process.GetWindowThreadProcessId(self.ppt_app.HWND)[1]
+        except Exception as e:
+            self.logger.debug(f"获取PowerPoint进程ID失败: {e}")
+            return None
+
+    def attach(self, app):
+        """
+        使用已启动的PowerPoint实例（来自 OfficePool）
+
+        quit() 时只断开引用，不退出PowerPoint，也不释放调用线程的COM
+        """
+        self.ppt_app = app
+        self._pooled = True
+
     def open_presentation(self, file_path: str) -> bool:
         """
         打开PowerPoint演示文稿
@@ -113,8 +170,16 @@ class PowerPointVBAHandler:
     def quit(self):
         """退出PowerPoint应用程序"""
         try:
+            if self._pooled:
+                self.ppt_app = None
+                self._pooled = False
+                self.logger.info("PowerPoint应用程序已交还应用程序池")
+                return
             if self.ppt_app:
-                self.ppt_app.Quit()
+                if self.owns_app:
+                    if self.session_profile:
+                        self.session_profile.restore()
+                    self.ppt_app.Quit()
                 self.ppt_app = None
             pythoncom.CoUninitialize()
             self.logger.info("PowerPoint应用程序已退出")
@@ -123,7 +188,19 @@ class PowerPointVBAHandler:
 
     def get_vba_components(self) -> List[VBAComponent]:
         """
-        获取演示文稿中所有VBA组件
+        获取演示文稿中所有VBA组件（包含代码）
+
+        Returns:
+            VBA组件列表
+        """
+        return self.list_components(metadata_only=False)
+
+    def list_components(self, metadata_only: bool = True) -> List[VBAComponent]:
+        """
+        列出演示文稿中的VBA组件
+
+        Args:
+            metadata_only: 为True时只读取名称和类型，不通过COM传输代码（组件的 code 为None）
 
         Returns:
             VBA组件列表
@@ -140,8 +217,8 @@ class PowerPointVBAHandler:
                 try:
                     component_type = self._get_component_type(component)
                     if component_type:
-                        # 获取组件代码
-                        code = self._get_component_code(component)
+                        # 获取组件代码（仅列出元数据时跳过）
+                        code = None if metadata_only else self._get_component_code(component)
                         vba_component = VBAComponent(
                             name=component.Name,
                             component_type=component_type,
@@ -241,8 +318,17 @@ class PowerPointVBAHandler:
             for component in components:
                 file_path = os.path.join(folder, component.file_name)
                 try:
+                    code = component.code
+                    if code is None:
+                        # 列表只包含元数据时，导出前再从演示文稿读取代码
+                        existing_component = self._find_component(component.name)
+                        if existing_component is None:
+                            self.logger.error(f"组件不存在: {component.name}")
+                            return False
+                        code = self._get_component_code(existing_component)
+
                     with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(component.code)
+                        f.write(code)
                     self.logger.info(f"导出组件: {component.name} -> {file_path}")
                 except Exception as e:
                     self.logger.error(f"导出组件失败: {component.name} - {e}")
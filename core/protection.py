@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+保护解除 - 不启动Office，直接删除OOXML包中的保护元素
+
+COM 后端需要逐个尝试密码调用 Unprotect，每次失败都是一次COM异常；
+对自己的文件可以直接删除保护元素，一次重写压缩包即可，不需要知道密码：
+
+- Word: word/settings.xml 中的 w:documentProtection（限制编辑）和 w:writeProtection（修改密码）
+- Excel: xl/workbook.xml 中的 workbookProtection、fileSharing，以及每个工作表的 sheetProtection
+- PowerPoint: ppt/presentation.xml 中的 p:modifyVerifier（修改密码）
+"""
+import zipfile
+from functools import partial
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from core.ooxml_package import find_main_part, find_related_parts
+from core.ooxml_pipeline import PackagePlan, PipelineStage, run_pipeline
+from core.xml_stream import QName
+
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+SSML_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+PML_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+
+SETTINGS_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/settings"
+WORKSHEET_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+CHARTSHEET_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/chartsheet"
+
+# 各部件中要删除的保护元素
+WORD_SETTINGS_PROTECTION = frozenset({(W_NS, "documentProtection"), (W_NS, "writeProtection")})
+WORKBOOK_PROTECTION = frozenset({(SSML_NS, "workbookProtection"), (SSML_NS, "fileSharing")})
+SHEET_PROTECTION = frozenset({(SSML_NS, "sheetProtection")})
+PRESENTATION_PROTECTION = frozenset({(PML_NS, "modifyVerifier")})
+
+
+def find_protection_parts(zip_file: zipfile.ZipFile) -> Dict[str, FrozenSet[QName]]:
+    """
+    按主文档类型查找可能包含保护元素的部件
+
+    Returns:
+        部件名称到要删除的保护元素名称的映射
+    """
+    main_part = find_main_part(zip_file)
+    folder = main_part.split("/", 1)[0].lower()
+
+    if folder == "word":
+        return {part: WORD_SETTINGS_PROTECTION
+                for part in find_related_parts(zip_file, main_part, (SETTINGS_REL_TYPE,))}
+    if folder == "xl":
+        parts = {main_part: WORKBOOK_PROTECTION}
+        for part in find_related_parts(zip_file, main_part, (WORKSHEET_REL_TYPE, CHARTSHEET_REL_TYPE)):
+            parts[part] = SHEET_PROTECTION
+        return parts
+    if folder == "ppt":
+        return {main_part: PRESENTATION_PROTECTION}
+    return {}
+
+
+def _record_element(found: List[str], name: QName, attrs) -> bool:
+    """记录找到的保护元素，全部删除"""
+    found.append(name[1])
+    return True
+
+
+class ProtectionRemovalStage(PipelineStage):
+    """管道阶段：删除保护元素，被删除的保护保存在 removed 中（形如 "word/settings.xml: documentProtection"）"""
+
+    def __init__(self):
+        self.removed: List[str] = []
+        self._found: List[Tuple[str, List[str]]] = []
+
+    def plan(self, plan: PackagePlan):
+        for part_name, elements in find_protection_parts(plan.zip_file).items():
+            found = []
+            self._found.append((part_name, found))
+            plan.locate(part_name, elements, partial(_record_element, found))
+
+    def after_write(self, zip_file: zipfile.ZipFile):
+        for part_name, found in self._found:
+            self.removed.extend(f"{part_name}: {name}" for name in found)
+
+    def summary(self) -> List[str]:
+        if not self.removed:
+            return []
+        return [f"已解除保护: {'; '.join(self.removed)}"]
+
+
+def remove_protection(file_path: str, output_path: Optional[str] = None) -> List[str]:
+    """
+    删除文档、工作簿/工作表或演示文稿的保护（一次重写压缩包）
+
+    Args:
+        file_path: OOXML文件路径
+        output_path: 输出路径，默认覆盖源文件
+
+    Returns:
+        被删除的保护元素
+    """
+    stage = ProtectionRemovalStage()
+    run_pipeline(file_path, [stage], output_path)
+    return stage.removed
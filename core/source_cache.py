@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+源码缓存 - 按字节预算淘汰的LRU缓存
+
+VBAComponent 延迟加载的代码统一放在共享缓存中，批量处理大量文档时内存占用保持在预算以内。
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+# 共享缓存的默认字节预算
+DEFAULT_MAX_BYTES = 64 << 20
+
+
+class SourceCache:
+    """
+    线程安全的LRU源码缓存
+
+    Args:
+        max_bytes: 缓存字符串占用内存的上限，超出时淘汰最久未使用的条目
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_bytes(self) -> int:
+        """字节预算"""
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self):
+        while self._entries and self.current_bytes > self._max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(key)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """读取缓存，命中时将条目移到最近使用的位置"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: str):
+        """写入缓存，单个超过预算的条目不缓存"""
+        size = sys.getsizeof(value)
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+                self.current_bytes -= self._sizes.pop(key)
+            if size > self._max_bytes:
+                return
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.current_bytes += size
+            self._evict()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], str]) -> str:
+        """
+        读取缓存，未命中时调用 loader 加载并写入缓存
+
+        加载过程不持有锁，多个线程同时未命中同一条目时可能重复加载。
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def discard(self, key: Hashable):
+        """删除一个条目"""
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+                self.current_bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.current_bytes = 0
+
+
+_shared_cache = SourceCache()
+
+
+def get_source_cache() -> SourceCache:
+    """获取所有 VBAComponent 共享的源码缓存"""
+    return _shared_cache
+
+
+def configure_source_cache(max_bytes: int):
+    """
+    设置共享源码缓存的字节预算
+
+    Args:
+        max_bytes: 字节预算，调小时立即淘汰多出的条目
+    """
+    _shared_cache.max_bytes = max_bytes
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+VBA工程探测 - 只读取压缩包中央目录或OLE目录，判断文件是否包含VBA工程
+
+不解压部件、不解析VBA工程，用于在启动Office或完整解析之前跳过不含宏的文件：
+
+- OOXML (.docm/.xlsm/.pptm 等): 中央目录中是否有 word|xl|ppt/vbaProject.bin
+- Word 97-2003 (.doc/.dot): Macros/VBA 存储
+- Excel 97-2003 (.xls/.xlt): _VBA_PROJECT_CUR/VBA 存储
+  （OleDirectory 只沿目录链读取需要的目录扇区，不加载FAT，与读取中央目录的开销相当）
+- PowerPoint 97-2003 (.ppt/.pot): VBA工程压缩保存在 PowerPoint Document 流中，
+  按持久对象目录定位 ExOleObjStg 记录（只读几个记录头，不解压）；
+  需要读取流数据，只有根存储下存在该流时才完整打开复合文件
+"""
+import logging
+import zipfile
+from typing import Optional, Union
+
+from core.handler_factory import ContainerFormat, VBAHandlerFactory
+from core.ole_file import OleDirectory, OleDirEntry, OleFile, OleFileError
+from core.ooxml_package import find_vba_part
+from core.ppt_document import PPT_DOCUMENT_STREAM, PPTDocument, PPTDocumentError
+
+
+logger = logging.getLogger(__name__)
+
+# 97-2003 格式中VBA工程所在的存储（Word、Excel）
+LEGACY_VBA_STORAGES = ("Macros", "_VBA_PROJECT_CUR")
+
+
+class VBAProbe:
+    """
+    VBA工程探测结果
+
+    Attributes:
+        has_vba: 是否包含VBA工程，无法判断时为None（调用方应按可能包含处理）
+        vba_path: VBA工程位置（OOXML部件名称或OLE存储名称）
+        vba_size: VBA工程大小（vbaProject.bin 解压后的大小，或OLE存储中各流大小之和）
+    """
+
+    def __init__(self, has_vba: Optional[bool], vba_path: Optional[str] = None, vba_size: int = 0):
+        self.has_vba = has_vba
+        self.vba_path = vba_path
+        self.vba_size = vba_size
+
+    @property
+    def macro_free(self) -> bool:
+        """确定不包含VBA工程（可以不启动Office）"""
+        return self.has_vba is False
+
+    def __repr__(self):
+        return f"VBAProbe(has_vba={self.has_vba}, vba_path={self.vba_path!r}, vba_size={self.vba_size})"
+
+
+def _storage_size(directory: OleDirectory, storage: OleDirEntry) -> int:
+    """存储下全部流的大小之和（只读取目录）"""
+    size = 0
+    stack = [storage]
+    while stack:
+        entry = stack.pop()
+        for child in directory.children(entry).values():
+            if child.is_storage:
+                stack.append(child)
+            elif child.is_stream:
+                size += child.size
+    return size
+
+
+def find_legacy_vba_storage(ole: Union[OleFile, OleDirectory]) -> Optional[OleDirEntry]:
+    """
+    查找97-2003 Word/Excel 文件中的VBA工程存储（其下有 VBA 子存储）
+
+    Args:
+        ole: 已打开的复合文件或其目录
+
+    Returns:
+        Macros 或 _VBA_PROJECT_CUR 存储，没有VBA工程时返回None
+    """
+    for name in LEGACY_VBA_STORAGES:
+        storage = ole.get_entry(name)
+        if storage is not None and storage.is_storage and ole.exists(f"{name}/VBA"):
+            return storage
+    return None
+
+
+def _probe_package(file_path: str) -> VBAProbe:
+    """读取压缩包中央目录查找 vbaProject.bin"""
+    with zipfile.ZipFile(file_path, "r") as zip_file:
+        info = find_vba_part(zip_file)
+    if info is None:
+        return VBAProbe(False)
+    return VBAProbe(True, info.filename, info.file_size)
+
+
+def _probe_ole(file_path: str) -> VBAProbe:
+    """读取OLE目录查找VBA存储，PowerPoint文件再读取文档流"""
+    with open(file_path, "rb") as f:
+        directory = OleDirectory(f)
+        storage = find_legacy_vba_storage(directory)
+        if storage is not None:
+            return VBAProbe(True, storage.name, _storage_size(directory, storage))
+        if not directory.exists(PPT_DOCUMENT_STREAM):
+            return VBAProbe(False)
+
+    with OleFile.open(file_path) as ole:
+        document = PPTDocument(ole)
+        offset = document.find_vba_storage()
+        size = document.vba_storage_size(offset) if offset is not None else 0
+        # 释放对 mmap 的引用，复合文件才能正常关闭
+        del document
+    if offset is None:
+        return VBAProbe(False)
+    return VBAProbe(True, PPT_DOCUMENT_STREAM, size)
+
+
+def probe_vba(file_path: str) -> VBAProbe:
+    """
+    判断文件是否包含VBA工程
+
+    Args:
+        file_path: Office文件路径
+
+    Returns:
+        探测结果；文件无法读取或格式无法识别时 has_vba 为None
+    """
+    try:
+        container = VBAHandlerFactory.detect_container(file_path)
+        if container == ContainerFormat.OLE:
+            return _probe_ole(file_path)
+        if container == ContainerFormat.OOXML:
+            return _probe_package(file_path)
+        logger.warning(f"无法识别的文件格式: {file_path}")
+    except (OSError, zipfile.BadZipFile, OleFileError, PPTDocumentError) as e:
+        logger.warning(f"探测VBA工程失败: {file_path} - {e}")
+    return VBAProbe(None)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+宏文档构建 - 不启动Office，由VBA源码文件夹生成启用宏的 .docm/.xlsm/.pptm
+
+构建过程是纯计算：扫描源码文件夹、生成 vbaProject.bin、写入模板包，
+因此批量构建可以用进程池分散到多个CPU核心上。
+"""
+import os
+import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from core.vba_component import scan_vba_folder
+from core.vba_writer import (
+    build_vba_project, DEFAULT_CODEPAGE, HOST_WORD, HOST_EXCEL, HOST_POWERPOINT
+)
+from core.ooxml_package import find_main_part, set_vba_project
+
+
+logger = logging.getLogger(__name__)
+
+# 主文档部件所在目录与宿主应用程序的对应关系
+MAIN_PART_FOLDER_HOSTS = {
+    "word": HOST_WORD,
+    "xl": HOST_EXCEL,
+    "ppt": HOST_POWERPOINT,
+}
+
+
+def detect_package_host(file_path: str) -> Optional[str]:
+    """
+    根据主文档部件所在目录判断OOXML包的宿主应用程序
+
+    Args:
+        file_path: OOXML文件路径
+
+    Returns:
+        HOST_WORD/HOST_EXCEL/HOST_POWERPOINT，无法识别时返回None
+    """
+    with zipfile.ZipFile(file_path, "r") as zip_file:
+        main_part = find_main_part(zip_file)
+    return MAIN_PART_FOLDER_HOSTS.get(main_part.split("/", 1)[0].lower())
+
+
+def build_macro_document(template_path: str, vba_folder: str, output_path: str,
+                         codepage: int = DEFAULT_CODEPAGE) -> bool:
+    """
+    用文件夹中的VBA源码生成完整的VBA工程并写入模板，输出启用宏的文档
+
+    模板中已有的VBA工程会被整体替换。
+
+    Args:
+        template_path: 模板文件路径（.docx/.docm/.xlsx/.xlsm/.pptx/.pptm 等）
+        vba_folder: VBA源码文件夹
+        output_path: 输出文件路径
+        codepage: VBA工程代码页
+
+    Returns:
+        是否构建成功
+    """
+    try:
+        host = detect_package_host(template_path)
+        if host is None:
+            logger.error(f"无法识别模板类型: {template_path}")
+            return False
+
+        components = scan_vba_folder(vba_folder)
+        vba_data = build_vba_project(components, host, codepage)
+
+        output_folder = os.path.dirname(os.path.abspath(output_path))
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        set_vba_project(template_path, vba_data, output_path)
+        logger.info(f"构建完成: {output_path}（{len(components)} 个组件）")
+        return True
+
+    except Exception as e:
+        logger.error(f"构建宏文档失败: {output_path} - {e}")
+        return False
+
+
+def build_macro_documents(jobs: List[Tuple[str, str, str]], max_workers: Optional[int] = None,
+                          codepage: int = DEFAULT_CODEPAGE) -> List[bool]:
+    """
+    使用进程池批量构建宏文档
+
+    Args:
+        jobs: (模板路径, VBA源码文件夹, 输出路径) 列表
+        max_workers: 最大进程数，默认为CPU核心数
+        codepage: VBA工程代码页
+
+    Returns:
+        与 jobs 顺序一致的构建结果
+    """
+    if len(jobs) <= 1:
+        return [build_macro_document(*job, codepage=codepage) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(build_macro_document, *job, codepage=codepage) for job in jobs]
+        return [future.result() for future in futures]
@@ -2,6 +2,12 @@
 """
 VBA组件类 - 定义VBA代码组件的结构
 """
+import os
+import logging
+from functools import partial
+from typing import Callable, Hashable, List, Optional
+
+from core.source_cache import get_source_cache
 
 
 class VBAComponent:
@@ -35,18 +41,45 @@ class VBAComponent:
         TYPE_DOCUMENT: "文档模块"
     }
 
-    def __init__(self, name: str, component_type: str, code: str = ""):
+    def __init__(self, name: str, component_type: str, code: Optional[str] = "",
+                 loader: Optional[Callable[[], str]] = None, cache_key: Optional[Hashable] = None,
+                 host_object: Optional[str] = None, is_empty: Optional[bool] = None):
         """
         初始化VBA组件
 
         Args:
             name: 组件名称
             component_type: 组件类型
-            code: VBA源代码
+            code: VBA源代码，None 表示只读取了元数据、尚未读取代码
+            loader: 延迟加载代码的函数，提供时忽略 code，代码在首次访问时加载到共享缓存
+            cache_key: 共享缓存中的键，应能唯一标识代码来源（文件、版本、模块名）
+            host_object: 文档模块对应的宿主对象（如Excel工作表名称），未知时为None
+            is_empty: 模块是否没有代码，未检查时为None
         """
         self.name = name
         self.component_type = component_type
-        self.code = code
+        self.host_object = host_object
+        self.is_empty = is_empty
+        self._code = None if loader else code
+        self._loader = loader
+        self._cache_key = cache_key if cache_key is not None else object()
+
+    @property
+    def code(self) -> Optional[str]:
+        """VBA源代码，延迟加载的组件从共享缓存读取，未命中时调用 loader"""
+        if self._loader is None:
+            return self._code
+        return get_source_cache().get_or_load(self._cache_key, self._loader)
+
+    @code.setter
+    def code(self, value: Optional[str]):
+        self._code = value
+        self._loader = None
+
+    @property
+    def is_lazy(self) -> bool:
+        """代码是否为延迟加载"""
+        return self._loader is not None
 
     @property
     def file_ext(self) -> str:
@@ -60,8 +93,13 @@ class VBAComponent:
 
     @property
     def display_name(self) -> str:
-        """获取显示名称（包含类型）"""
-        return f"{self.name} ({self.display_type})"
+        """获取显示名称（包含类型，以及已知的宿主对象和空模块标记）"""
+        display_type = self.display_type
+        if self.host_object:
+            display_type = f"{display_type}: {self.host_object}"
+        if self.is_empty:
+            return f"{self.name} ({display_type}) [空]"
+        return f"{self.name} ({display_type})"
 
     @property
     def file_name(self) -> str:
@@ -73,3 +111,88 @@ class VBAComponent:
 
     def __str__(self):
         return self.display_name
+
+
+def read_source_file(file_path: str) -> str:
+    """
+    读取VBA源码文件（优先UTF-8，失败时使用GBK）
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        文件内容
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        # 尝试使用其他编码
+        with open(file_path, 'r', encoding='gbk') as f:
+            return f.read()
+
+
+def scan_vba_folder(folder: str) -> List[VBAComponent]:
+    """
+    扫描文件夹获取VBA组件列表
+
+    Args:
+        folder: 文件夹路径
+
+    Returns:
+        VBA组件列表
+    """
+    components = []
+    extension_map = {
+        '.bas': VBAComponent.TYPE_MODULE,
+        '.cls': VBAComponent.TYPE_CLASS,
+        '.frm': VBAComponent.TYPE_USERFORM
+    }
+    
+    # 文件名包含这些关键词时，识别为对应类型
+    NAME_TYPE_KEYWORDS = {
+        "Form": VBAComponent.TYPE_USERFORM,
+        "ThisDocument": VBAComponent.TYPE_DOCUMENT
+    }
+
+    try:
+        for file_name in os.listdir(folder):
+            file_path = os.path.join(folder, file_name)
+            if not os.path.isfile(file_path):
+                continue
+
+            # 获取文件扩展名
+            _, ext = os.path.splitext(file_name)
+            ext = ext.lower()
+
+            if ext in extension_map:
+                # 获取组件名称（不含扩展名）
+                name = os.path.splitext(file_name)[0]
+                
+                # 检查文件名是否包含特定关键词来决定类型
+                component_type = None
+                for keyword, vba_type in NAME_TYPE_KEYWORDS.items():
+                    if keyword in name:
+                        component_type = vba_type
+                        logging.debug(f"文件 {file_name} 通过关键词 '{keyword}' 识别为类型: {vba_type}")
+                        break
+                
+                # 如果没有通过关键词确定类型，则使用扩展名映射
+                if component_type is None:
+                    component_type = extension_map[ext]
+                    logging.debug(f"文件 {file_name} 通过扩展名 '{ext}' 识别为类型: {component_type}")
+                
+                # 文件内容在首次访问 code 时读取，以修改时间和大小区分文件版本
+                stat = os.stat(file_path)
+                component = VBAComponent(
+                    name=name,
+                    component_type=component_type,
+                    loader=partial(read_source_file, file_path),
+                    cache_key=("file", os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+                )
+                components.append(component)
+
+    except Exception as e:
+        logging.error(f"扫描文件夹失败: {e}")
+
+    return components
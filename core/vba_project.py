@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+VBA工程解析 - 解析 vbaProject.bin 中的 PROJECT 流和 dir 流，读取模块源码
+"""
+import codecs
+import struct
+from typing import Dict, List, Optional, Tuple, Union
+
+from core.ole_file import OleFile
+from core.ovba_compression import decompress, iter_chunks
+
+
+# dir 流记录编号
+DIR_PROJECTSYSKIND = 0x0001
+DIR_PROJECTLCID = 0x0002
+DIR_PROJECTCODEPAGE = 0x0003
+DIR_PROJECTNAME = 0x0004
+DIR_PROJECTDOCSTRING = 0x0005
+DIR_PROJECTHELPFILEPATH = 0x0006
+DIR_PROJECTHELPCONTEXT = 0x0007
+DIR_PROJECTLIBFLAGS = 0x0008
+DIR_PROJECTVERSION = 0x0009
+DIR_PROJECTCONSTANTS = 0x000C
+DIR_REFERENCEREGISTERED = 0x000D
+DIR_REFERENCEPROJECT = 0x000E
+DIR_PROJECTMODULES = 0x000F
+DIR_TERMINATOR = 0x0010
+DIR_PROJECTCOOKIE = 0x0013
+DIR_PROJECTLCIDINVOKE = 0x0014
+DIR_REFERENCENAME = 0x0016
+DIR_MODULENAME = 0x0019
+DIR_MODULESTREAMNAME = 0x001A
+DIR_MODULEDOCSTRING = 0x001C
+DIR_MODULEHELPCONTEXT = 0x001E
+DIR_MODULETYPE_PROCEDURAL = 0x0021
+DIR_MODULETYPE_NONPROCEDURAL = 0x0022
+DIR_MODULE_TERMINATOR = 0x002B
+DIR_MODULECOOKIE = 0x002C
+DIR_MODULEOFFSET = 0x0031
+DIR_MODULESTREAMNAMEUNICODE = 0x0032
+DIR_PROJECTCONSTANTSUNICODE = 0x003C
+DIR_PROJECTHELPFILEPATH2 = 0x003D
+DIR_REFERENCENAMEUNICODE = 0x003E
+DIR_PROJECTDOCSTRINGUNICODE = 0x0040
+DIR_MODULENAMEUNICODE = 0x0047
+DIR_MODULEDOCSTRINGUNICODE = 0x0048
+
+# PROJECT 流中声明模块类型的键
+PROJECT_KEY_MODULE = "module"
+PROJECT_KEY_CLASS = "class"
+PROJECT_KEY_BASECLASS = "baseclass"
+PROJECT_KEY_DOCUMENT = "document"
+
+
+class VBAProjectError(Exception):
+    """VBA工程格式错误"""
+    pass
+
+
+class VBAModuleInfo:
+    """dir 流中一个模块的描述信息"""
+
+    def __init__(self, name: str, stream_name: str, offset: int, procedural: bool):
+        """
+        Args:
+            name: 模块名称
+            stream_name: 模块流名称（位于 VBA 存储下）
+            offset: 源码在模块流中的偏移（之前为 p-code 缓存）
+            procedural: 是否为标准模块（MODULETYPE 0x0021）
+        """
+        self.name = name
+        self.stream_name = stream_name
+        self.offset = offset
+        self.procedural = procedural
+        self.project_kind = ""  # PROJECT 流中的声明：module/class/baseclass/document
+
+    def __repr__(self):
+        return f"VBAModuleInfo(name='{self.name}', stream='{self.stream_name}', offset={self.offset})"
+
+
+def parse_dir_records(data: bytes) -> List[Tuple[int, bytes]]:
+    """
+    将解压后的 dir 流拆分为 (记录编号, 数据) 列表
+
+    PROJECTVERSION 记录的 Size 字段固定为 4，但实际携带 6 字节数据，需要特殊处理。
+    """
+    records = []
+    pos = 0
+    total = len(data)
+    while pos + 6 <= total:
+        record_id, size = struct.unpack_from("<HI", data, pos)
+        pos += 6
+        if record_id == DIR_PROJECTVERSION:
+            size = 6
+        records.append((record_id, bytes(data[pos:pos + size])))
+        pos += size
+        if record_id == DIR_TERMINATOR:
+            break
+    return records
+
+
+def serialize_dir_records(records: List[Tuple[int, bytes]]) -> bytes:
+    """将 dir 记录列表序列化为未压缩的 dir 流"""
+    parts = []
+    for record_id, payload in records:
+        size = 4 if record_id == DIR_PROJECTVERSION else len(payload)
+        parts.append(struct.pack("<HI", record_id, size))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def codepage_to_encoding(codepage: int) -> str:
+    """将 Windows 代码页转换为 Python 编码名称"""
+    if codepage == 65001:
+        return "utf-8"
+    if codepage == 10000:
+        return "mac_roman"
+    for name in (f"cp{codepage}", f"windows-{codepage}"):
+        try:
+            codecs.lookup(name)
+            return name
+        except LookupError:
+            continue
+    return "latin-1"
+
+
+def split_attribute_lines(source: str) -> Tuple[List[str], List[str]]:
+    """
+    将模块源码拆分为开头的 Attribute VB_* 隐藏行和正文行
+
+    Returns:
+        (属性行列表, 正文行列表)，正文末尾的空行已去除
+    """
+    lines = source.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    index = 0
+    while index < len(lines) and lines[index].startswith("Attribute VB_"):
+        index += 1
+    body = lines[index:]
+    while body and body[-1] == "":
+        body.pop()
+    return lines[:index], body
+
+
+def strip_attribute_lines(source: str) -> str:
+    """
+    去掉模块开头的 Attribute VB_* 隐藏行并统一为 CRLF
+
+    与 VBE 的 CodeModule.Lines 返回的内容保持一致。
+    """
+    return "\r\n".join(split_attribute_lines(source)[1])
+
+
+def build_module_source(attributes: List[str], code: str) -> str:
+    """
+    组合模块流中保存的完整源码
+
+    Args:
+        attributes: Attribute VB_* 隐藏行
+        code: 模块正文（导入文件中自带的 Attribute 行会被忽略）
+
+    Returns:
+        以 CRLF 分隔、以 CRLF 结尾的源码
+    """
+    _, body = split_attribute_lines(code)
+    return "".join(line + "\r\n" for line in list(attributes) + body)
+
+
+class VBAProject:
+    """
+    VBA工程（vbaProject.bin 或旧格式文档中的VBA存储）
+
+    Args:
+        ole: 已打开的复合文件
+        root: VBA工程所在的存储路径，OOXML 中为 ''，Word 97-2003 中为 'Macros'
+    """
+
+    def __init__(self, ole: OleFile, root: str = ""):
+        self.ole = ole
+        self.root = root.strip("/")
+        self.records: List[Tuple[int, bytes]] = []
+        self.modules: List[VBAModuleInfo] = []
+        self.codepage = 1252
+        self.name = ""
+        self.project_properties: Dict[str, str] = {}
+        self._load()
+
+    def _path(self, *parts: str) -> str:
+        return "/".join(p for p in (self.root,) + parts if p)
+
+    @property
+    def vba_storage_path(self) -> str:
+        """VBA 存储（包含 dir、_VBA_PROJECT 和模块流）的路径"""
+        return self._path("VBA")
+
+    @property
+    def dir_stream_path(self) -> str:
+        """dir 流的路径"""
+        return self._path("VBA", "dir")
+
+    @property
+    def encoding(self) -> str:
+        """工程使用的 MBCS 编码"""
+        return codepage_to_encoding(self.codepage)
+
+    def _load(self):
+        """解析 dir 流和 PROJECT 流"""
+        if not self.ole.exists(self.dir_stream_path):
+            raise VBAProjectError("VBA工程缺少 dir 流")
+
+        self.records = parse_dir_records(decompress(self.ole.open_stream(self.dir_stream_path)))
+
+        current = None
+        for record_id, payload in self.records:
+            if record_id == DIR_PROJECTCODEPAGE:
+                self.codepage = struct.unpack_from("<H", payload)[0]
+            elif record_id == DIR_PROJECTNAME:
+                self.name = payload.decode(self.encoding, errors="replace")
+            elif record_id == DIR_MODULENAME:
+                current = VBAModuleInfo(payload.decode(self.encoding, errors="replace"),
+                                        "", 0, True)
+            elif current is None:
+                continue
+            elif record_id == DIR_MODULENAMEUNICODE:
+                current.name = payload.decode("utf-16-le", errors="replace")
+            elif record_id == DIR_MODULESTREAMNAME:
+                current.stream_name = payload.decode(self.encoding, errors="replace")
+            elif record_id == DIR_MODULESTREAMNAMEUNICODE:
+                current.stream_name = payload.decode("utf-16-le", errors="replace")
+            elif record_id == DIR_MODULEOFFSET:
+                current.offset = struct.unpack_from("<I", payload)[0]
+            elif record_id == DIR_MODULETYPE_PROCEDURAL:
+                current.procedural = True
+            elif record_id == DIR_MODULETYPE_NONPROCEDURAL:
+                current.procedural = False
+            elif record_id == DIR_MODULE_TERMINATOR:
+                if not current.stream_name:
+                    current.stream_name = current.name
+                self.modules.append(current)
+                current = None
+
+        self._load_project_stream()
+
+    def _load_project_stream(self):
+        """解析 PROJECT 文本流，获取模块的声明类型"""
+        project_path = self._path("PROJECT")
+        if not self.ole.exists(project_path):
+            return
+
+        text = self.ole.read_stream(project_path).decode(self.encoding, errors="replace")
+        kinds: Dict[str, str] = {}
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith("["):
+                # [Host Extender Info] 与 [Workspace] 段不包含模块声明
+                break
+            if "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            key = key.strip().lower()
+            if key in (PROJECT_KEY_MODULE, PROJECT_KEY_CLASS,
+                       PROJECT_KEY_BASECLASS, PROJECT_KEY_DOCUMENT):
+                module_name = value.split("/", 1)[0].strip()
+                kinds[module_name.lower()] = key
+            else:
+                self.project_properties[key] = value.strip()
+
+        for module in self.modules:
+            module.project_kind = kinds.get(module.name.lower(), "")
+
+    def get_module(self, name: str) -> Optional[VBAModuleInfo]:
+        """按名称查找模块（不区分大小写）"""
+        for module in self.modules:
+            if module.name.lower() == name.lower():
+                return module
+        return None
+
+    def module_stream_path(self, module: VBAModuleInfo) -> str:
+        """模块流在复合文件中的路径"""
+        return self._path("VBA", module.stream_name)
+
+    def read_module_data(self, module: VBAModuleInfo) -> Union[bytes, memoryview]:
+        """读取模块流中压缩的源码部分（不复制数据）"""
+        stream = self.ole.open_stream(self.module_stream_path(module))
+        return memoryview(stream)[module.offset:]
+
+    def read_module_source(self, module: VBAModuleInfo, strip_attributes: bool = True) -> str:
+        """
+        读取并解压模块源码
+
+        Args:
+            module: 模块信息
+            strip_attributes: 是否去掉开头的 Attribute VB_* 行
+
+        Returns:
+            模块源码
+        """
+        source = decompress(self.read_module_data(module)).decode(self.encoding, errors="replace")
+        if strip_attributes:
+            return strip_attribute_lines(source)
+        return source
+
+    def is_module_empty(self, module: VBAModuleInfo) -> bool:
+        """
+        判断模块是否没有代码（除 Attribute 行、Option 语句和空行外）
+
+        Attribute 行不会超过一个压缩块（4096字节），源码跨多个块的模块直接判定为非空，不解压。
+        """
+        chunks = iter_chunks(self.read_module_data(module))
+        next(chunks, None)
+        if next(chunks, None) is not None:
+            return False
+        for line in self.read_module_source(module).splitlines():
+            line = line.strip()
+            if line and not line.lower().startswith("option "):
+                return False
+        return True
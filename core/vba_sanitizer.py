@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+VBA清除 - 不启动Office，重写OOXML包删除VBA工程
+
+删除 vbaProject.bin 及其关联部件（vbaData.xml、签名等）和指向它们的关系，修正内容类型，
+可选地把 .docm/.xlsm/.pptm 转换为 .docx/.xlsx/.pptx。
+VBARemovalStage 可以与其他清理阶段组合在同一次管道重写中（见 ooxml_pipeline）。
+除少量XML部件外所有部件都流式复制，单个文件的内存占用恒定，适合在多进程中批量处理。
+"""
+import os
+import logging
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional, Set
+
+from core.ooxml_package import (
+    CONTENT_TYPES_PART, CONTENT_TYPES_NS, RELATIONSHIPS_NS, MACRO_ENABLED_CONTENT_TYPES,
+    VBA_PROJECT_CONTENT_TYPE,
+    find_vba_part, rels_part_name, resolve_target, source_part_of_rels, remove_elements
+)
+from core.ooxml_pipeline import PackagePlan, PipelineStage, rewrite_whole, run_pipeline
+from core.triage import probe_vba
+
+
+logger = logging.getLogger(__name__)
+
+# 启用宏的扩展名 -> 不含宏的扩展名
+MACRO_FREE_EXTENSIONS = {
+    ".docm": ".docx",
+    ".dotm": ".dotx",
+    ".xlsm": ".xlsx",
+    ".xltm": ".xltx",
+    ".pptm": ".pptx",
+    ".potm": ".potx",
+}
+
+# 启用宏的主文档内容类型 -> 不含宏的内容类型
+MACRO_FREE_CONTENT_TYPES = {v: k for k, v in MACRO_ENABLED_CONTENT_TYPES.items()}
+
+
+def macro_free_path(file_path: str) -> str:
+    """把启用宏的扩展名替换为对应的不含宏的扩展名"""
+    base, ext = os.path.splitext(file_path)
+    return base + MACRO_FREE_EXTENSIONS.get(ext.lower(), ext)
+
+
+def _collect_vba_parts(zip_file: zipfile.ZipFile, vba_part: str, names: Set[str]) -> Set[str]:
+    """收集VBA工程及其关系链上的所有部件（含各自的关系部件）"""
+    dropped = set()
+    pending = [vba_part]
+    while pending:
+        part = pending.pop()
+        if part in dropped or part not in names:
+            continue
+        dropped.add(part)
+        rels_part = rels_part_name(part)
+        if rels_part not in names:
+            continue
+        dropped.add(rels_part)
+        for rel in ET.fromstring(zip_file.read(rels_part)).iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+            if rel.get("TargetMode") != "External":
+                pending.append(resolve_target(part, rel.get("Target", "")))
+    return dropped
+
+
+def _relationship_ids(rels_data: bytes, source_part: str, dropped: Set[str]) -> List[str]:
+    """指向已删除部件的关系的 Id"""
+    ids = []
+    for rel in ET.fromstring(rels_data).iter(f"{{{RELATIONSHIPS_NS}}}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        if resolve_target(source_part, rel.get("Target", "")) in dropped:
+            ids.append(rel.get("Id"))
+    return ids
+
+
+def _strip_content_types(types_data: bytes, main_part: str, dropped: Set[str],
+                         remaining: Set[str], convert: bool) -> bytes:
+    """删除已删除部件的内容类型，转换格式时把主文档改回不含宏的内容类型"""
+    root = ET.fromstring(types_data)
+    override_tag = f"{{{CONTENT_TYPES_NS}}}Override"
+    overridden = {e.get("PartName", "").lstrip("/") for e in root if e.tag == override_tag}
+    overrides = []
+    defaults = []
+    for element in root:
+        if element.tag == override_tag:
+            part_name = element.get("PartName", "")
+            if part_name.lstrip("/") in dropped:
+                overrides.append(part_name)
+            elif convert and part_name.lstrip("/") == main_part:
+                content_type = element.get("ContentType")
+                if content_type in MACRO_FREE_CONTENT_TYPES:
+                    types_data = types_data.replace(
+                        f'ContentType="{content_type}"'.encode(),
+                        f'ContentType="{MACRO_FREE_CONTENT_TYPES[content_type]}"'.encode())
+        elif element.get("ContentType") == VBA_PROJECT_CONTENT_TYPE:
+            # 其他部件仍依赖该默认类型时保留，避免它们失去内容类型
+            suffix = "." + element.get("Extension", "").lower()
+            if not any(name.lower().endswith(suffix) for name in remaining - overridden):
+                defaults.append(element.get("Extension", ""))
+
+    types_data = remove_elements(types_data, "Override", "PartName", overrides)
+    return remove_elements(types_data, "Default", "Extension", defaults)
+
+
+class VBARemovalStage(PipelineStage):
+    """
+    管道阶段：删除VBA工程及其关联部件和关系，修正内容类型
+
+    Args:
+        convert: 是否把主文档改回不含宏的内容类型（输出文件扩展名由调用方决定）
+    """
+
+    def __init__(self, convert: bool = False):
+        self.convert = convert
+        self.removed_parts: List[str] = []
+
+    def plan(self, plan: PackagePlan):
+        zip_file = plan.zip_file
+        info = find_vba_part(zip_file)
+        dropped = _collect_vba_parts(zip_file, info.filename, plan.names) if info else set()
+        for part_name in dropped:
+            plan.remove(part_name)
+        self.removed_parts = sorted(dropped)
+
+        remaining = plan.remaining
+        for name in remaining:
+            if name.endswith(".rels"):
+                ids = _relationship_ids(zip_file.read(name), source_part_of_rels(name), dropped)
+                if ids:
+                    plan.transform(name, rewrite_whole(
+                        partial(remove_elements, tag="Relationship", attribute="Id", values=ids)))
+        if dropped or self.convert:
+            plan.transform(CONTENT_TYPES_PART, rewrite_whole(partial(
+                _strip_content_types, main_part=plan.main_part, dropped=dropped,
+                remaining=remaining, convert=self.convert)))
+
+    def summary(self) -> List[str]:
+        if not self.removed_parts:
+            return []
+        return [f"已删除VBA工程: {', '.join(self.removed_parts)}"]
+
+
+def strip_vba(file_path: str, output_path: Optional[str] = None, convert: bool = False) -> str:
+    """
+    删除OOXML文件中的VBA工程
+
+    Args:
+        file_path: 源文件路径
+        output_path: 输出路径；默认覆盖源文件，convert=True 时默认写到替换扩展名后的新文件
+        convert: 是否转换为不含宏的格式（.docx/.xlsx/.pptx 等）
+
+    Returns:
+        输出文件路径
+    """
+    if output_path is None:
+        output_path = macro_free_path(file_path) if convert else file_path
+    run_pipeline(file_path, [VBARemovalStage(convert)], output_path)
+    return output_path
+
+
+def _strip_vba_job(file_path: str, output_path: Optional[str], convert: bool) -> Optional[str]:
+    """进程池任务：失败时记录日志并返回None"""
+    try:
+        # 不含VBA工程且不需要转换格式时文件不会改动，只读中央目录即可跳过
+        if not convert and output_path is None and probe_vba(file_path).macro_free:
+            return file_path
+        return strip_vba(file_path, output_path, convert)
+    except Exception as e:
+        logger.error(f"清除VBA失败: {file_path} - {e}")
+        return None
+
+
+def strip_vba_files(file_paths: List[str], output_folder: Optional[str] = None,
+                    convert: bool = False, max_workers: Optional[int] = None) -> List[Optional[str]]:
+    """
+    使用进程池批量删除VBA工程
+
+    Args:
+        file_paths: 源文件路径列表
+        output_folder: 输出文件夹，默认写回源文件所在位置
+        convert: 是否转换为不含宏的格式
+        max_workers: 最大进程数，默认为CPU核心数
+
+    Returns:
+        与 file_paths 顺序一致的输出路径，失败的文件为None
+    """
+    jobs = []
+    for file_path in file_paths:
+        output_path = None
+        if output_folder:
+            name = os.path.basename(macro_free_path(file_path) if convert else file_path)
+            output_path = os.path.join(output_folder, name)
+        jobs.append((file_path, output_path, convert))
+
+    if output_folder and not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    if len(jobs) <= 1:
+        return [_strip_vba_job(*job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_strip_vba_job, *zip(*jobs), chunksize=16))
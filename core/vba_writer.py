@@ -0,0 +1,558 @@
+# -*- coding: utf-8 -*-
+"""
+VBA工程写入 - 原生生成或修改 vbaProject.bin
+
+支持替换模块源码、新增标准模块/类模块/文档模块、删除模块，以及从零生成完整的VBA工程。
+修改后的模块只保存压缩源码（MODULEOFFSET 置0），并丢弃过期的 p-code 缓存，
+Office 下次打开文档时会从源码重新编译。
+"""
+import random
+import struct
+import uuid
+from typing import List, Optional, Tuple
+
+from core.ole_writer import OleStorage, write_ole
+from core.ovba_compression import compress, decompress, recompress
+from core.vba_component import VBAComponent
+from core.vba_project import (
+    VBAProject, VBAProjectError, VBAModuleInfo, codepage_to_encoding,
+    serialize_dir_records, split_attribute_lines, build_module_source,
+    PROJECT_KEY_MODULE, PROJECT_KEY_CLASS, PROJECT_KEY_BASECLASS, PROJECT_KEY_DOCUMENT,
+    DIR_PROJECTSYSKIND, DIR_PROJECTLCID, DIR_PROJECTLCIDINVOKE, DIR_PROJECTCODEPAGE,
+    DIR_PROJECTNAME, DIR_PROJECTDOCSTRING, DIR_PROJECTDOCSTRINGUNICODE,
+    DIR_PROJECTHELPFILEPATH, DIR_PROJECTHELPFILEPATH2, DIR_PROJECTHELPCONTEXT,
+    DIR_PROJECTLIBFLAGS, DIR_PROJECTVERSION, DIR_PROJECTCONSTANTS,
+    DIR_PROJECTCONSTANTSUNICODE, DIR_REFERENCENAME, DIR_REFERENCENAMEUNICODE,
+    DIR_REFERENCEREGISTERED, DIR_REFERENCEPROJECT, DIR_PROJECTMODULES,
+    DIR_PROJECTCOOKIE, DIR_TERMINATOR, DIR_MODULENAME, DIR_MODULENAMEUNICODE,
+    DIR_MODULESTREAMNAME, DIR_MODULESTREAMNAMEUNICODE, DIR_MODULEDOCSTRING,
+    DIR_MODULEDOCSTRINGUNICODE, DIR_MODULEOFFSET, DIR_MODULEHELPCONTEXT,
+    DIR_MODULECOOKIE, DIR_MODULETYPE_PROCEDURAL, DIR_MODULETYPE_NONPROCEDURAL,
+    DIR_MODULE_TERMINATOR
+)
+
+
+# _VBA_PROJECT 流：版本号 0xFFFF 表示没有可用的 p-code，Office 会从源码重新编译
+VBA_PROJECT_STREAM_NO_PCODE = b"\xCC\x61\xFF\xFF\x00\x00\x00"
+
+# 与 p-code 配套的 SRP 缓存流前缀
+SRP_STREAM_PREFIX = "__SRP_"
+
+# 新建工程默认使用的代码页（简体中文，与本工具处理的文档一致）
+DEFAULT_CODEPAGE = 936
+
+# 宿主应用程序（取值与 FileType.value 一致）
+HOST_WORD = "word"
+HOST_EXCEL = "excel"
+HOST_POWERPOINT = "ppt"
+
+# 各宿主新建工程时的默认工程名
+HOST_PROJECT_NAMES = {
+    HOST_WORD: "Project",
+    HOST_EXCEL: "VBAProject",
+    HOST_POWERPOINT: "VBAProject",
+}
+
+# 各宿主新建工程时必须存在的文档模块及其 VB_Base
+HOST_DOCUMENT_MODULES = {
+    HOST_WORD: [("ThisDocument", "1Normal.ThisDocument")],
+    HOST_EXCEL: [("ThisWorkbook", "0{00020819-0000-0000-C000-000000000046}")],
+    HOST_POWERPOINT: [],
+}
+
+# Excel 工作表模块的 VB_Base
+EXCEL_SHEET_BASE = "0{00020820-0000-0000-C000-000000000046}"
+
+# 类模块的 VB_Base
+CLASS_MODULE_BASE = "0{FCFB3D2A-A0FA-1068-A738-08002B3371B5}"
+
+# 新建工程默认引用的 OLE Automation 类型库
+STDOLE_REFERENCE_NAME = "stdole"
+STDOLE_LIBID = ("*\\G{00020430-0000-0000-C000-000000000046}#2.0#0#"
+                "C:\\Windows\\System32\\stdole2.tlb#OLE Automation")
+
+# PROJECT 流中 [Host Extender Info] 段的默认内容
+HOST_EXTENDER_INFO = "&H00000001={3832D640-CF90-11CF-8E43-00A0C911005A};VBE;&H00000000"
+
+# 与 VBA 存储中固定流重名的模块名
+RESERVED_STREAM_NAMES = ("dir", "_VBA_PROJECT", "PROJECT", "PROJECTwm")
+
+
+def encrypt_project_data(project_id: str, data: bytes, seed: Optional[int] = None) -> str:
+    """
+    按 MS-OVBA 2.4.3 的数据加密算法生成 PROJECT 流中的 CMG/DPB/GC 值
+
+    Args:
+        project_id: PROJECT 流中 ID 的值（含花括号的GUID）
+        data: 待加密数据
+        seed: 随机种子字节，默认随机生成
+
+    Returns:
+        十六进制大写字符串
+    """
+    if seed is None:
+        seed = random.getrandbits(8)
+    version = 2
+    project_key = sum(project_id.encode("ascii")) & 0xFF
+
+    version_enc = seed ^ version
+    project_key_enc = seed ^ project_key
+    output = bytearray([seed, version_enc, project_key_enc])
+
+    unencrypted_1 = project_key
+    encrypted_1 = project_key_enc
+    encrypted_2 = version_enc
+    ignored = [random.getrandbits(8) for _ in range((seed & 6) // 2)]
+
+    for byte in ignored + list(struct.pack("<I", len(data))) + list(data):
+        byte_enc = byte ^ ((encrypted_2 + unencrypted_1) & 0xFF)
+        output.append(byte_enc)
+        encrypted_2 = encrypted_1
+        encrypted_1 = byte_enc
+        unencrypted_1 = byte
+
+    return output.hex().upper()
+
+
+def _split_module_groups(records: List[Tuple[int, bytes]]):
+    """
+    将 dir 记录拆分为工程信息、模块记录组和结束记录
+
+    Returns:
+        (PROJECTMODULES 之前的记录, PROJECTCOOKIE 数据, 模块记录组列表)
+    """
+    header = []
+    cookie = struct.pack("<H", 0xFFFF)
+    groups: List[List[Tuple[int, bytes]]] = []
+    current = None
+    in_modules = False
+    for record_id, payload in records:
+        if record_id == DIR_PROJECTMODULES:
+            in_modules = True
+        elif not in_modules:
+            header.append((record_id, payload))
+        elif record_id == DIR_PROJECTCOOKIE and current is None:
+            cookie = payload
+        elif record_id == DIR_MODULENAME:
+            current = [(record_id, payload)]
+        elif record_id == DIR_TERMINATOR:
+            break
+        elif current is not None:
+            current.append((record_id, payload))
+            if record_id == DIR_MODULE_TERMINATOR:
+                groups.append(current)
+                current = None
+    return header, cookie, groups
+
+
+class _WriterModule:
+    """写入器中的一个模块"""
+
+    def __init__(self, name: str, kind: str, info: Optional[VBAModuleInfo] = None):
+        self.name = name
+        self.kind = kind                  # PROJECT 流中的声明：module/class/baseclass/document
+        self.info = info                  # 已有模块的解析信息，新模块为None
+        self.stream_name = info.stream_name if info else name
+        self.records: Optional[List[Tuple[int, bytes]]] = None
+        self.declaration = ""             # PROJECT 流中的声明行
+        self.attributes: List[str] = []   # 新模块的 Attribute VB_* 行
+        self.code: Optional[str] = None   # 待写入的正文，None 表示保持不变
+
+    @property
+    def procedural(self) -> bool:
+        return self.kind == PROJECT_KEY_MODULE
+
+
+class VBAProjectWriter:
+    """
+    生成新的 vbaProject.bin
+
+    基于已有工程时只重写有改动的流；不提供工程时从零创建一个只含宿主默认文档模块的工程。
+
+    Args:
+        project: 已解析的VBA工程，写出前其复合文件必须保持打开
+        host: 宿主应用程序（HOST_WORD/HOST_EXCEL/HOST_POWERPOINT），新增文档模块时需要
+        codepage: 新建工程使用的代码页，基于已有工程时忽略
+    """
+
+    def __init__(self, project: Optional[VBAProject] = None, host: str = "",
+                 codepage: int = DEFAULT_CODEPAGE):
+        self.project = project
+        self.host = host
+        self.codepage = project.codepage if project else codepage
+        self.encoding = codepage_to_encoding(self.codepage)
+        self.modules: List[_WriterModule] = []
+        self._removed: List[_WriterModule] = []
+        self._structure_changed = False
+
+        if project is not None:
+            self._load_project()
+        else:
+            self._create_project()
+
+    # ------------------------------------------------------------------
+    # 初始化
+    # ------------------------------------------------------------------
+
+    def _load_project(self):
+        """从已有工程读取 dir 记录和 PROJECT 流"""
+        project = self.project
+        self._header, self._cookie, groups = _split_module_groups(project.records)
+        for info, records in zip(project.modules, groups):
+            kind = info.project_kind or (PROJECT_KEY_MODULE if info.procedural else PROJECT_KEY_CLASS)
+            module = _WriterModule(info.name, kind, info)
+            module.records = records
+            self.modules.append(module)
+
+        project_path = self._path("PROJECT")
+        if project.ole.exists(project_path):
+            self._project_text = project.ole.read_stream(project_path).decode(self.encoding, errors="replace")
+        else:
+            self._project_text = ""
+        for line in self._project_text.splitlines():
+            if line.startswith("["):
+                break
+            key, _, value = line.partition("=")
+            module = self._find(value.split("/", 1)[0].strip())
+            if key.strip().lower() == (module.kind if module else None):
+                module.declaration = line
+
+    def _create_project(self):
+        """从零创建工程：工程信息、stdole 引用和宿主默认文档模块"""
+        if self.host not in HOST_PROJECT_NAMES:
+            raise VBAProjectError(f"不支持的宿主应用程序: {self.host}")
+
+        name = HOST_PROJECT_NAMES[self.host].encode(self.encoding)
+        self._header = [
+            (DIR_PROJECTSYSKIND, struct.pack("<I", 1)),   # Win32
+            (DIR_PROJECTLCID, struct.pack("<I", 0x0409)),
+            (DIR_PROJECTLCIDINVOKE, struct.pack("<I", 0x0409)),
+            (DIR_PROJECTCODEPAGE, struct.pack("<H", self.codepage)),
+            (DIR_PROJECTNAME, name),
+            (DIR_PROJECTDOCSTRING, b""),
+            (DIR_PROJECTDOCSTRINGUNICODE, b""),
+            (DIR_PROJECTHELPFILEPATH, b""),
+            (DIR_PROJECTHELPFILEPATH2, b""),
+            (DIR_PROJECTHELPCONTEXT, struct.pack("<I", 0)),
+            (DIR_PROJECTLIBFLAGS, struct.pack("<I", 0)),
+            (DIR_PROJECTVERSION, struct.pack("<IH", 1, 0)),
+            (DIR_PROJECTCONSTANTS, b""),
+            (DIR_PROJECTCONSTANTSUNICODE, b""),
+        ]
+        self._add_reference(STDOLE_REFERENCE_NAME, DIR_REFERENCEREGISTERED,
+                            self._registered_reference(STDOLE_LIBID))
+        if self.host == HOST_WORD:
+            # Word 文档的 ThisDocument 继承自 Normal 模板
+            self._add_reference("Normal", DIR_REFERENCEPROJECT,
+                                self._project_reference("*\\CNormal"))
+        self._cookie = struct.pack("<H", 0xFFFF)
+
+        project_id = "{" + str(uuid.uuid4()).upper() + "}"
+        # 保护状态为0（未加锁）、无密码、工程可见
+        protection = encrypt_project_data(project_id, struct.pack("<I", 0))
+        password = encrypt_project_data(project_id, b"\x00")
+        visibility = encrypt_project_data(project_id, b"\xFF")
+        lines = [
+            f'ID="{project_id}"',
+            f'Name="{HOST_PROJECT_NAMES[self.host]}"',
+            'HelpContextID="0"',
+            'VersionCompatible32="393222000"',
+            f'CMG="{protection}"',
+            f'DPB="{password}"',
+            f'GC="{visibility}"',
+            "",
+            "[Host Extender Info]",
+            HOST_EXTENDER_INFO,
+            "",
+        ]
+        self._project_text = "\r\n".join(lines)
+        self._structure_changed = True
+
+        for name, base in HOST_DOCUMENT_MODULES[self.host]:
+            self._append_module(name, PROJECT_KEY_DOCUMENT,
+                                self._default_attributes(name, PROJECT_KEY_DOCUMENT, base), "")
+
+    def _add_reference(self, name: str, record_id: int, payload: bytes):
+        self._header.append((DIR_REFERENCENAME, name.encode(self.encoding)))
+        self._header.append((DIR_REFERENCENAMEUNICODE, name.encode("utf-16-le")))
+        self._header.append((record_id, payload))
+
+    def _registered_reference(self, libid: str) -> bytes:
+        """REFERENCEREGISTERED 记录数据：Libid 及两个保留字段"""
+        data = libid.encode(self.encoding)
+        return struct.pack("<I", len(data)) + data + struct.pack("<IH", 0, 0)
+
+    def _project_reference(self, libid: str) -> bytes:
+        """REFERENCEPROJECT 记录数据：绝对/相对 Libid 及版本号"""
+        data = libid.encode(self.encoding)
+        return (struct.pack("<I", len(data)) + data) * 2 + struct.pack("<IH", 0, 0)
+
+    # ------------------------------------------------------------------
+    # 模块操作
+    # ------------------------------------------------------------------
+
+    def _path(self, *parts: str) -> str:
+        root = self.project.root if self.project else ""
+        return "/".join(p for p in (root,) + parts if p)
+
+    def _find(self, name: str) -> Optional[_WriterModule]:
+        for module in self.modules:
+            if module.name.lower() == name.lower():
+                return module
+        return None
+
+    def has_module(self, name: str) -> bool:
+        """工程中是否存在指定名称的模块（不区分大小写）"""
+        return self._find(name) is not None
+
+    def replace_module_source(self, name: str, code: str):
+        """
+        替换已存在模块的源码
+
+        模块开头的 Attribute VB_* 行保持不变，code 中自带的 Attribute 行会被忽略。
+
+        Args:
+            name: 模块名称
+            code: 新的模块正文
+        """
+        module = self._find(name)
+        if module is None:
+            raise VBAProjectError(f"模块不存在: {name}")
+        module.code = code
+
+    def _default_attributes(self, name: str, kind: str, base: str = "") -> List[str]:
+        """生成新模块的 Attribute VB_* 行"""
+        attributes = [f'Attribute VB_Name = "{name}"']
+        if kind == PROJECT_KEY_MODULE:
+            return attributes
+        document = kind == PROJECT_KEY_DOCUMENT
+        template_derived = document and self.host == HOST_WORD
+        attributes += [
+            f'Attribute VB_Base = "{base}"',
+            "Attribute VB_GlobalNameSpace = False",
+            "Attribute VB_Creatable = False",
+            f"Attribute VB_PredeclaredId = {document}",
+            f"Attribute VB_Exposed = {document}",
+            f"Attribute VB_TemplateDerived = {template_derived}",
+            f"Attribute VB_Customizable = {document}",
+        ]
+        return attributes
+
+    def _module_records(self, module: _WriterModule) -> List[Tuple[int, bytes]]:
+        """生成新模块的 dir 记录组"""
+        name = module.name
+        return [
+            (DIR_MODULENAME, name.encode(self.encoding)),
+            (DIR_MODULENAMEUNICODE, name.encode("utf-16-le")),
+            (DIR_MODULESTREAMNAME, module.stream_name.encode(self.encoding)),
+            (DIR_MODULESTREAMNAMEUNICODE, module.stream_name.encode("utf-16-le")),
+            (DIR_MODULEDOCSTRING, b""),
+            (DIR_MODULEDOCSTRINGUNICODE, b""),
+            (DIR_MODULEOFFSET, struct.pack("<I", 0)),
+            (DIR_MODULEHELPCONTEXT, struct.pack("<I", 0)),
+            (DIR_MODULECOOKIE, struct.pack("<H", 0xFFFF)),
+            (DIR_MODULETYPE_PROCEDURAL if module.procedural else DIR_MODULETYPE_NONPROCEDURAL, b""),
+            (DIR_MODULE_TERMINATOR, b""),
+        ]
+
+    def _append_module(self, name: str, kind: str, attributes: List[str], code: str):
+        module = _WriterModule(name, kind)
+        module.attributes = attributes
+        module.code = code
+        module.records = self._module_records(module)
+        if kind == PROJECT_KEY_DOCUMENT:
+            module.declaration = f"Document={name}/&H00000000"
+        else:
+            module.declaration = f"{kind.capitalize()}={name}"
+        self.modules.append(module)
+        self._structure_changed = True
+
+    def add_module(self, name: str, component_type: str, code: str = ""):
+        """
+        新增模块
+
+        Args:
+            name: 模块名称
+            component_type: 组件类型（VBAComponent.TYPE_*），不支持窗体
+            code: 模块正文
+        """
+        if self._find(name):
+            raise VBAProjectError(f"模块已存在: {name}")
+        if not name or len(name) > 31 or name.lower() in (n.lower() for n in RESERVED_STREAM_NAMES):
+            raise VBAProjectError(f"无效的模块名称: {name}")
+        try:
+            name.encode(self.encoding)
+        except UnicodeEncodeError:
+            raise VBAProjectError(f"模块名称无法用代码页 {self.codepage} 表示: {name}")
+
+        if component_type == VBAComponent.TYPE_MODULE:
+            kind, base = PROJECT_KEY_MODULE, ""
+        elif component_type == VBAComponent.TYPE_CLASS:
+            kind, base = PROJECT_KEY_CLASS, CLASS_MODULE_BASE
+        elif component_type == VBAComponent.TYPE_DOCUMENT:
+            if self.host != HOST_EXCEL:
+                raise VBAProjectError(f"文档模块不存在，且无法新建: {name}")
+            kind, base = PROJECT_KEY_DOCUMENT, EXCEL_SHEET_BASE
+        else:
+            # 窗体需要设计器存储（控件布局），无法仅凭源码生成
+            raise VBAProjectError(f"原生写入不支持新建窗体: {name}")
+
+        self._append_module(name, kind, self._default_attributes(name, kind, base), code)
+
+    def remove_module(self, name: str):
+        """
+        删除模块（文档模块不能删除，只能清空代码）
+
+        Args:
+            name: 模块名称
+        """
+        module = self._find(name)
+        if module is None:
+            raise VBAProjectError(f"模块不存在: {name}")
+        if module.kind == PROJECT_KEY_DOCUMENT:
+            raise VBAProjectError(f"文档模块不能删除: {name}")
+        self.modules.remove(module)
+        if module.info is not None:
+            self._removed.append(module)
+        self._structure_changed = True
+
+    # ------------------------------------------------------------------
+    # 生成流
+    # ------------------------------------------------------------------
+
+    def _build_module_stream(self, module: _WriterModule) -> bytes:
+        """生成只包含压缩源码（无 p-code）的模块流"""
+        if module.info is None:
+            source = build_module_source(module.attributes, module.code)
+            return compress(source.encode(self.encoding, errors="replace"))
+
+        old_container = self.project.read_module_data(module.info)
+        old_source = decompress(old_container)
+        attributes, _ = split_attribute_lines(old_source.decode(self.encoding, errors="replace"))
+        source = build_module_source(attributes, module.code)
+        new_source = source.encode(self.encoding, errors="replace")
+        return recompress(old_container, new_source, old_source)
+
+    def _build_dir_stream(self) -> bytes:
+        """重新生成 dir 记录（被修改模块的 MODULEOFFSET 置0）并压缩"""
+        records = list(self._header)
+        records.append((DIR_PROJECTMODULES, struct.pack("<H", len(self.modules))))
+        records.append((DIR_PROJECTCOOKIE, self._cookie))
+        for module in self.modules:
+            for record_id, payload in module.records:
+                if record_id == DIR_MODULEOFFSET and module.code is not None:
+                    payload = struct.pack("<I", 0)
+                records.append((record_id, payload))
+        records.append((DIR_TERMINATOR, b""))
+        data = serialize_dir_records(records)
+
+        if self.project is None:
+            return compress(data)
+        old_container = self.project.ole.open_stream(self.project.dir_stream_path)
+        return recompress(old_container, data, decompress(old_container))
+
+    def _build_project_stream(self) -> bytes:
+        """
+        重新生成 PROJECT 流
+
+        保留原有的属性和段落，只更新模块声明行并去掉已删除模块的 [Workspace] 记录。
+        """
+        removed = {m.name.lower() for m in self._removed}
+        declared = {m.name.lower() for m in self.modules if m.info is not None}
+        new_lines = [m.declaration for m in self.modules if m.info is None]
+
+        lines = []
+        insert_at = None
+        section = ""
+        for line in self._project_text.split("\r\n"):
+            key, _, value = line.partition("=")
+            key = key.strip().lower()
+            if line.startswith("["):
+                section = line.strip().lower()
+            elif not section:
+                if key == "id":
+                    insert_at = len(lines) + 1
+                elif key in (PROJECT_KEY_MODULE, PROJECT_KEY_CLASS,
+                             PROJECT_KEY_BASECLASS, PROJECT_KEY_DOCUMENT):
+                    if value.split("/", 1)[0].strip().lower() not in declared:
+                        continue
+                    insert_at = len(lines) + 1
+            elif section == "[workspace]" and key in removed:
+                continue
+            lines.append(line)
+
+        if insert_at is None:
+            insert_at = 0
+        lines[insert_at:insert_at] = new_lines
+        return "\r\n".join(lines).encode(self.encoding, errors="replace")
+
+    def _build_projectwm_stream(self) -> bytes:
+        """生成 PROJECTwm 流：模块名的 MBCS 与 UTF-16 对照表"""
+        parts = []
+        for module in self.modules:
+            parts.append(module.name.encode(self.encoding) + b"\x00")
+            parts.append(module.name.encode("utf-16-le") + b"\x00\x00")
+        parts.append(b"\x00\x00")
+        return b"".join(parts)
+
+    def to_bytes(self) -> bytes:
+        """
+        生成新的复合文件数据
+
+        Returns:
+            新的 vbaProject.bin 内容
+        """
+        if self.project is not None:
+            storage = OleStorage.from_ole(self.project.ole)
+        else:
+            storage = OleStorage()
+        vba_path = self._path("VBA")
+
+        for module in self._removed:
+            storage.remove(self._path("VBA", module.stream_name))
+            if module.kind == PROJECT_KEY_BASECLASS:
+                # 窗体的设计器存储与模块同名，位于工程根存储下
+                storage.remove(self._path(module.name))
+
+        for module in self.modules:
+            if module.code is not None:
+                storage.set_stream(self._path("VBA", module.stream_name),
+                                   self._build_module_stream(module))
+
+        storage.set_stream(self._path("VBA", "dir"), self._build_dir_stream())
+        if self._structure_changed:
+            storage.set_stream(self._path("PROJECT"), self._build_project_stream())
+            storage.set_stream(self._path("PROJECTwm"), self._build_projectwm_stream())
+
+        # 丢弃 p-code 及其缓存，强制 Office 重新编译
+        storage.set_stream(f"{vba_path}/_VBA_PROJECT", VBA_PROJECT_STREAM_NO_PCODE)
+        vba_storage = storage.storage(vba_path)
+        for name in list(vba_storage.children):
+            if name.startswith(SRP_STREAM_PREFIX):
+                del vba_storage.children[name]
+
+        return write_ole(storage)
+
+
+def build_vba_project(components: List[VBAComponent], host: str,
+                      codepage: int = DEFAULT_CODEPAGE) -> bytes:
+    """
+    由组件列表（如 scan_vba_folder 的结果）生成完整的 vbaProject.bin
+
+    宿主默认文档模块（ThisDocument/ThisWorkbook）总会创建，同名组件的代码写入其中。
+
+    Args:
+        components: VBA组件列表
+        host: 宿主应用程序（HOST_WORD/HOST_EXCEL/HOST_POWERPOINT）
+        codepage: 工程代码页
+
+    Returns:
+        vbaProject.bin 内容
+    """
+    writer = VBAProjectWriter(host=host, codepage=codepage)
+    for component in components:
+        if writer.has_module(component.name):
+            writer.replace_module_source(component.name, component.code)
+        else:
+            writer.add_module(component.name, component.component_type, component.code)
+    return writer.to_bytes()
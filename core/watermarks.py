@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+水印清除 - 不启动Office，流式重写页眉部件删除水印图形
+
+水印是页眉中的 DrawingML 图形（名称在 wp:docPr 的 name 上）或 VML 图形（名称在 v:shape 等的 id 上），
+通常包在 mc:AlternateContent / w:drawing / w:pict 中；名称匹配时删除最外层的容器。
+与书签清除一样在重写时边扫描边按字节范围删除，没有水印的页眉部件按原压缩数据复制。
+"""
+import re
+import zipfile
+from typing import Dict, Iterable, List, Optional
+
+from core.ooxml_package import find_main_part, find_related_parts
+from core.ooxml_pipeline import PackagePlan, PipelineStage, run_pipeline
+from core.xml_stream import QName
+
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+VML_NS = "urn:schemas-microsoft-com:vml"
+
+HEADER_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/header"
+
+# 默认的水印名称模式（不区分大小写），与 WordVBAHandler._clear_document_properties 一致：
+# 可匹配 Word 内置水印 PowerPlusWaterMarkObject 和 WatermarkManager.bas 添加的 StudentIDWatermark_N
+DEFAULT_WATERMARK_PATTERNS = ("watermark",)
+
+# 带名称的图形元素 -> 保存名称的属性
+SHAPE_NAME_ATTRIBUTES: Dict[QName, QName] = {
+    (WP_NS, "docPr"): (None, "name"),
+    (VML_NS, "shape"): (None, "id"),
+    (VML_NS, "rect"): (None, "id"),
+    (VML_NS, "roundrect"): (None, "id"),
+    (VML_NS, "oval"): (None, "id"),
+    (VML_NS, "group"): (None, "id"),
+}
+
+# 删除图形时一并删除的容器元素
+SHAPE_CONTAINERS = (
+    (MC_NS, "AlternateContent"),
+    (W_NS, "drawing"),
+    (W_NS, "pict"),
+    (W_NS, "object"),
+)
+
+
+def _compile_patterns(patterns: Iterable[str]) -> re.Pattern:
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+
+def is_watermark_name(name: str, patterns: Iterable[str] = DEFAULT_WATERMARK_PATTERNS) -> bool:
+    """判断图形名称是否匹配水印模式"""
+    return bool(name) and _compile_patterns(patterns).search(name) is not None
+
+
+class _WatermarkMatcher:
+    """判断图形元素是否是水印，并记录匹配到的名称"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.regex = _compile_patterns(patterns)
+        self.names: List[str] = []
+
+    def __call__(self, name, attrs) -> bool:
+        shape_name = attrs.get(SHAPE_NAME_ATTRIBUTES[name], "")
+        if shape_name and self.regex.search(shape_name):
+            self.names.append(shape_name)
+            return True
+        return False
+
+
+def find_header_parts(zip_file: zipfile.ZipFile) -> List[str]:
+    """
+    根据主文档的关系查找全部页眉部件
+
+    Returns:
+        页眉部件名称列表（如 word/header1.xml），非Word文档返回空列表
+    """
+    main_part = find_main_part(zip_file)
+    if not main_part.startswith("word/"):
+        return []
+    return find_related_parts(zip_file, main_part, (HEADER_REL_TYPE,))
+
+
+class WatermarkRemovalStage(PipelineStage):
+    """
+    管道阶段：删除全部页眉中的水印图形，被删除的水印名称保存在 removed 中
+
+    Args:
+        patterns: 水印名称的正则表达式（不区分大小写）
+    """
+
+    def __init__(self, patterns: Iterable[str] = DEFAULT_WATERMARK_PATTERNS):
+        self.patterns = tuple(patterns)
+        self.removed: List[str] = []
+        self._matchers: List[_WatermarkMatcher] = []
+
+    def plan(self, plan: PackagePlan):
+        for part_name in find_header_parts(plan.zip_file):
+            matcher = _WatermarkMatcher(self.patterns)
+            self._matchers.append(matcher)
+            plan.locate(part_name, SHAPE_NAME_ATTRIBUTES, matcher, SHAPE_CONTAINERS)
+
+    def after_write(self, zip_file: zipfile.ZipFile):
+        for matcher in self._matchers:
+            # 同一图形的 DrawingML 和 VML 回退内容名称相同，只记录一次
+            self.removed.extend(name for name in dict.fromkeys(matcher.names) if name not in self.removed)
+
+    def summary(self) -> List[str]:
+        if not self.removed:
+            return []
+        return [f"已删除 {len(self.removed)} 个水印: {', '.join(self.removed)}"]
+
+
+def remove_watermarks(file_path: str, output_path: Optional[str] = None,
+                      patterns: Iterable[str] = DEFAULT_WATERMARK_PATTERNS) -> List[str]:
+    """
+    删除Word文档页眉中的水印（一次重写压缩包）
+
+    Args:
+        file_path: .docx/.docm 等文件路径
+        output_path: 输出路径，默认覆盖源文件
+        patterns: 水印名称的正则表达式（不区分大小写）
+
+    Returns:
+        被删除的水印名称
+    """
+    stage = WatermarkRemovalStage(patterns)
+    run_pipeline(file_path, [stage], output_path)
+    return stage.removed
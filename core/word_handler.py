@@ -8,7 +8,10 @@ from typing import List, Optional
 import win32com.client
 import pythoncom
 from PyQt5.QtCore import pyqtSignal, QObject
+from core.office_profile import SessionProfile, is_app_running
 from core.vba_component import VBAComponent
+from core.bookmarks import is_locked_bookmark
+from core.watermarks import is_watermark_name
 
 
 class UIHandler(logging.Handler):
@@ -26,16 +29,27 @@ class UIHandler(logging.Handler):
 class WordVBAHandler(QObject):
     """Word VBA处理程序类"""
 
+    # COM 程序标识
+    PROG_ID = "Word.Application"
+
     # 定义日志信号，用于将日志发送到UI
     log_signal = pyqtSignal(str)
 
-    def __init__(self, use_ui_signal=True):
+    def __init__(self, use_ui_signal=True, isolated=False):
         super().__init__()
         self.word_app = None
         self.document = None
         self.vba_project = None
         self.logger = logging.getLogger(__name__)
         self._use_ui_signal = use_ui_signal
+        # 应用程序来自 OfficePool 时 quit() 只断开引用，不退出应用程序
+        self._pooled = False
+        # 独立实例：用 DispatchEx 启动新的进程，不连接已运行的实例
+        self._isolated = isolated
+        # 启动应用程序时修改的设置，退出前恢复
+        self.session_profile = None
+        # 实例是否由本处理器启动；连接到用户已打开的实例时不修改设置，也不退出
+        self.owns_app = False
 
         # 只有在需要UI信号时才添加日志处理器（主线程使用）
         if use_ui_signal:
@@ -48,14 +62,72 @@ class WordVBAHandler(QObject):
         try:
             import pythoncom
             pythoncom.CoInitialize()
-            self.word_app = win32com.client.Dispatch("Word.Application")
+        except Exception as e:
+            self.logger.error(f"Word应用程序初始化失败: {e}")
+            return False
+        return self.launch()
+
+    def launch(self) -> bool:
+        """启动Word应用程序（调用线程需已初始化COM）"""
+        try:
+            self.owns_app = self._isolated or not is_app_running(self.PROG_ID)
+            dispatch = win32com.client.DispatchEx if self._isolated else win32com.client.Dispatch
+            self.word_app = dispatch(self.PROG_ID)
+            if not self.owns_app:
+                self.session_profile = None
+                self.logger.info("已连接到正在运行的Word，不修改其设置，退出时也不关闭")
+                return True
             self.word_app.Visible = False
             self.word_app.DisplayAlerts = False
+            self.session_profile = SessionProfile()
+            self._apply_session_profile()
             return True
         except Exception as e:
             self.logger.error(f"Word应用程序初始化失败: {e}")
             return False
 
+    def _apply_session_profile(self):
+        """
+        精简会话设置：关闭屏幕刷新、输入时拼写和语法检查、后台重新分页，断开COM加载项
+
+        模板加载项（AddIns）的 Installed 会影响同一进程中的其他文档，附加到已有实例时会改动用户的会话，
+        进程被终止时也无法恢复，因此与 Excel 一样不修改。
+        """
+        profile = self.session_profile
+        profile.set(self.word_app, "ScreenUpdating", False)
+        try:
+            options = self.word_app.Options
+        except Exception as e:
+            self.logger.debug(f"读取Word选项失败: {e}")
+            return
+        profile.set(options, "CheckSpellingAsYouType", False)
+        profile.set(options, "CheckGrammarAsYouType", False)
+        profile.set(options, "Pagination", False)
+        profile.disconnect_com_addins(self.word_app)
+
+    @property
+    def application(self):
+        """Word应用程序的COM对象"""
+        return self.word_app
+
+    def process_id(self) -> Optional[int]:
+        """
+        Word进程ID（用于终止卡住的实例）
+
+        Word.Application 没有窗口句柄属性，无法从实例本身获取，始终返回None；
+        IsolatedOfficePool 启动实例时比较前后的 WINWORD.EXE 进程来确定。
+        """
+        return None
+
+    def attach(self, app):
+        """
+        使用已启动的Word实例（来自 OfficePool）
+
+        quit() 时只断开引用，不退出Word，也不释放调用线程的COM
+        """
+        self.word_app = app
+        self._pooled = True
+
     def open_document(self, file_path: str) -> bool:
         """
         打开Word文档
@@ -119,8 +191,16 @@ class WordVBAHandler(QObject):
     def quit(self):
         """退出Word应用程序"""
         try:
+            if self._pooled:
+                self.word_app = None
+                self._pooled = False
+                self.logger.info("Word应用程序已交还应用程序池")
+                return
             if self.word_app:
-                self.word_app.Quit()
+                if self.owns_app:
+                    if self.session_profile:
+                        self.session_profile.restore()
+                    self.word_app.Quit()
                 self.word_app = None
             pythoncom.CoUninitialize()
             self.logger.info("Word应用程序已退出")
@@ -129,7 +209,19 @@ class WordVBAHandler(QObject):
 
     def get_vba_components(self) -> List[VBAComponent]:
         """
-        获取文档中所有VBA组件
+        获取文档中所有VBA组件（包含代码）
+
+        Returns:
+            VBA组件列表
+        """
+        return self.list_components(metadata_only=False)
+
+    def list_components(self, metadata_only: bool = True) -> List[VBAComponent]:
+        """
+        列出文档中的VBA组件
+
+        Args:
+            metadata_only: 为True时只读取名称和类型，不通过COM传输代码（组件的 code 为None）
 
         Returns:
             VBA组件列表
@@ -146,8 +238,8 @@ class WordVBAHandler(QObject):
                 try:
                     component_type = self._get_component_type(component)
                     if component_type:
-                        # 获取组件代码
-                        code = self._get_component_code(component)
+                        # 获取组件代码（仅列出元数据时跳过）
+                        code = None if metadata_only else self._get_component_code(component)
                         vba_component = VBAComponent(
                             name=component.Name,
                             component_type=component_type,
@@ -248,8 +340,17 @@ class WordVBAHandler(QObject):
             for component in components:
                 file_path = os.path.join(folder, component.file_name)
                 try:
+                    code = component.code
+                    if code is None:
+                        # 列表只包含元数据时，导出前再从文档读取代码
+                        existing_component = self._find_component(component.name)
+                        if existing_component is None:
+                            self.logger.error(f"组件不存在: {component.name}")
+                            return False
+                        code = self._get_component_code(existing_component)
+
                     with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(component.code)
+                        f.write(code)
                     self.logger.info(f"导出组件: {component.name} -> {file_path}")
                 except Exception as e:
                     self.logger.error(f"导出组件失败: {component.name} - {e}")
@@ -448,9 +549,7 @@ class WordVBAHandler(QObject):
             bookmark_names_to_delete = []
             for bk in bookmarks:
                 bk_name = bk.Name
-                if (bk_name.startswith("LockedStudent") or
-                    bk_name.startswith("Student_") or
-                    bk_name == "StudentLoginInfo"):
+                if is_locked_bookmark(bk_name):
                     bookmark_names_to_delete.append(bk_name)
 
             for bk_name in bookmark_names_to_delete:
@@ -592,7 +691,7 @@ class WordVBAHandler(QObject):
                 for header in section.Headers:
                     try:
                         for shape in header.Shapes:
-                            if shape.Name.lower().find("watermark") >= 0:
+                            if is_watermark_name(shape.Name):
                                 shape.Delete()
                     except:
                         pass
@@ -766,81 +865,3 @@ class WordVBAHandler(QObject):
         except Exception as e:
             self.logger.error(f"删除VBA组件失败: {e}")
             return False
-
-
-def scan_vba_folder(folder: str) -> List[VBAComponent]:
-    """
-    扫描文件夹获取VBA组件列表
-
-    Args:
-        folder: 文件夹路径
-
-    Returns:
-        VBA组件列表
-    """
-    components = []
-    extension_map = {
-        '.bas': VBAComponent.TYPE_MODULE,
-        '.cls': VBAComponent.TYPE_CLASS,
-        '.frm': VBAComponent.TYPE_USERFORM
-    }
-    
-    # 特殊文件名前缀表示文档模块
-    DOCUMENT_PREFIX = "ThisDocument"
-    
-    # 文件名包含这些关键词时，识别为对应类型
-    NAME_TYPE_KEYWORDS = {
-        "Form": VBAComponent.TYPE_USERFORM,
-        "ThisDocument": VBAComponent.TYPE_DOCUMENT
-    }
-
-    try:
-        for file_name in os.listdir(folder):
-            file_path = os.path.join(folder, file_name)
-            if not os.path.isfile(file_path):
-                continue
-
-            # 获取文件扩展名
-            _, ext = os.path.splitext(file_name)
-            ext = ext.lower()
-
-            if ext in extension_map:
-                # 获取组件名称（不含扩展名）
-                name = os.path.splitext(file_name)[0]
-                
-                # 检查文件名是否包含特定关键词来决定类型
-                component_type = None
-                for keyword, vba_type in NAME_TYPE_KEYWORDS.items():
-                    if keyword in name:
-                        component_type = vba_type
-                        logging.debug(f"文件 {file_name} 通过关键词 '{keyword}' 识别为类型: {vba_type}")
-                        break
-                
-                # 如果没有通过关键词确定类型，则使用扩展名映射
-                if component_type is None:
-                    component_type = extension_map[ext]
-                    logging.debug(f"文件 {file_name} 通过扩展名 '{ext}' 识别为类型: {component_type}")
-                
-                # 读取文件内容
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        code = f.read()
-                except UnicodeDecodeError:
-                    # 尝试使用其他编码
-                    with open(file_path, 'r', encoding='gbk') as f:
-                        code = f.read()
-
-                # 获取组件名称（不含扩展名）
-                name = os.path.splitext(file_name)[0]
-
-                component = VBAComponent(
-                    name=name,
-                    component_type=component_type,
-                    code=code
-                )
-                components.append(component)
-
-    except Exception as e:
-        logging.error(f"扫描文件夹失败: {e}")
-
-    return components
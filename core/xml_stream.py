@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+XML流式过滤 - 基于SAX逐个事件处理OOXML部件，不在内存中构建DOM
+
+ElementFilter 跳过指定元素（连同子树），其余事件原样转发给 XMLStreamWriter 写出。
+对很大的部件（如 document.xml）按字节范围删除：ElementLocator 用 expat 定位要删除的元素，
+cut_located_elements 在同一遍中边定位边按块复制原始字节并跳过这些元素，不重新序列化，
+速度快且其余内容逐字节不变。filter_xml_chunks 和 cut_located_elements 都是按数据块工作的生成器，
+可以串联成部件转换管道。
+"""
+import io
+import re
+import xml.sax
+import xml.parsers.expat
+from xml.sax.handler import feature_namespaces
+from xml.sax.saxutils import XMLFilterBase, XMLGenerator
+from functools import partial
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# (命名空间URI, 本地名)
+QName = Tuple[Optional[str], str]
+# 元素在部件中的位置: (开始标签偏移, 结束事件偏移)
+Span = Tuple[int, int]
+
+# 按块读写部件的大小
+CHUNK_SIZE = 1 << 16
+
+# 一个完整的开始标签或空元素标签（属性值中可以出现 >）
+_TAG_PATTERN = re.compile(rb"""<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*(/?)>""")
+# 结束标签
+_END_TAG_PATTERN = re.compile(rb"</[^>]*>")
+
+
+class XMLStreamWriter(XMLGenerator):
+    """
+    写出XML的SAX处理器
+
+    XMLGenerator 的声明不含 standalone，这里改为输出与Office一致的声明。
+    """
+
+    def __init__(self, out: BinaryIO, encoding: str = "UTF-8", standalone: bool = True):
+        super().__init__(out, encoding, short_empty_elements=True)
+        self._declaration = f'<?xml version="1.0" encoding="{encoding}"'
+        if standalone:
+            self._declaration += ' standalone="yes"'
+        self._declaration += "?>\r\n"
+
+    def startDocument(self):
+        self._write(self._declaration)
+
+
+class ElementFilter(XMLFilterBase):
+    """
+    SAX过滤器：跳过 should_drop 返回True 的元素及其子树，其余事件原样转发
+
+    被跳过元素的文本通过 on_dropped 回调交给子类，用于生成清除报告。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.depth = 0
+        self._skip_depth = 0
+        self._dropped_name: Optional[QName] = None
+        self._dropped_attrs = None
+        self._dropped_text = []
+
+    def should_drop(self, name: QName, attrs, depth: int) -> bool:
+        """
+        判断是否跳过元素
+
+        Args:
+            name: (命名空间URI, 本地名)
+            attrs: 元素属性
+            depth: 元素深度，根元素为1
+        """
+        return False
+
+    def on_dropped(self, name: QName, attrs, text: str):
+        """元素被跳过后调用，text 为其子树中的全部文本"""
+        pass
+
+    def startElementNS(self, name, qname, attrs):
+        self.depth += 1
+        if self._skip_depth:
+            self._skip_depth += 1
+            return
+        if self.should_drop(name, attrs, self.depth):
+            self._skip_depth = 1
+            self._dropped_name = name
+            self._dropped_attrs = attrs.copy()
+            self._dropped_text = []
+            return
+        super().startElementNS(name, qname, attrs)
+
+    def endElementNS(self, name, qname):
+        self.depth -= 1
+        if self._skip_depth:
+            self._skip_depth -= 1
+            if not self._skip_depth:
+                self.on_dropped(self._dropped_name, self._dropped_attrs, "".join(self._dropped_text))
+            return
+        super().endElementNS(name, qname)
+
+    def characters(self, content):
+        if self._skip_depth:
+            self._dropped_text.append(content)
+            return
+        super().characters(content)
+
+    def ignorableWhitespace(self, whitespace):
+        if not self._skip_depth:
+            super().ignorableWhitespace(whitespace)
+
+    def processingInstruction(self, target, data):
+        if not self._skip_depth:
+            super().processingInstruction(target, data)
+
+
+def filter_xml_chunks(chunks: Iterable[bytes], xml_filter: ElementFilter,
+                      standalone: bool = True) -> Iterator[bytes]:
+    """
+    用过滤器逐块处理一个XML部件（生成器）
+
+    解析器增量接收数据，每处理完一块就产出已生成的输出，内存占用与部件大小无关。
+
+    Args:
+        chunks: XML数据块
+        xml_filter: 过滤器实例
+        standalone: 输出的声明是否包含 standalone="yes"
+    """
+    out = io.BytesIO()
+    parser = xml.sax.make_parser()
+    parser.setFeature(feature_namespaces, True)
+    xml_filter.setParent(parser)
+    xml_filter.setContentHandler(XMLStreamWriter(out, "UTF-8", standalone))
+    parser.setContentHandler(xml_filter)
+
+    def drain() -> bytes:
+        data = out.getvalue()
+        out.seek(0)
+        out.truncate()
+        return data
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        data = drain()
+        if data:
+            yield data
+    parser.close()
+    data = drain()
+    if data:
+        yield data
+
+
+def filter_xml(source: Union[bytes, BinaryIO], xml_filter: ElementFilter,
+               standalone: bool = True) -> bytes:
+    """
+    用过滤器处理一个XML部件
+
+    Args:
+        source: XML数据或可读的文件对象（如 ZipFile.open 的返回值）
+        xml_filter: 过滤器实例
+        standalone: 输出的声明是否包含 standalone="yes"
+
+    Returns:
+        过滤后的XML数据（UTF-8）
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        chunks = [bytes(source)]
+    else:
+        chunks = iter(partial(source.read, CHUNK_SIZE), b"")
+    return b"".join(filter_xml_chunks(chunks, xml_filter, standalone))
+
+
+def _expat_name(name: QName) -> str:
+    """(命名空间URI, 本地名) -> expat 使用的 "URI 本地名" 形式"""
+    uri, local = name
+    return f"{uri} {local}" if uri else local
+
+
+class ElementLocator:
+    """
+    增量定位需要删除的元素
+
+    只有名称在 names 中的元素才会调用 match，其余元素在 expat 内部跳过，开销很小。
+    匹配的元素位于 containers 中某个元素内部时，删除最外层的容器元素
+    （例如图形名称写在 wp:docPr 上，但要删除的是整个 w:drawing）。
+
+    feed() 逐块接收部件数据，元素结束时把确定删除的 (开始标签偏移, 结束事件偏移) 追加到 spans（升序）；
+    safe_offset 之前不会再出现新的删除范围，这部分数据可以直接输出。
+
+    Args:
+        names: 关心的元素名称
+        match: 判断元素是否删除，参数为元素名称和属性
+        containers: 容器元素名称
+    """
+
+    def __init__(self, names: Iterable[QName], match: Callable[[QName, Dict[QName, str]], bool],
+                 containers: Iterable[QName] = ()):
+        self._lookup = {_expat_name(name): name for name in names}
+        self._container_names = {_expat_name(name) for name in containers}
+        self._match = match
+        self.spans: List[Span] = []
+        self._parser = xml.parsers.expat.ParserCreate(namespace_separator=" ")
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        self._depth = 0
+        self._container = None  # 最外层容器: [开始偏移, 深度, 是否匹配]
+        self._matched = None    # 容器外匹配的元素: (开始偏移, 深度)
+        self._last_event = 0    # 最近一个元素事件的偏移，之后的开始标签都在它后面
+        self._size = 0
+        self._closed = False
+
+    @property
+    def safe_offset(self) -> int:
+        """该偏移之前的数据已确定是否删除"""
+        if self._closed:
+            return self._size
+        if self._container is not None:
+            return self._container[0]
+        if self._matched is not None:
+            return self._matched[0]
+        return self._last_event
+
+    def feed(self, data: bytes):
+        """解析一块数据"""
+        self._size += len(data)
+        self._parser.Parse(data, False)
+
+    def close(self):
+        """数据结束"""
+        self._parser.Parse(b"", True)
+        self._closed = True
+
+    def _start_element(self, name, attrs):
+        offset = self._last_event = self._parser.CurrentByteIndex
+        self._depth += 1
+        if self._container is None and self._matched is None and name in self._container_names:
+            self._container = [offset, self._depth, False]
+        qname = self._lookup.get(name)
+        if qname is None or self._matched is not None:
+            return
+        attributes = {}
+        for key, value in attrs.items():
+            uri, _, local = key.rpartition(" ")
+            attributes[(uri or None, local)] = value
+        if self._match(qname, attributes):
+            if self._container is not None:
+                self._container[2] = True
+            else:
+                self._matched = (offset, self._depth)
+
+    def _end_element(self, name):
+        offset = self._last_event = self._parser.CurrentByteIndex
+        if self._matched is not None and self._matched[1] == self._depth:
+            self.spans.append((self._matched[0], offset))
+            self._matched = None
+        elif self._container is not None and self._container[1] == self._depth:
+            if self._container[2]:
+                self.spans.append((self._container[0], offset))
+            self._container = None
+        self._depth -= 1
+
+
+def _cut_span(buffer: bytearray, base: int, span: Span) -> int:
+    """
+    从 buffer（开头位于元素开始标签处）删除一个元素，元素的全部字节都已在 buffer 中
+
+    Returns:
+        删除后 buffer 开头在部件中的偏移
+    """
+    start, end = span
+    tag = _TAG_PATTERN.match(buffer)
+    if tag is None:
+        raise ValueError(f"偏移 {start} 处没有完整的元素标签")
+    if not tag.group(1):
+        del buffer[:end - base]
+        base = end
+        tag = _END_TAG_PATTERN.match(buffer)
+        if tag is None:
+            raise ValueError(f"偏移 {end} 处不是结束标签")
+    del buffer[:tag.end()]
+    return base + tag.end()
+
+
+def cut_located_elements(chunks: Iterable[bytes], locators: Sequence[ElementLocator]) -> Iterator[bytes]:
+    """
+    边定位边删除元素（生成器）
+
+    每块数据先交给各 ElementLocator 解析，再输出已确定的部分并跳过确定删除的元素，
+    部件只解压和解析一遍。只有尚未确定是否删除的元素（如正在读取的 w:drawing）暂存在内存中。
+    多个定位器的范围合并处理，嵌套在其他范围内的范围随外层一起删除。
+
+    Args:
+        chunks: 原始XML数据块
+        locators: 新建的定位器，结束后可从其 spans 读取删除的范围
+    """
+    buffer = bytearray()
+    base = 0  # buffer[0] 在部件中的偏移
+    pending: List[Span] = []
+    taken = [0] * len(locators)
+
+    def ready() -> Iterator[bytes]:
+        nonlocal base
+        safe = min(locator.safe_offset for locator in locators)
+        for index, locator in enumerate(locators):
+            pending.extend(locator.spans[taken[index]:])
+            taken[index] = len(locator.spans)
+        pending.sort()
+        while pending and pending[0][0] < safe:
+            span = pending.pop(0)
+            if span[0] < base:
+                continue
+            if span[0] > base:
+                yield bytes(buffer[:span[0] - base])
+                del buffer[:span[0] - base]
+                base = span[0]
+            base = _cut_span(buffer, base, span)
+        if safe > base and buffer:
+            size = min(safe - base, len(buffer))
+            yield bytes(buffer[:size])
+            del buffer[:size]
+            base += size
+
+    for chunk in chunks:
+        buffer.extend(chunk)
+        for locator in locators:
+            locator.feed(chunk)
+        yield from ready()
+    for locator in locators:
+        locator.close()
+    yield from ready()
@@ -0,0 +1 @@
+# 不依赖Office的单元测试：python -m unittest discover -s tests -t .
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+OOXML重写管道测试：在合成的 .docm 上一次重写删除书签、水印和保护元素
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from core.bookmarks import BookmarkPurgeStage
+from core.ooxml_pipeline import run_pipeline
+from core.protection import ProtectionRemovalStage
+from core.watermarks import WatermarkRemovalStage
+from core.xml_stream import ElementLocator, cut_located_elements
+
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+WP = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+CONTENT_TYPES = b'<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>'
+ROOT_RELS = (f'<Relationships xmlns="{REL}"><Relationship Id="rId1" Type="{R}/officeDocument" '
+             f'Target="word/document.xml"/></Relationships>').encode()
+DOCUMENT_RELS = (f'<Relationships xmlns="{REL}">'
+                 f'<Relationship Id="rId1" Type="{R}/header" Target="header1.xml"/>'
+                 f'<Relationship Id="rId2" Type="{R}/settings" Target="settings.xml"/>'
+                 f'</Relationships>').encode()
+DOCUMENT = (f'<w:document xmlns:w="{W}"><w:body><w:p>'
+            '<w:bookmarkStart w:id="0" w:name="LockedStudent1"/><w:r><w:t>a</w:t></w:r><w:bookmarkEnd w:id="0"/>'
+            '<w:bookmarkStart w:id="1" w:name="Keep"/><w:r><w:t>b</w:t></w:r><w:bookmarkEnd w:id="1"/>'
+            '<w:bookmarkStart w:id="2" w:name="StudentLoginInfo"></w:bookmarkStart><w:bookmarkEnd w:id="2"/>'
+            '</w:p></w:body></w:document>').encode()
+HEADER = (f'<w:hdr xmlns:w="{W}" xmlns:wp="{WP}"><w:p><w:r><w:t>Title</w:t></w:r>'
+          '<w:r><w:drawing><wp:anchor><wp:docPr id="1" name="PowerPlusWaterMarkObject1"/></wp:anchor></w:drawing></w:r>'
+          '<w:r><w:drawing><wp:inline><wp:docPr id="2" name="Logo"/></wp:inline></w:drawing></w:r>'
+          '</w:p></w:hdr>').encode()
+SETTINGS = (f'<w:settings xmlns:w="{W}"><w:zoom w:percent="100"/>'
+            '<w:documentProtection w:edit="readOnly" w:enforcement="1"/></w:settings>').encode()
+VBA_PROJECT = os.urandom(4096)
+
+
+def _expected_document() -> bytes:
+    return (f'<w:document xmlns:w="{W}"><w:body><w:p>'
+            '<w:r><w:t>a</w:t></w:r>'
+            '<w:bookmarkStart w:id="1" w:name="Keep"/><w:r><w:t>b</w:t></w:r><w:bookmarkEnd w:id="1"/>'
+            '</w:p></w:body></w:document>').encode()
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "作业.docm")
+        with zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("[Content_Types].xml", CONTENT_TYPES)
+            zip_file.writestr("_rels/.rels", ROOT_RELS)
+            zip_file.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS)
+            zip_file.writestr("word/document.xml", DOCUMENT)
+            zip_file.writestr("word/header1.xml", HEADER)
+            zip_file.writestr("word/settings.xml", SETTINGS)
+            zip_file.writestr("word/vbaProject.bin", VBA_PROJECT, zipfile.ZIP_STORED)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_removes_matching_elements_only(self):
+        stages = [BookmarkPurgeStage(), WatermarkRemovalStage(), ProtectionRemovalStage()]
+        self.assertTrue(run_pipeline(self.path, stages))
+
+        self.assertEqual(stages[0].removed, ["LockedStudent1", "StudentLoginInfo"])
+        self.assertEqual(stages[1].removed, ["PowerPlusWaterMarkObject1"])
+        self.assertEqual(stages[2].removed, ["word/settings.xml: documentProtection"])
+
+        with zipfile.ZipFile(self.path) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(zip_file.read("word/document.xml"), _expected_document())
+            header = zip_file.read("word/header1.xml")
+            self.assertNotIn(b"WaterMark", header)
+            self.assertIn(b'name="Logo"', header)
+            self.assertIn(b"<w:t>Title</w:t>", header)
+            self.assertEqual(zip_file.read("word/settings.xml"),
+                             f'<w:settings xmlns:w="{W}"><w:zoom w:percent="100"/></w:settings>'.encode())
+            self.assertEqual(zip_file.read("word/vbaProject.bin"), VBA_PROJECT)
+            self.assertEqual(zip_file.read("_rels/.rels"), ROOT_RELS)
+
+    def test_no_match_keeps_source_file(self):
+        run_pipeline(self.path, [BookmarkPurgeStage(), WatermarkRemovalStage(), ProtectionRemovalStage()])
+        stat = os.stat(self.path)
+        stages = [BookmarkPurgeStage(), WatermarkRemovalStage(), ProtectionRemovalStage()]
+        self.assertFalse(run_pipeline(self.path, stages))
+        self.assertEqual([stage.removed for stage in stages], [[], [], []])
+        self.assertEqual(os.stat(self.path).st_mtime_ns, stat.st_mtime_ns)
+        self.assertEqual(os.listdir(self.folder), [os.path.basename(self.path)])
+
+    def test_output_path(self):
+        output = os.path.join(self.folder, "out.docm")
+        stage = BookmarkPurgeStage()
+        self.assertTrue(run_pipeline(self.path, [stage], output))
+        with zipfile.ZipFile(self.path) as source, zipfile.ZipFile(output) as result:
+            self.assertEqual(source.read("word/document.xml"), DOCUMENT)
+            self.assertEqual(result.read("word/document.xml"), _expected_document())
+            self.assertEqual(source.namelist(), result.namelist())
+
+
+class CutLocatedElementsTest(unittest.TestCase):
+
+    def test_chunk_boundaries(self):
+        """任意分块得到的结果与整体处理相同"""
+        names = [(W, "bookmarkStart"), (W, "bookmarkEnd")]
+
+        def cut(chunks):
+            matched = set()
+
+            def match(name, attrs):
+                if name[1] == "bookmarkEnd":
+                    return attrs.get((W, "id")) in matched
+                if attrs.get((W, "name"), "").startswith("Locked"):
+                    matched.add(attrs.get((W, "id")))
+                    return True
+                return False
+
+            return b"".join(cut_located_elements(chunks, [ElementLocator(names, match)]))
+
+        expected = cut([DOCUMENT])
+        self.assertNotIn(b"LockedStudent1", expected)
+        for size in (1, 2, 3, 7, 64):
+            with self.subTest(size=size):
+                chunks = [DOCUMENT[i:i + size] for i in range(0, len(DOCUMENT), size)]
+                self.assertEqual(cut(chunks), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
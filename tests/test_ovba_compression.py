@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+MS-OVBA 压缩与解压的往返测试
+"""
+import os
+import random
+import unittest
+
+from core.ovba_compression import CHUNK_SIZE, compress, decompress, recompress
+
+
+class OVBACompressionTest(unittest.TestCase):
+
+    def assertRoundTrip(self, data: bytes):
+        self.assertEqual(decompress(compress(data)), data)
+
+    def test_edge_sizes(self):
+        """空数据、恰好一个块、比一个块多一个字节"""
+        for size in (0, 1, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 3 * CHUNK_SIZE):
+            with self.subTest(size=size):
+                self.assertRoundTrip(b"A" * size)
+        for size in (0, 1, CHUNK_SIZE, CHUNK_SIZE + 1, 3 * CHUNK_SIZE, 3 * CHUNK_SIZE + 100):
+            with self.subTest(size=size, random=True):
+                self.assertRoundTrip(os.urandom(size))
+
+    def test_short_raw_chunk_is_padded(self):
+        """不可压缩的末尾块按规范输出为补0的 4096 字节未压缩块，解压结果带有补齐的0"""
+        data = os.urandom(CHUNK_SIZE - 1)
+        self.assertEqual(decompress(compress(data)), data + b"\x00")
+
+    def test_random_text(self):
+        """类似源码的可压缩数据"""
+        rng = random.Random(1)
+        words = [b"Dim", b"As", b"String", b"End Sub", b"\r\n", b"    ", b"x", b"=", b"1"]
+        for _ in range(20):
+            data = b" ".join(rng.choice(words) for _ in range(rng.randint(0, 5000)))
+            with self.subTest(size=len(data)):
+                self.assertRoundTrip(data)
+
+    def test_compressible_data_shrinks(self):
+        data = b"Attribute VB_Name = \"Module1\"\r\n" * 500
+        self.assertLess(len(compress(data)), len(data) // 4)
+
+    def test_recompress_reuses_unchanged_chunks(self):
+        old = bytes(random.Random(2).randrange(40, 60) for _ in range(5 * CHUNK_SIZE))
+        new = old[:2 * CHUNK_SIZE] + b"changed" + old[2 * CHUNK_SIZE + 7:]
+        stats = {}
+        container = recompress(compress(old), new, stats=stats)
+        self.assertEqual(decompress(container), new)
+        self.assertEqual(stats, {"reused": 4, "compressed": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+VBAProjectWriter 新建、新增、替换和删除模块后由 VBAProject 重新读取的测试
+"""
+import unittest
+
+from core.ole_file import OleFile
+from core.vba_component import VBAComponent
+from core.vba_project import VBAProject, VBAProjectError
+from core.vba_writer import HOST_EXCEL, HOST_WORD, VBAProjectWriter, build_vba_project
+
+
+def read_project(data: bytes) -> VBAProject:
+    return VBAProject(OleFile(data))
+
+
+def module_sources(project: VBAProject) -> dict:
+    """模块名称 -> (PROJECT 流中的声明类型, 去掉 Attribute 行的源码)"""
+    return {module.name: (module.project_kind, project.read_module_source(module).rstrip("\r\n"))
+            for module in project.modules}
+
+
+class VBAProjectWriterTest(unittest.TestCase):
+
+    def test_new_project_has_host_document_modules(self):
+        self.assertEqual([m.name for m in read_project(VBAProjectWriter(host=HOST_WORD).to_bytes()).modules],
+                         ["ThisDocument"])
+        self.assertIn("ThisWorkbook",
+                      [m.name for m in read_project(VBAProjectWriter(host=HOST_EXCEL).to_bytes()).modules])
+
+    def test_add_modules(self):
+        writer = VBAProjectWriter(host=HOST_WORD)
+        writer.add_module("Module1", VBAComponent.TYPE_MODULE, "Sub A()\r\nEnd Sub\r\n")
+        writer.add_module("Class1", VBAComponent.TYPE_CLASS, "Public X As Long\r\n")
+        writer.replace_module_source("ThisDocument", "Private Sub Document_Open()\r\nEnd Sub\r\n")
+        project = read_project(writer.to_bytes())
+
+        self.assertEqual(module_sources(project), {
+            "ThisDocument": ("document", "Private Sub Document_Open()\r\nEnd Sub"),
+            "Module1": ("module", "Sub A()\r\nEnd Sub"),
+            "Class1": ("class", "Public X As Long"),
+        })
+        self.assertTrue(project.get_module("Module1").procedural)
+        self.assertFalse(project.get_module("Class1").procedural)
+
+    def test_modify_existing_project(self):
+        """基于已有工程替换、删除和新增模块，未改动的模块源码保持不变"""
+        writer = VBAProjectWriter(host=HOST_WORD)
+        writer.add_module("Module1", VBAComponent.TYPE_MODULE, "Sub A()\r\nEnd Sub\r\n")
+        writer.add_module("Module2", VBAComponent.TYPE_MODULE, "Sub Keep()\r\nEnd Sub\r\n")
+        writer.add_module("Class1", VBAComponent.TYPE_CLASS, "Public X As Long\r\n")
+        original = writer.to_bytes()
+
+        with OleFile(original) as ole:
+            writer = VBAProjectWriter(VBAProject(ole))
+            writer.replace_module_source("Module1", "Sub B()\r\nEnd Sub\r\n")
+            writer.remove_module("Class1")
+            writer.add_module("Module3", VBAComponent.TYPE_MODULE, "Sub C()\r\nEnd Sub\r\n")
+            data = writer.to_bytes()
+
+        with OleFile(data) as ole:
+            project = VBAProject(ole)
+            self.assertEqual(module_sources(project), {
+                "ThisDocument": ("document", ""),
+                "Module1": ("module", "Sub B()\r\nEnd Sub"),
+                "Module2": ("module", "Sub Keep()\r\nEnd Sub"),
+                "Module3": ("module", "Sub C()\r\nEnd Sub"),
+            })
+            self.assertIn('Attribute VB_Name = "Module1"',
+                          project.read_module_source(project.get_module("Module1"), strip_attributes=False))
+            self.assertFalse(ole.exists("VBA/Class1"))
+
+    def test_invalid_operations(self):
+        writer = VBAProjectWriter(host=HOST_WORD)
+        with self.assertRaises(VBAProjectError):
+            writer.add_module("ThisDocument", VBAComponent.TYPE_MODULE)
+        with self.assertRaises(VBAProjectError):
+            writer.remove_module("ThisDocument")
+        with self.assertRaises(VBAProjectError):
+            writer.remove_module("Missing")
+        with self.assertRaises(VBAProjectError):
+            writer.add_module("Form1", VBAComponent.TYPE_USERFORM)
+
+    def test_build_vba_project(self):
+        components = [
+            VBAComponent("ThisWorkbook", VBAComponent.TYPE_DOCUMENT, "Private Sub Workbook_Open()\r\nEnd Sub"),
+            VBAComponent("Tools", VBAComponent.TYPE_MODULE, "Sub T()\r\nEnd Sub"),
+        ]
+        sources = module_sources(read_project(build_vba_project(components, HOST_EXCEL)))
+        self.assertEqual(sources["ThisWorkbook"], ("document", "Private Sub Workbook_Open()\r\nEnd Sub"))
+        self.assertEqual(sources["Tools"], ("module", "Sub T()\r\nEnd Sub"))
+
+
+if __name__ == "__main__":
+    unittest.main()
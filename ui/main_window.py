@@ -10,17 +10,47 @@ from PyQt5.QtWidgets import (
     QMessageBox, QFileDialog, QGroupBox,
     QProgressBar, QApplication, QFrame, QComboBox
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QObject, QSettings, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
 import os
-from core.handler_factory import VBAHandlerFactory, FileType
+from core.handler_factory import VBAHandlerFactory, FileType, HandlerBackend, ContainerFormat
 from core.vba_component import VBAComponent
+from core.triage import probe_vba
+from core.office_pool import get_office_pool
+from core.com_executor import get_com_executor
 from utils.logger import setup_logger, get_logger
 
 
-class RefreshWorkerThread(QThread):
-    """专门用于刷新组件列表的后台线程"""
-    finished = pyqtSignal(list, str)  # (components, error_message)
+def check_office_file(office_file, file_type):
+    """
+    按文件内容检查文件能否用所选的Office应用程序处理（不启动Office）
+
+    Returns:
+        错误信息，可以处理时返回空字符串
+    """
+    actual_type, container = VBAHandlerFactory.sniff_file(office_file)
+    if container == ContainerFormat.UNKNOWN:
+        return "文件不是有效的Office文档（可能是HTML、RTF或已损坏），无法处理"
+    if actual_type is not None and actual_type != file_type:
+        actual_name = VBAHandlerFactory.get_file_type_name(actual_type)
+        return f"文件实际是{actual_name}文件，请切换文件类型后重试"
+    return ""
+
+
+# 保存上次使用的文件类型的设置项
+FILE_TYPE_SETTING = "file_type"
+
+# 通过Office打开文件失败时的提示
+OPEN_FAILED_MESSAGES = {
+    FileType.WORD: "无法打开文档或文档不包含VBA代码",
+    FileType.EXCEL: "无法打开工作簿或工作簿不包含VBA代码",
+    FileType.POWERPOINT: "无法打开演示文稿或演示文稿不包含VBA代码",
+}
+
+
+class RefreshJob(QObject):
+    """刷新组件列表的任务，在COM执行线程中运行"""
+    finished = pyqtSignal(str, object, list, str)  # (office_file, file_type, components, error_message)
     log_signal = pyqtSignal(str)
 
     def __init__(self, office_file, file_type):
@@ -33,46 +63,42 @@ class RefreshWorkerThread(QThread):
         error_msg = ""
         try:
             self.log_signal.emit("开始读取VBA组件...")
-            handler = VBAHandlerFactory.get_handler(self.file_type, use_ui_signal=False)
 
-            if not handler.initialize():
-                error_msg = "应用程序初始化失败"
+            error_msg = check_office_file(self.office_file, self.file_type)
+            if error_msg:
                 self.log_signal.emit(error_msg)
+                self._finish(components, error_msg)
+                return
+
+            # OOXML宏文件和 Word/Excel 97-2003 文件优先使用原生后端，无需启动Office
+            if VBAHandlerFactory.supports_native(self.office_file):
+                native_components = self._read_native()
+                if native_components is not None:
+                    components = native_components
+                    self.log_signal.emit(f"成功读取 {len(components)} 个组件")
+                    self._finish(components, error_msg)
+                    return
+                self.log_signal.emit("原生解析失败，改用Office读取...")
+
+            # 只读目录即可确定不含VBA工程的文件无需启动Office
+            if probe_vba(self.office_file).macro_free:
+                self.log_signal.emit("文档不包含VBA工程，无需启动Office")
+                self._finish(components, error_msg)
                 return
 
             self.log_signal.emit(f"正在打开文件: {self.office_file}")
 
-            # 根据文件类型打开文档
-            if self.file_type == FileType.WORD:
-                if not handler.open_document(self.office_file):
-                    error_msg = "无法打开文档或文档不包含VBA代码"
-                    self.log_signal.emit(error_msg)
-                    handler.quit()
-                    return
-            elif self.file_type == FileType.EXCEL:
-                if not handler.open_workbook(self.office_file):
-                    error_msg = "无法打开工作簿或工作簿不包含VBA代码"
-                    self.log_signal.emit(error_msg)
-                    handler.quit()
-                    return
-            elif self.file_type == FileType.POWERPOINT:
-                if not handler.open_presentation(self.office_file):
-                    error_msg = "无法打开演示文稿或演示文稿不包含VBA代码"
-                    self.log_signal.emit(error_msg)
-                    handler.quit()
-                    return
+            # 文档由COM执行线程保持打开，紧接着的导出等任务可以直接复用
+            handler = get_com_executor().open_document(self.file_type, self.office_file)
+            if handler is None:
+                error_msg = OPEN_FAILED_MESSAGES[self.file_type]
+                self.log_signal.emit(error_msg)
+                self._finish(components, error_msg)
+                return
 
             self.log_signal.emit("正在读取VBA组件...")
-            components = handler.get_vba_components()
-
-            # 关闭文档并退出
-            if self.file_type == FileType.WORD:
-                handler.close_document()
-            elif self.file_type == FileType.EXCEL:
-                handler.close_workbook()
-            elif self.file_type == FileType.POWERPOINT:
-                handler.close_presentation()
-            handler.quit()
+            # 列表只需要名称和类型，代码在导出时再读取
+            components = handler.list_components(metadata_only=True)
 
             self.log_signal.emit(f"成功读取 {len(components)} 个组件")
 
@@ -82,11 +108,31 @@ class RefreshWorkerThread(QThread):
             self.log_signal.emit(error_msg)
             self.log_signal.emit(traceback.format_exc())
 
-        self.finished.emit(components, error_msg)
+        self._finish(components, error_msg)
+
+    def _finish(self, components, error_msg):
+        """发出完成信号，带上本任务的文件和类型，界面据此丢弃已过期的结果"""
+        self.finished.emit(self.office_file, self.file_type, components, error_msg)
+
+    def _read_native(self):
+        """使用原生后端读取VBA组件，失败时返回None"""
+        handler = VBAHandlerFactory.get_handler(
+            self.file_type, use_ui_signal=False, backend=HandlerBackend.NATIVE
+        )
+        try:
+            self.log_signal.emit(f"正在解析文件: {self.office_file}")
+            if not handler.open_file(self.office_file):
+                return None
+            return handler.list_components(metadata_only=True)
+        except Exception as e:
+            self.log_signal.emit(f"原生解析出错: {e}")
+            return None
+        finally:
+            handler.quit()
 
 
-class WorkerThread(QThread):
-    """后台工作线程"""
+class TaskJob(QObject):
+    """导出/导入/清除任务，在COM执行线程中运行"""
     finished = pyqtSignal(bool, str)
     progress = pyqtSignal(str)
     log_signal = pyqtSignal(str)
@@ -101,49 +147,36 @@ class WorkerThread(QThread):
         self.handler = None
 
     def run(self):
-        print("[WorkerThread] run() 方法开始执行")
-        import traceback
+        executor = get_com_executor()
         try:
-            print("[WorkerThread] 正在获取handler...")
-            self.log_signal.emit("WorkerThread 开始执行...")
-            self.handler = VBAHandlerFactory.get_handler(self.file_type, use_ui_signal=False)
-            print(f"[WorkerThread] handler: {type(self.handler)}")
-            self.log_signal.emit(f"Handler 创建成功: {type(self.handler)}")
-            
-            print("[WorkerThread] 准备调用 handler.initialize()")
-            # 暂时跳过信号连接测试
-            # if hasattr(self.handler, 'log_signal'):
-            #     print("[WorkerThread] 连接 log_signal")
-            #     self.handler.log_signal.connect(self._on_log)
-            #     print("[WorkerThread] log_signal 连接完成")
-            
-            app_name = VBAHandlerFactory.get_file_type_name(self.file_type)
-            print(f"[WorkerThread] app_name: {app_name}, file_type: {self.file_type}")
-            self.log_signal.emit(f"正在初始化{app_name}应用程序...")
+            self.log_signal.emit("TaskJob 开始执行...")
+
+            error_msg = check_office_file(self.office_file, self.file_type)
+            if error_msg:
+                self.finished.emit(False, error_msg)
+                return
+
+            # 导入、清除会直接改写文件，先关闭之前任务保持打开的文档
+            if self.task_type != 'export':
+                executor.close_document()
 
-            print("[WorkerThread] 调用 handler.initialize()")
-            # 初始化处理器
-            if not self.handler.initialize():
-                self.finished.emit(False, f"{app_name}应用程序初始化失败")
+            # 原生后端能处理的任务无需启动Office
+            if self._try_native_task():
                 return
 
-            print("[WorkerThread] initialize 成功，准备打开文档")
+            # 不含VBA工程的文件没有可导出的组件，无需启动Office
+            if self.task_type == 'export' and probe_vba(self.office_file).macro_free:
+                self.finished.emit(False, "文档不包含VBA代码")
+                return
+
+            app_name = VBAHandlerFactory.get_file_type_name(self.file_type)
             self.log_signal.emit(f"正在打开文件: {self.office_file}")
-            
-            if self.file_type == FileType.WORD:
-                print(f"[WorkerThread] 准备打开Word文档: {self.office_file}")
-                if not self.handler.open_document(self.office_file):
-                    self.finished.emit(False, f"无法打开{app_name}文档或文档不包含VBA代码")
-                    return
-                print("[WorkerThread] Word文档打开成功")
-            elif self.file_type == FileType.EXCEL:
-                if not self.handler.open_workbook(self.office_file):
-                    self.finished.emit(False, f"无法打开{app_name}工作簿或工作簿不包含VBA代码")
-                    return
-            elif self.file_type == FileType.POWERPOINT:
-                if not self.handler.open_presentation(self.office_file):
-                    self.finished.emit(False, f"无法打开{app_name}演示文稿或演示文稿不包含VBA代码")
-                    return
+
+            # 同一文件已由之前的任务打开时直接复用，Office实例也保留在COM执行线程中
+            self.handler = executor.open_document(self.file_type, self.office_file)
+            if self.handler is None:
+                self.finished.emit(False, f"{app_name}: {OPEN_FAILED_MESSAGES[self.file_type]}")
+                return
 
             self.log_signal.emit(f"文档已打开，准备执行 {self.task_type} 任务...")
             
@@ -157,23 +190,69 @@ class WorkerThread(QThread):
         except Exception as e:
             import traceback
             error_detail = traceback.format_exc()
-            self.log_signal.emit(f"WorkerThread异常: {str(e)}")
+            self.log_signal.emit(f"TaskJob异常: {str(e)}")
             self.log_signal.emit(f"堆栈: {error_detail}")
             self.finished.emit(False, f"操作失败: {str(e)}\n{error_detail}")
         finally:
-            self.log_signal.emit("WorkerThread 进入清理阶段...")
-            if self.handler:
-                try:
-                    if self.file_type == FileType.WORD:
-                        self.handler.close_document()
-                    elif self.file_type == FileType.EXCEL:
-                        self.handler.close_workbook()
-                    elif self.file_type == FileType.POWERPOINT:
-                        self.handler.close_presentation()
-                    self.handler.quit()
-                except Exception as e:
-                    self.log_signal.emit(f"清理时出错: {e}")
-            self.log_signal.emit("WorkerThread 清理完成")
+            # 导入、清除后文档已保存（可能另存为新文件），不再复用
+            if self.handler and self.task_type != 'export':
+                executor.close_document()
+            self.handler = None
+
+    def _try_native_task(self):
+        """尝试原生导出/导入/清除，返回是否已处理（已发出finished信号）"""
+        if not VBAHandlerFactory.supports_native(self.office_file):
+            return False
+
+        handler = VBAHandlerFactory.get_handler(
+            self.file_type, use_ui_signal=False, backend=HandlerBackend.NATIVE
+        )
+        try:
+            if not handler.open_file(self.office_file):
+                return False
+
+            if self.task_type == 'export':
+                if not handler.vba_project:
+                    return False
+                self.log_signal.emit(f"使用原生方式导出 {len(self.components)} 个组件...")
+                if handler.export_vba(self.vba_folder, self.components):
+                    self.finished.emit(True, f"成功导出 {len(self.components)} 个VBA组件")
+                else:
+                    self.finished.emit(False, "导出失败")
+                return True
+
+            if self.task_type == 'remove':
+                if not handler.writable:
+                    return False
+                self._do_native_remove(handler)
+                return True
+
+            if not handler.can_import(self.components):
+                return False
+            self.log_signal.emit(f"使用原生方式导入 {len(self.components)} 个组件...")
+            if handler.import_vba(self.vba_folder, self.components):
+                self.finished.emit(True, f"成功导入 {len(self.components)} 个VBA组件")
+            else:
+                self.finished.emit(False, "导入失败")
+            return True
+        finally:
+            handler.quit()
+
+    def _do_native_remove(self, handler):
+        """原生清除：VBA工程和文档属性等锁定信息在一次压缩包重写中完成"""
+        count = len(handler.list_components(metadata_only=True))
+        if count > 0:
+            self.log_signal.emit(f"使用原生方式清除 {count} 个VBA组件及文档属性...")
+            if handler.remove_all_vba():
+                self.finished.emit(True, f"成功清除 {count} 个VBA代码及文档属性")
+            else:
+                self.finished.emit(False, "清除VBA失败")
+        else:
+            self.log_signal.emit("文档中没有VBA代码，使用原生方式仅清除文档属性...")
+            if handler.clear_document_properties_only():
+                self.finished.emit(True, "成功清除文档属性（无VBA代码）")
+            else:
+                self.finished.emit(False, "清除文档属性失败")
 
     def _do_export(self):
         """执行导出操作"""
@@ -197,7 +276,7 @@ class WorkerThread(QThread):
         """执行清除VBA操作"""
         # 先检查文档是否有VBA代码
         self.log_signal.emit("正在检查VBA代码...")
-        components = self.handler.get_vba_components()
+        components = self.handler.list_components(metadata_only=True)
 
         if len(components) > 0:
             # 有VBA代码，执行完整清除
@@ -231,13 +310,13 @@ class MainWindow(QMainWindow):
         self.file_type = FileType.WORD  # 默认文件类型
         self.document_components = []  # 文档中的VBA组件
         self.folder_components = []    # 文件夹中的VBA组件
-        self.worker_thread = None       # 用于导出/导入/清除操作
-        self.refresh_worker = None      # 用于刷新组件列表
+        self.pending_jobs = []          # 已提交到COM执行线程、尚未完成的任务
 
         # 初始化日志
         self.logger = None
 
         self.init_ui()
+        self._restore_file_type()
 
     def init_ui(self):
         """初始化UI"""
@@ -475,6 +554,30 @@ class MainWindow(QMainWindow):
         self._update_buttons_state()
         self.logger.info(f"已切换到{VBAHandlerFactory.get_file_type_name(self.file_type)}模式")
 
+        QSettings().setValue(FILE_TYPE_SETTING, self.file_type.value)
+        self._prelaunch_office()
+
+    def _restore_file_type(self):
+        """恢复上次使用的文件类型，并预启动对应的Office应用程序"""
+        try:
+            file_type = FileType(QSettings().value(FILE_TYPE_SETTING, self.file_type.value))
+        except ValueError:
+            file_type = self.file_type
+        index = self.file_type_combo.findData(file_type)
+        if file_type != self.file_type and index >= 0:
+            # 切换选项会触发 on_file_type_changed，在其中预启动
+            self.file_type_combo.setCurrentIndex(index)
+        else:
+            self._prelaunch_office()
+
+    def _prelaunch_office(self):
+        """
+        在COM执行线程中预先启动当前类型的Office应用程序，第一次刷新时无需等待启动
+
+        实例长时间未使用时由COM执行线程自动退出。
+        """
+        get_com_executor().submit(get_office_pool().prelaunch, self.file_type)
+
     def select_office_file(self):
         """选择Office文件"""
         file_filter = VBAHandlerFactory.get_file_filter(self.file_type)
@@ -541,34 +644,32 @@ class MainWindow(QMainWindow):
             self._load_document_components_threaded()
 
     def _load_document_components_threaded(self):
-        """使用后台线程加载Office文档中的VBA组件"""
-        self._set_buttons_enabled(False)
+        """提交刷新任务到COM执行线程，加载Office文档中的VBA组件"""
         self.logger.info("正在读取VBA组件...")
 
         try:
-            self.refresh_worker = RefreshWorkerThread(
-                self.office_file,
-                self.file_type
-            )
-            self.refresh_worker.log_signal.connect(self._on_refresh_log)
-            self.refresh_worker.finished.connect(self._on_refresh_finished)
-            self.refresh_worker.start()
+            job = RefreshJob(self.office_file, self.file_type)
+            job.log_signal.connect(self._on_refresh_log)
+            job.finished.connect(self._on_refresh_finished)
+            self._submit_job(job)
         except Exception as e:
             import traceback
-            self.logger.error(f"启动刷新线程失败: {e}")
+            self.logger.error(f"提交刷新任务失败: {e}")
             self.logger.error(traceback.format_exc())
-            self._set_buttons_enabled(True)
 
     def _on_refresh_log(self, message):
-        """处理刷新线程的日志"""
+        """处理刷新任务的日志"""
         self.logger.info(message)
 
-    def _on_refresh_finished(self, components, error_msg):
-        """处理刷新线程完成"""
-        self._set_buttons_enabled(True)
+    def _on_refresh_finished(self, office_file, file_type, components, error_msg):
+        """处理刷新任务完成（任务排队期间切换了文件或类型时丢弃结果）"""
+        if office_file != self.office_file or file_type != self.file_type:
+            self.logger.info(f"文件已切换，忽略之前的读取结果: {office_file}")
+            return
 
         if error_msg:
             self.logger.error(error_msg)
+            self.document_components = []
         else:
             self.document_components = components
             self.logger.info(f"成功读取 {len(components)} 个VBA组件")
@@ -584,8 +685,8 @@ class MainWindow(QMainWindow):
         """加载VBA文件夹中的组件"""
         try:
             self.logger.info("正在读取VBA文件夹中的组件...")
-            # 复用 word_handler 中的 scan_vba_folder 函数
-            from core.word_handler import scan_vba_folder
+            # 复用 vba_component 中的 scan_vba_folder 函数
+            from core.vba_component import scan_vba_folder
             self.folder_components = scan_vba_folder(self.vba_folder)
             self.logger.info(f"发现 {len(self.folder_components)} 个VBA文件")
         except Exception as e:
@@ -733,48 +834,61 @@ class MainWindow(QMainWindow):
         self._run_task('remove', [])
 
     def _run_task(self, task_type, components):
-        """执行后台任务"""
-        # 检查是否有其他操作正在进行
-        if self.worker_thread and self.worker_thread.isRunning():
-            QMessageBox.warning(self, "警告", "当前有其他操作正在进行，请等待完成后再执行新操作")
-            return
-
-        self._set_buttons_enabled(False)
-
-        self.logger.info(f"创建WorkerThread，task_type={task_type}")
+        """提交导出/导入/清除任务到COM执行线程，之前提交的任务完成后按顺序执行"""
+        self.logger.info(f"创建TaskJob，task_type={task_type}")
         
         try:
-            self.worker_thread = WorkerThread(
+            job = TaskJob(
                 task_type,
                 self.office_file,
                 self.vba_folder,
                 self.file_type,
                 components
             )
-            self.logger.info("WorkerThread创建成功，连接信号...")
-            self.worker_thread.log_signal.connect(self._on_log)
-            self.worker_thread.finished.connect(self._on_task_finished)
-            self.logger.info("信号连接成功，启动线程...")
-            self.worker_thread.start()
-            self.logger.info("WorkerThread已启动")
+            job.log_signal.connect(self._on_log)
+            job.finished.connect(self._on_task_finished)
+            self._submit_job(job)
         except Exception as e:
             import traceback
             error_detail = traceback.format_exc()
-            self.logger.error(f"创建或启动线程失败: {e}")
+            self.logger.error(f"提交任务失败: {e}")
             self.logger.error(f"堆栈: {error_detail}")
-            self._set_buttons_enabled(True)
             QMessageBox.critical(self, "错误", f"启动任务失败: {e}\n{error_detail}")
+            return
 
         self.logger.info(f"开始执行{task_type}任务...")
 
+    def _submit_job(self, job):
+        """
+        提交任务到COM执行线程
+
+        任务对象保留到发出 finished 信号为止；信号从COM线程发出，
+        通过队列连接在主线程中处理。
+        """
+        self.pending_jobs.append(job)
+        job.finished.connect(lambda *args: self._on_job_done(job))
+        get_com_executor().submit(job.run)
+        self._update_status()
+
+    def _on_job_done(self, job):
+        """任务完成，释放任务对象"""
+        if job in self.pending_jobs:
+            self.pending_jobs.remove(job)
+        self._update_status()
+
+    def _update_status(self):
+        """在状态栏显示排队中的任务数量"""
+        if self.pending_jobs:
+            self.statusBar().showMessage(f"正在处理（队列中 {len(self.pending_jobs)} 个任务）...")
+        else:
+            self.statusBar().showMessage("就绪")
+
     def _on_log(self, message):
         """处理日志消息"""
         self.logger.info(message)
 
     def _on_task_finished(self, success, message):
         """处理任务完成"""
-        self._set_buttons_enabled(True)
-
         if success:
             self.logger.info(message)
             QMessageBox.information(self, "成功", message)
@@ -782,24 +896,12 @@ class MainWindow(QMainWindow):
             self.logger.error(message)
             QMessageBox.critical(self, "错误", message)
 
-        self.statusBar().showMessage("就绪")
-
-    def _set_buttons_enabled(self, enabled):
-        """设置按钮启用状态"""
-        self.btn_select_file.setEnabled(enabled)
-        self.btn_select_folder.setEnabled(enabled)
-        self.btn_refresh.setEnabled(enabled and bool(self.office_file))
-        self.btn_export.setEnabled(enabled and bool(self.office_file))
-        self.btn_import.setEnabled(enabled and bool(self.office_file) and bool(self.vba_folder))
-        self.btn_remove.setEnabled(enabled and bool(self.office_file))
-        self.file_type_combo.setEnabled(enabled)
-
-        if not enabled:
-            self.statusBar().showMessage("正在处理...")
-
     def closeEvent(self, event):
         """窗口关闭事件"""
         self.logger.info("程序退出")
+        # 等待正在执行的任务完成，取消排队中的任务，再退出Office
+        get_com_executor().shutdown()
+        get_office_pool().shutdown()
         event.accept()
 
 
@@ -808,6 +910,9 @@ def main():
     import sys
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
+    # QSettings 按应用程序名称保存设置
+    app.setApplicationName("VBA Import Tool")
+    app.setOrganizationName("VBA Import Tool")
 
     window = MainWindow()
     window.show()
@@ -21,6 +21,7 @@ def main():
 
     # Set application info
     app.setApplicationName("VBA Import Tool")
+    app.setOrganizationName("VBA Import Tool")
     app.setApplicationVersion("1.0.0")
 
     # Create and show main window